@@ -8,13 +8,15 @@ MinerU Tianshu - API Server
 企业级认证授权: JWT Token + API Key + SSO
 """
 
+import asyncio
 import json
 import os
 import re
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from urllib.parse import quote
 
 import uvicorn
@@ -22,6 +24,7 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Depen
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from loguru import logger
+from pydantic import ConfigDict, ValidationError, create_model
 
 # 导入认证模块
 from auth import (
@@ -54,6 +57,11 @@ app.add_middleware(
 # 获取项目根目录（backend 的父目录）
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# 长轮询（wait 参数）时检查任务状态的间隔（秒）
+TASK_WAIT_POLL_INTERVAL = 0.5
+# 长轮询和 submit_task(wait=true) 共用的最长等待时间（秒）
+TASK_WAIT_MAX_SECONDS = 60
+
 # 初始化数据库
 # 确保使用环境变量中的数据库路径（与 Worker 保持一致）
 db_path_env = os.getenv("DATABASE_PATH")
@@ -181,6 +189,38 @@ async def root():
     }
 
 
+def get_upload_dir() -> Path:
+    """获取共享的上传目录（Backend 和 Worker 都能访问），不存在时创建"""
+    upload_path_env = os.getenv("UPLOAD_PATH")
+    if upload_path_env:
+        upload_dir = Path(upload_path_env)
+    else:
+        # Docker 环境: /app/uploads
+        # 本地环境: ./data/uploads
+        upload_dir = PROJECT_ROOT / "data" / "uploads"
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir
+
+
+async def save_upload(file: UploadFile, upload_dir: Path) -> Path:
+    """将上传文件流式写入上传目录（文件名加唯一前缀避免冲突），返回保存路径"""
+    temp_file_path = upload_dir / f"{uuid.uuid4().hex}_{file.filename}"
+
+    # 流式写入文件到磁盘，避免高内存使用
+    try:
+        with open(temp_file_path, "wb") as temp_file:
+            while True:
+                chunk = await file.read(1 << 23)  # 8MB chunks
+                if not chunk:
+                    break
+                temp_file.write(chunk)
+    except BaseException:
+        # 写入中断时删除不完整的文件
+        temp_file_path.unlink(missing_ok=True)
+        raise
+    return temp_file_path
+
+
 @app.post("/api/v1/tasks/submit", tags=["任务管理"])
 async def submit_task(
     file: UploadFile = File(..., description="文件: PDF/图片/Office/HTML/音频/视频等多种格式"),
@@ -211,6 +251,14 @@ async def submit_task(
         False,
         description="是否将 Office 文件转换为 PDF 后再处理（图片提取更完整，但速度较慢）"
     ),
+    # 同步等待参数
+    wait: bool = Query(False, description="是否等待任务结束后再返回（返回内容与任务查询接口相同）"),
+    timeout: float = Query(
+        TASK_WAIT_MAX_SECONDS,
+        ge=0,
+        le=TASK_WAIT_MAX_SECONDS,
+        description="wait=true 时的最长等待时间（秒），超时返回当前状态",
+    ),
     # 认证依赖
     current_user: User = Depends(require_permission(Permission.TASK_SUBMIT)),
 ):
@@ -219,29 +267,10 @@ async def submit_task(
 
     需要认证和 TASK_SUBMIT 权限。
     立即返回 task_id，任务在后台异步处理。
+    wait=true 时等待任务结束（最多 timeout 秒）后返回任务状态和解析结果，客户端无需再轮询。
     """
     try:
-        # 创建共享的上传目录（Backend 和 Worker 都能访问）
-        upload_path_env = os.getenv("UPLOAD_PATH")
-        if upload_path_env:
-            upload_dir = Path(upload_path_env)
-        else:
-            # Docker 环境: /app/uploads
-            # 本地环境: ./data/uploads
-            upload_dir = PROJECT_ROOT / "data" / "uploads"
-        upload_dir.mkdir(parents=True, exist_ok=True)
-
-        # 生成唯一的文件名（避免冲突）
-        unique_filename = f"{uuid.uuid4().hex}_{file.filename}"
-        temp_file_path = upload_dir / unique_filename
-
-        # 流式写入文件到磁盘，避免高内存使用
-        with open(temp_file_path, "wb") as temp_file:
-            while True:
-                chunk = await file.read(1 << 23)  # 8MB chunks
-                if not chunk:
-                    break
-                temp_file.write(chunk)
+        temp_file_path = await save_upload(file, get_upload_dir())
 
         # 构建处理选项
         options = {
@@ -279,6 +308,17 @@ async def submit_task(
         logger.info(f"   Backend: {backend}")
         logger.info(f"   Priority: {priority}")
 
+        if wait:
+            return await get_task_status(
+                task_id,
+                upload_images=False,
+                format="markdown",
+                wait=timeout,
+                since_status=None,
+                fields=None,
+                current_user=current_user,
+            )
+
         return {
             "success": True,
             "task_id": task_id,
@@ -289,28 +329,161 @@ async def submit_task(
             "created_at": datetime.now().isoformat(),
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to submit task: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 批量提交时每个文件可覆盖的处理选项及其默认值（与 submit_task 的表单默认值一致）
+BATCH_OPTION_DEFAULTS = {
+    "lang": "auto",
+    "method": "auto",
+    "formula_enable": True,
+    "table_enable": True,
+    "keep_audio": False,
+    "enable_keyframe_ocr": False,
+    "ocr_backend": "paddleocr-vl",
+    "keep_keyframes": False,
+    "enable_speaker_diarization": False,
+    "remove_watermark": False,
+    "watermark_conf_threshold": 0.35,
+    "watermark_dilation": 10,
+    "convert_office_to_pdf": False,
+}
+
+# 单次批量提交的最大文件数（与 MCP Server 的 SUBMIT_BATCH_MAX 一致）
+SUBMIT_BATCH_MAX_FILES = 16
+
+# 批量提交时单个文件的参数，按默认值的类型校验并转换（与 submit_task 的表单参数一致）；
+# 未知参数名（如拼写错误）直接拒绝，避免静默使用默认值
+BatchTaskParams = create_model(
+    "BatchTaskParams",
+    __config__=ConfigDict(extra="forbid"),
+    backend=(str, "auto"),
+    priority=(int, 0),
+    **{key: (type(default), default) for key, default in BATCH_OPTION_DEFAULTS.items()},
+)
+
+
+@app.post("/api/v1/tasks/submit_batch", tags=["任务管理"])
+async def submit_batch(
+    files: List[UploadFile] = File(..., description="多个文件，每个文件创建一个任务"),
+    params: str = Form(
+        "[]",
+        description="与 files 一一对应的参数 JSON 列表，每项可包含 backend、priority 及 submit 接口的处理选项，缺省使用默认值",
+    ),
+    current_user: User = Depends(require_permission(Permission.TASK_SUBMIT)),
+):
+    """
+    批量提交文档解析任务
+
+    需要认证和 TASK_SUBMIT 权限。
+    一次请求上传多个文件（最多 SUBMIT_BATCH_MAX_FILES 个），所有任务在同一个数据库事务中创建，按 files 顺序返回 task_id。
+    """
+    if len(files) > SUBMIT_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {SUBMIT_BATCH_MAX_FILES} files per batch")
+    try:
+        file_params = json.loads(params) or []
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid params JSON: {e}")
+    if not isinstance(file_params, list) or len(file_params) > len(files):
+        raise HTTPException(status_code=400, detail="params must be a JSON list no longer than files")
+    file_params += [{}] * (len(files) - len(file_params))
+    for index, file_param in enumerate(file_params):
+        if not isinstance(file_param, dict):
+            raise HTTPException(status_code=400, detail=f"params[{index}] must be a JSON object")
+        try:
+            file_params[index] = BatchTaskParams.model_validate(file_param)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid params[{index}]: {e}")
+
+    saved_paths = []
+    try:
+        upload_dir = get_upload_dir()
+        tasks = []
+        for file, file_param in zip(files, file_params):
+            saved_paths.append(await save_upload(file, upload_dir))
+            tasks.append(
+                {
+                    "file_name": file.filename,
+                    "file_path": str(saved_paths[-1]),
+                    "backend": file_param.backend,
+                    "options": {key: getattr(file_param, key) for key in BATCH_OPTION_DEFAULTS},
+                    "priority": file_param.priority,
+                }
+            )
+
+        task_ids = db.create_tasks(tasks, user_id=current_user.user_id)
+
+        logger.info(f"✅ Batch submitted: {len(task_ids)} tasks")
+        logger.info(f"   User: {current_user.username} ({current_user.role.value})")
+
+        created_at = datetime.now().isoformat()
+        return {
+            "success": True,
+            "tasks": [
+                {
+                    "task_id": task_id,
+                    "status": "pending",
+                    "file_name": task["file_name"],
+                    "created_at": created_at,
+                }
+                for task_id, task in zip(task_ids, tasks)
+            ],
+            "user_id": current_user.user_id,
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Failed to submit batch: {e}")
+        # 任务未创建，删除已保存的上传文件
+        for path in saved_paths:
+            path.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[set]:
+    """解析逗号分隔的 fields 参数，未指定时返回 None（返回全部字段）"""
+    if not fields:
+        return None
+    return {f.strip() for f in fields.split(",") if f.strip()}
+
+
+def project_fields(response: dict, fields: Optional[set]) -> dict:
+    """按 fields 参数裁剪任务查询响应（始终保留 success 和 task_id），fields 为 None 时原样返回"""
+    if fields is None:
+        return response
+    return {key: value for key, value in response.items() if key in fields or key in ("success", "task_id")}
+
+
 @app.get("/api/v1/tasks/{task_id}", tags=["任务管理"])
 async def get_task_status(
     task_id: str,
     upload_images: bool = Query(False, description="【已废弃】图片已自动上传到 RustFS，此参数保留仅用于向后兼容"),
     format: str = Query("markdown", description="返回格式: markdown(默认)/json/both"),
+    wait: float = Query(0, ge=0, le=TASK_WAIT_MAX_SECONDS, description="长轮询：任务未结束时最多等待的秒数，状态变化后立即返回"),
+    since_status: Optional[str] = Query(None, description="长轮询：只在状态不再是该值时返回（默认等待任务结束）"),
+    fields: Optional[str] = Query(
+        None, description="只返回指定字段（逗号分隔，如 status,error_message），未请求的 subtasks/data 不会加载"
+    ),
     current_user: User = Depends(get_current_active_user),
 ):
     """
     查询任务状态和详情
 
     需要认证。用户只能查看自己的任务，管理员可以查看所有任务。
+    指定 wait 时为长轮询：任务仍处于 since_status（未指定时为 pending/processing）时，
+    服务端等待状态变化或超时后再返回，客户端无需频繁轮询
     当任务完成时，会自动返回解析后的内容（data 字段）
     - format=markdown: 只返回 Markdown 内容（默认）
     - format=json: 只返回 JSON 结构化数据（MinerU 和 PaddleOCR-VL 支持）
     - format=both: 同时返回 Markdown 和 JSON
     可选择是否上传图片到 MinIO 并替换为 URL
+    指定 fields 时只返回这些字段（success 和 task_id 始终返回），轮询状态时可避免加载子任务列表和解析内容
     """
+    wanted = parse_fields(fields)
+
     task = db.get_task(task_id)
 
     if not task:
@@ -321,6 +494,17 @@ async def get_task_status(
         if task.get("user_id") != current_user.user_id:
             raise HTTPException(status_code=403, detail="Permission denied: You can only view your own tasks")
 
+    if wait > 0:
+        deadline = time.monotonic() + wait
+        while (
+            task["status"] in ("pending", "processing")
+            and (since_status is None or task["status"] == since_status)
+            and time.monotonic() < deadline
+        ):
+            await asyncio.sleep(TASK_WAIT_POLL_INTERVAL)
+            # 同步的 SQLite 查询放到线程池执行，多个长轮询请求不会阻塞事件循环
+            task = await asyncio.to_thread(db.get_task, task_id) or task
+
     response = {
         "success": True,
         "task_id": task_id,
@@ -351,7 +535,7 @@ async def get_task_status(
 
         # 可选: 返回所有子任务状态
         try:
-            children = db.get_child_tasks(task_id)
+            children = db.get_child_tasks(task_id) if wanted is None or "subtasks" in wanted else []
             response["subtasks"] = [
                 {
                     "task_id": child["task_id"],
@@ -369,12 +553,12 @@ async def get_task_status(
         logger.info(f"✅ Task status: {task['status']} - (result_path: {task.get('result_path')})")
 
     # 如果任务已完成，尝试返回解析内容
-    if task["status"] == "completed":
+    if task["status"] == "completed" and (wanted is None or "data" in wanted):
         if not task["result_path"]:
             # 结果文件已被清理
             response["data"] = None
             response["message"] = "Task completed but result files have been cleaned up (older than retention period)"
-            return response
+            return project_fields(response, wanted)
 
         result_dir = Path(task["result_path"])
         logger.info(f"📂 Checking result directory: {result_dir}")
@@ -474,7 +658,7 @@ async def get_task_status(
     else:
         logger.info(f"ℹ️  Task status is {task['status']}, skipping content loading")
 
-    return response
+    return project_fields(response, wanted)
 
 
 @app.delete("/api/v1/tasks/{task_id}", tags=["任务管理"])
@@ -530,6 +714,7 @@ async def get_queue_stats(current_user: User = Depends(require_permission(Permis
 async def list_tasks(
     status: Optional[str] = Query(None, description="筛选状态: pending/processing/completed/failed"),
     limit: int = Query(100, description="返回数量限制", le=1000),
+    fields: Optional[str] = Query(None, description="每个任务只返回指定字段（逗号分隔），未指定时返回全部字段"),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -580,6 +765,10 @@ async def list_tasks(
                 )
             tasks = [dict(row) for row in cursor.fetchall()]
 
+    wanted = parse_fields(fields)
+    if wanted is not None:
+        tasks = [project_fields(task, wanted) for task in tasks]
+
     return {"success": True, "count": len(tasks), "tasks": tasks, "can_view_all": can_view_all}
 
 
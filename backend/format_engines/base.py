@@ -156,6 +156,33 @@ class FormatEngineRegistry:
         suffix = Path(file_path).suffix.lower()
         return suffix in cls._extension_map
 
+    @classmethod
+    def is_ext_supported(cls, ext: str) -> bool:
+        """
+        检查扩展名是否被任何引擎支持（调用方已解析好扩展名时使用，避免重复解析路径）
+
+        Args:
+            ext: 小写的文件扩展名（如 ".fasta"）
+
+        Returns:
+            是否支持该扩展名
+        """
+        return ext in cls._extension_map
+
+    @classmethod
+    def get_engine_by_ext(cls, ext: str) -> Optional[FormatEngine]:
+        """
+        根据已解析的扩展名获取引擎（避免重复解析路径）
+
+        Args:
+            ext: 小写的文件扩展名（如 ".fasta"）
+
+        Returns:
+            格式引擎实例，如果不支持该扩展名则返回 None
+        """
+        format_name = cls._extension_map.get(ext)
+        return cls._engines.get(format_name) if format_name else None
+
     @classmethod
     def list_engines(cls) -> List[Dict]:
         """
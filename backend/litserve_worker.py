@@ -13,11 +13,22 @@ import json
 import sys
 import time
 import threading
+import queue
 import signal
 import atexit
+import gc
+import re
+import shutil
 from pathlib import Path
-from typing import Optional
-import multiprocessing
+from typing import List, Optional, Tuple, Union
+import itertools
+import socket
+import uuid
+import random
+import statistics
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 
 # Fix litserve MCP compatibility with mcp>=1.1.0
 # Completely disable LitServe's internal MCP to avoid conflicts with our standalone MCP Server
@@ -92,6 +103,139 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from task_db import TaskDB
 from output_normalizer import normalize_output
+from utils.db_watcher import start_db_watcher
+from utils.cpu_affinity import pin_worker_cpus, pin_to_gpu_numa_node
+from utils.office_converter import OfficeServer, UNO_AVAILABLE
+from utils.worker_metrics import PollMetrics
+
+# 数据库监听生效时，空闲等待的兜底超时（秒），防止遗漏事件
+DB_WATCHER_FALLBACK_INTERVAL = 5.0
+
+# 自适应轮询：连续空轮询时的间隔放大倍数和随机抖动比例
+POLL_BACKOFF_FACTOR = 1.5
+POLL_JITTER = 0.2
+
+# 任务拉取指标日志的输出间隔（秒）
+POLL_METRICS_LOG_INTERVAL = 60.0
+
+# 慢 Worker 检测：保留最近这么多个任务的每页耗时，窗口填满后每处理这么多个任务与其他 Worker 比较一次
+WORKER_LATENCY_WINDOW = 20
+
+# 按单页计耗时的图片扩展名（PDF 按实际页数归一化，其他类型不参与慢 Worker 检测）
+LATENCY_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tif", ".webp")
+
+# --devices / CUDA_VISIBLE_DEVICES 格式：逗号分隔的整数（允许空白）
+DEVICES_PATTERN = re.compile(r"\s*\d+\s*(?:,\s*\d+\s*)*")
+
+# 启动时探测 VLLM API 可用性的超时时间（秒）
+VLLM_PROBE_TIMEOUT = 1.0
+
+# 父任务选项 LRU 缓存容量
+PARENT_OPTIONS_CACHE_SIZE = 32
+
+# 合并子任务结果时的并行读取线程数上限
+MERGE_READ_WORKERS = 16
+
+# 后处理（规范化 + 状态提交）最多积压的任务数，达到上限时 Worker 暂停认领新任务
+POST_PROCESS_MAX_PENDING = 4
+
+# 健康检查中显存信息的缓存时间（秒）
+HEALTH_VRAM_CACHE_TTL = 2.0
+
+
+# 启动器关闭状态（信号处理器与 atexit 共用，保证 teardown 只执行一次）
+_shutdown_state = {"started": False}
+_shutdown_lock = threading.Lock()
+
+# 任务选项名 → PDFWatermarkHandler.remove_watermark 参数名
+WATERMARK_OPTION_TO_KWARG = {
+    # 通用参数
+    "auto_detect": "auto_detect",
+    "force_scanned": "force_scanned",
+    # 可编辑 PDF 参数
+    "remove_text": "remove_text",
+    "remove_images": "remove_images",
+    "remove_annotations": "remove_annotations",
+    "watermark_keywords": "keywords",
+    # 扫描件 PDF 参数
+    "watermark_dpi": "dpi",
+    "watermark_conf_threshold": "conf_threshold",
+    "watermark_dilation": "dilation",
+}
+
+
+def _is_cuda_oom(error: BaseException) -> bool:
+    """判断异常是否为 CUDA 显存不足（torch.cuda.OutOfMemoryError 是 RuntimeError 的子类）"""
+    return type(error).__name__ == "OutOfMemoryError" or "CUDA out of memory" in str(error)
+
+
+def _detect_cuda_devices() -> int:
+    """
+    检测 CUDA 设备数量，不导入 torch、不初始化 CUDA
+
+    依次尝试：/proc/driver/nvidia/gpus（每块 GPU 一个目录）→ nvidia-smi -L → torch（仅前两者都不可用时）
+    """
+    try:
+        return len(os.listdir("/proc/driver/nvidia/gpus"))
+    except OSError:
+        pass
+
+    if shutil.which("nvidia-smi"):
+        return check_cuda_with_nvidia_smi()
+
+    try:
+        import torch
+
+        return torch.cuda.device_count() if torch.cuda.is_available() else 0
+    except Exception as e:
+        logger.warning(f"⚠️  Failed to detect CUDA devices: {e}")
+        return 0
+
+
+def _parse_devices(raw: str) -> Optional[List[int]]:
+    """解析逗号分隔的设备列表（如 "0,1,2"），格式无效时返回 None"""
+    if not DEVICES_PATTERN.fullmatch(raw):
+        return None
+    return [int(d) for d in raw.split(",")]
+
+
+def _probe_vllm_endpoints(urls: List[str]) -> List[str]:
+    """
+    并发探测 VLLM API（GET {url}/models），返回可用的 API 列表
+
+    启动时过滤掉不可达的 API，避免分配到该 API 的 Worker 在首个任务才失败。
+    aiohttp 不可用时不探测，原样返回
+    """
+    try:
+        import asyncio
+        import aiohttp
+    except ImportError:
+        return urls
+
+    async def _probe(session, url: str) -> bool:
+        try:
+            async with session.get(f"{url.rstrip('/')}/models") as resp:
+                return resp.status < 500
+        except Exception as e:
+            logger.warning(f"⚠️  VLLM API unreachable, skipping: {url} ({type(e).__name__})")
+            return False
+
+    async def _probe_all() -> List[bool]:
+        timeout = aiohttp.ClientTimeout(total=VLLM_PROBE_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            return await asyncio.gather(*(_probe(session, url) for url in urls))
+
+    return [url for url, ok in zip(urls, asyncio.run(_probe_all())) if ok]
+
+
+def _link_or_write(source: Path, target: Path, data: bytes):
+    """将 target 创建为 source 的硬链接（仅一次元数据操作），跨文件系统等失败时回退为写入 data"""
+    try:
+        target.unlink(missing_ok=True)
+        os.link(source, target)
+    except OSError:
+        target.write_bytes(data)
+
 
 # 延迟导入 MinerU，避免过早初始化 CUDA
 # MinerU 会在 setup() 设置 CUDA_VISIBLE_DEVICES 后再导入
@@ -101,13 +245,9 @@ from output_normalizer import normalize_output
 # 导入 importlib 用于检查模块可用性
 import importlib.util
 
-# 尝试导入 markitdown
-try:
-    from markitdown import MarkItDown
-
-    MARKITDOWN_AVAILABLE = True
-except ImportError:
-    MARKITDOWN_AVAILABLE = False
+# 检查 markitdown 是否可用（不要导入，启动器进程不需要；在 Worker setup() 中导入）
+MARKITDOWN_AVAILABLE = importlib.util.find_spec("markitdown") is not None
+if not MARKITDOWN_AVAILABLE:
     logger.warning("⚠️  markitdown not available, Office format parsing will be disabled")
 
 # 检查 PaddleOCR-VL 是否可用（不要导入，避免初始化 CUDA）
@@ -167,6 +307,58 @@ except ImportError as e:
     FORMAT_ENGINES_AVAILABLE = False
     logger.info(f"ℹ️  Format engines not available (optional): {e}")
 
+# 尝试导入 orjson（C 实现的 JSON 序列化，大型结果 JSON 写入更快）
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson 不接受 NaN/Infinity 字面量（json.dump 默认会写出），序列化时还会把非有限浮点数写成 null；
+# 子任务结果可能包含这些字面量时改用标准库读写，保持与原文件一致
+_NONFINITE_LITERALS = (b"NaN", b"Infinity")
+
+
+def _has_nonfinite_literals(raw: bytes) -> bool:
+    """JSON 原文是否可能包含 NaN/Infinity（字符串中出现同样字样也会命中，只影响速度不影响正确性）"""
+    return any(literal in raw for literal in _NONFINITE_LITERALS)
+
+
+def _dump_json_bytes(data, use_orjson: bool = True) -> bytes:
+    """序列化为带缩进的 UTF-8 JSON（保留非 ASCII 字符）"""
+    if use_orjson and ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _load_json_bytes(raw: bytes, use_orjson: bool = True):
+    """解析 JSON"""
+    if use_orjson and ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@dataclass(frozen=True, slots=True)
+class WorkerEnvConfig:
+    """启动器环境变量配置（进程启动时读取一次，命令行未指定时作为默认值）"""
+
+    cuda_visible_devices: Optional[str] = None
+    worker_gpus: Optional[str] = None
+    worker_port: Optional[str] = None
+    output_path: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "WorkerEnvConfig":
+        """从环境变量加载配置"""
+        env = dict(os.environ)
+        return cls(
+            cuda_visible_devices=env.get("CUDA_VISIBLE_DEVICES"),
+            worker_gpus=env.get("WORKER_GPUS"),
+            worker_port=env.get("WORKER_PORT"),
+            output_path=env.get("OUTPUT_PATH"),
+        )
+
 
 class MinerUWorkerAPI(ls.LitAPI):
     def __init__(
@@ -176,6 +368,10 @@ class MinerUWorkerAPI(ls.LitAPI):
         poll_interval=0.5,
         enable_worker_loop=True,
         paddleocr_vl_vllm_engine_enabled=False,
+        expected_workers=1,
+        workers_per_device=1,
+        max_poll_interval=10.0,
+        device_ids=None,
     ):
         """
         初始化 API：直接在这里接收所有需要的参数
@@ -185,12 +381,60 @@ class MinerUWorkerAPI(ls.LitAPI):
         project_root = Path(__file__).parent.parent
         default_output = project_root / "data" / "output"
         self.output_dir = output_dir or os.getenv("OUTPUT_PATH", str(default_output))
-        self.poll_interval = poll_interval
+        self.poll_interval = poll_interval  # 最小轮询间隔（拉取到任务后重置为此值）
+        self.max_poll_interval = max(poll_interval, max_poll_interval)  # 连续空轮询时退避的上限
         self.enable_worker_loop = enable_worker_loop
         self.paddleocr_vl_vllm_engine_enabled = paddleocr_vl_vllm_engine_enabled
         self.paddleocr_vl_vllm_api_list = paddleocr_vl_vllm_api_list or []
-        ctx = multiprocessing.get_context("spawn")
-        self._global_worker_counter = ctx.Value("i", 0)
+        self.expected_workers = expected_workers  # Worker 总数（devices × workers_per_device），用于 CPU 核心划分
+        self.workers_per_device = max(1, workers_per_device)  # 同一 GPU 上的 Worker 数量，用于划分显存
+        self.device_ids = list(device_ids) if device_ids else None  # --devices 指定的 GPU 列表（None 表示 0..N-1）
+        # 本次启动的唯一标识，用于 Worker 在同一 GPU 上认领槽位（区分同一主机上的多个启动器）
+        self._launch_id = uuid.uuid4().hex
+        self._slot_socket = None
+
+    def _resolve_worker_index(self, device) -> int:
+        """
+        确定 Worker 全局序号：设备位置 × workers_per_device + 设备内槽位
+
+        设备位置由 device 确定；设备内槽位通过绑定 Linux 抽象命名空间的 Unix socket 认领
+        （进程退出时由内核自动释放），与 LitServe 内部 pickle/复制 LitAPI 的次数和顺序无关
+        """
+        device_str = str(device)
+        device_pos = 0
+        if ":" in device_str:
+            gpu_id = int(device_str.split(":")[-1])
+            device_pos = self.device_ids.index(gpu_id) if self.device_ids and gpu_id in self.device_ids else gpu_id
+
+        slot = None
+        # 不支持 Unix socket 的平台（Windows）无法认领槽位，按下方的回退处理
+        for candidate in range(self.workers_per_device if hasattr(socket, "AF_UNIX") else 0):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.bind(f"\0tianshu-worker-{self._launch_id}-{device_pos}-{candidate}")
+            except OSError:
+                # 槽位已被同一设备上的其他 Worker 占用（或平台不支持抽象命名空间）
+                sock.close()
+                continue
+            self._slot_socket = sock  # 进程存活期间持有
+            slot = candidate
+            break
+
+        if slot is None:
+            logger.error(
+                f"❌ [Init] Could not claim a worker slot on {device} "
+                f"(workers_per_device={self.workers_per_device}), falling back to slot 0: "
+                "CPU pinning and VLLM API assignment may overlap with another worker"
+            )
+            slot = 0
+
+        index = device_pos * self.workers_per_device + slot
+        if index >= self.expected_workers:
+            logger.error(
+                f"❌ [Init] Worker index {index} on {device} is out of range (expected {self.expected_workers} workers): "
+                "CPU pinning and VLLM API assignment may overlap with another worker"
+            )
+        return index
 
     def setup(self, device):
         """
@@ -200,9 +444,18 @@ class MinerUWorkerAPI(ls.LitAPI):
             device: 设备 ID (cuda:0, cuda:1, cpu 等)
         """
         ## 配置每个 Worker 的全局索引并尝试性分配self.paddleocr_vl_vllm_api
-        with self._global_worker_counter.get_lock():
-            my_global_index = self._global_worker_counter.value
-            self._global_worker_counter.value += 1
+        # 外部编排为每个启动器只运行一个 Worker 时，可通过 TIANSHU_WORKER_INDEX 显式指定序号；
+        # 同一启动器内有多个 Worker 时该变量对所有 Worker 相同，因此忽略，按设备和槽位计算
+        env_worker_index = os.getenv("TIANSHU_WORKER_INDEX")
+        if env_worker_index and self.expected_workers == 1:
+            my_global_index = int(env_worker_index)
+        else:
+            if env_worker_index:
+                logger.warning(
+                    f"⚠️  TIANSHU_WORKER_INDEX={env_worker_index} ignored: "
+                    f"it is shared by all {self.expected_workers} workers of this launcher"
+                )
+            my_global_index = self._resolve_worker_index(device)
         logger.info(f"🔢 [Init] I am Global Worker #{my_global_index} (on {device})")
         if self.paddleocr_vl_vllm_engine_enabled and len(self.paddleocr_vl_vllm_api_list) > 0:
             assigned_api = self.paddleocr_vl_vllm_api_list[my_global_index % len(self.paddleocr_vl_vllm_api_list)]
@@ -226,7 +479,25 @@ class MinerUWorkerAPI(ls.LitAPI):
             logger.info(f"🎯 [GPU Isolation] Set CUDA_VISIBLE_DEVICES={gpu_id} (Physical GPU {gpu_id} → Logical GPU 0)")
             logger.info("🎯 [GPU Isolation] Set MINERU_DEVICE_MODE=cuda:0")
 
-        import socket
+        # 可选：将 Worker 绑定到其 GPU 所在的 NUMA 节点（多路服务器，必须在导入 torch 之前）
+        if "cuda:" in str(device) and os.getenv("WORKER_NUMA_AFFINITY", "false").lower() == "true":
+            numa_cpus = pin_to_gpu_numa_node(int(str(device).split(":")[-1]), self.expected_workers)
+            if numa_cpus:
+                logger.info(
+                    f"📌 [NUMA Affinity] Worker #{my_global_index} bound to {len(numa_cpus)} GPU-local cores "
+                    f"(OMP_NUM_THREADS={os.environ.get('OMP_NUM_THREADS')})"
+                )
+            else:
+                logger.info("ℹ️  [NUMA Affinity] GPU NUMA node unknown, skipping")
+
+        # 可选：将 Worker 绑定到独占的 CPU 核心（必须在导入 torch/MinerU 之前，线程数设置才生效）
+        if os.getenv("WORKER_CPU_AFFINITY", "false").lower() == "true":
+            cpus = pin_worker_cpus(my_global_index, self.expected_workers)
+            if cpus:
+                logger.info(
+                    f"📌 [CPU Affinity] Worker #{my_global_index} pinned to {len(cpus)} cores: {cpus} "
+                    f"(OMP_NUM_THREADS={os.environ.get('OMP_NUM_THREADS')})"
+                )
 
         # 配置模型下载源（必须在 MinerU 初始化之前）
         # 从环境变量 MODEL_DOWNLOAD_SOURCE 读取配置
@@ -278,7 +549,7 @@ class MinerUWorkerAPI(ls.LitAPI):
         default_output_path = project_root / "data" / "output"
         default_output = os.getenv("OUTPUT_PATH", str(default_output_path))
         self.output_dir = getattr(self.__class__, "_output_dir", default_output)
-        self.poll_interval = getattr(self.__class__, "_poll_interval", 0.5)
+        self.poll_interval = getattr(self.__class__, "_poll_interval", self.poll_interval)
         self.enable_worker_loop = getattr(self.__class__, "_enable_worker_loop", True)
 
         # ============================================================================
@@ -294,8 +565,17 @@ class MinerUWorkerAPI(ls.LitAPI):
                 try:
                     # 注意：get_vram 需要传入设备字符串（如 "cuda:0"）
                     vram = round(get_vram(device_mode))
-                    os.environ["MINERU_VIRTUAL_VRAM_SIZE"] = str(vram)
-                    logger.info(f"🎮 [MinerU VRAM] Detected: {vram}GB")
+                    if self.workers_per_device > 1 and device_mode.startswith("cuda"):
+                        # 多个 Worker 共享同一张卡：按 Worker 数量均分显存（预留 1GB 给 CUDA 上下文）
+                        vram_per_worker = max(1, vram // self.workers_per_device - 1)
+                        os.environ["MINERU_VIRTUAL_VRAM_SIZE"] = str(vram_per_worker)
+                        logger.info(
+                            f"🎮 [MinerU VRAM] Detected: {vram}GB, shared by {self.workers_per_device} workers "
+                            f"-> {vram_per_worker}GB per worker"
+                        )
+                    else:
+                        os.environ["MINERU_VIRTUAL_VRAM_SIZE"] = str(vram)
+                        logger.info(f"🎮 [MinerU VRAM] Detected: {vram}GB")
                 except Exception as e:
                     os.environ["MINERU_VIRTUAL_VRAM_SIZE"] = "8"  # 默认值
                     logger.warning(f"⚠️  Failed to detect VRAM, using default: 8GB ({e})")
@@ -317,13 +597,23 @@ class MinerUWorkerAPI(ls.LitAPI):
                     logger.info(f"   ✅ SUCCESS: Process isolated to 1 GPU (physical GPU {visible_devices})")
                 else:
                     logger.warning(f"   ⚠️  WARNING: Expected 1 GPU but found {device_count}")
+
+                # 多个 Worker 共享同一张卡时，限制 PyTorch 缓存分配器可用的显存比例，避免互相挤占导致 OOM
+                if self.workers_per_device > 1 and "cuda" in str(device):
+                    memory_fraction = 1.0 / self.workers_per_device
+                    torch.cuda.set_per_process_memory_fraction(memory_fraction, 0)
+                    logger.info(f"   🎮 Per-process GPU memory fraction: {memory_fraction:.2f}")
             else:
                 logger.warning("⚠️  CUDA not available")
         except Exception as e:
             logger.warning(f"⚠️  Failed to verify PyTorch CUDA: {e}")
 
         # 创建输出目录
-        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        self._output_root = Path(self.output_dir)
+        self._output_root.mkdir(parents=True, exist_ok=True)
+        # PDF 拆分分片根目录（启动时创建一次，拆分时只需创建任务子目录）
+        self._splits_root = self._output_root / "splits"
+        self._splits_root.mkdir(exist_ok=True)
 
         # 初始化任务数据库（从环境变量读取，兼容 Docker 和本地）
         db_path_env = os.getenv("DATABASE_PATH")
@@ -360,14 +650,65 @@ class MinerUWorkerAPI(ls.LitAPI):
         self.running = True
         self.current_task_id = None
 
+        # 中间文件后台清理线程
+        self._gc_queue = queue.Queue()
+        self._janitor_thread = threading.Thread(target=self._janitor_loop, daemon=True, name="janitor")
+        self._janitor_thread.start()
+
+        # 下一个任务的预取线程（与当前任务的后处理重叠）
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-prefetch")
+        self._prefetch_future = None
+
+        # 后处理与下一个任务的引擎计算重叠执行：
+        # 规范化线程池执行输出规范化（文件整理、图片上传）；
+        # 提交线程按顺序等待规范化结果、提交任务状态并执行父任务合并。
+        # 两者使用独立的线程池，耗时的合并不会占用规范化线程，提交线程等待规范化也不会死锁
+        self._normalize_exec = ThreadPoolExecutor(max_workers=2, thread_name_prefix="task-normalize")
+        self._post_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-finalize")
+        self._post_slots = threading.BoundedSemaphore(POST_PROCESS_MAX_PENDING)
+
+        # 父任务选项缓存（子任务处理时合并父任务选项）
+        self._parent_options_cache = OrderedDict()
+
+        # 显存清理间隔（任务数）
+        self.clean_memory_every = max(1, int(os.getenv("CLEAN_MEMORY_EVERY", "50")))
+        self._tasks_since_cleanup = 0
+
+        # 慢 Worker 检测：每页平均耗时超过其他 Worker 中位数的 N 倍时释放显存缓存（0 表示禁用）
+        self.slow_latency_factor = float(os.getenv("WORKER_SLOW_LATENCY_FACTOR", "2"))
+        self._task_latencies = deque(maxlen=WORKER_LATENCY_WINDOW)  # 最近任务的每页引擎耗时（秒）
+        self._tasks_since_latency_check = 0
+
+        # 新任务唤醒事件：数据库位于本地文件系统时由 inotify 监听线程触发，否则退化为定时轮询
+        self._task_available = threading.Event()
+        self._idle_polls = 0  # 连续空轮询次数（用于计算退避间隔）
+
+        # Redis 队列可用时，认领任务本身阻塞等待（BZPOPMIN），空闲时无需再轮询等待
+        self._blocking_queue = self.task_db.has_blocking_queue()
+        # Redis 队列会将阻塞时间限制在 socket_timeout 以内，这里保存实际生效的值
+        self.redis_block_timeout = self.task_db.clamp_block_timeout(float(os.getenv("REDIS_BLOCK_TIMEOUT", "4")))
+        self._db_watcher_enabled = self.enable_worker_loop and start_db_watcher(db_path_str, self._task_available)
+
         # 生成唯一的 worker_id: tianshu-{hostname}-{device}-{pid}
         hostname = socket.gethostname()
         pid = os.getpid()
         self.worker_id = f"tianshu-{hostname}-{device}-{pid}"
         # 子进程（setup 中）：
 
+        # 任务拉取指标（ENABLE_METRICS=true 时每个 Worker 在 WORKER_METRICS_PORT + 序号 上暴露 Prometheus 指标）
+        self._poll_metrics = PollMetrics(worker=str(my_global_index), device=str(device))
+        if os.getenv("ENABLE_METRICS", "false").lower() == "true":
+            self._poll_metrics.start_exporter(int(os.getenv("WORKER_METRICS_PORT", "9090")) + my_global_index)
+
         # 初始化可选的处理引擎
-        self.markitdown = MarkItDown() if MARKITDOWN_AVAILABLE else None
+        self.markitdown = None
+        if MARKITDOWN_AVAILABLE:
+            try:
+                from markitdown import MarkItDown
+
+                self.markitdown = MarkItDown()
+            except ImportError as e:
+                logger.warning(f"⚠️  Failed to import markitdown, Office format parsing will be disabled: {e}")
         self.mineru_pipeline_engine = None  # 延迟加载
         self.paddleocr_vl_engine = None  # 延迟加载
         self.paddleocr_vl_vllm_engine = None  # 延迟加载
@@ -375,6 +716,19 @@ class MinerUWorkerAPI(ls.LitAPI):
         self.video_engine = None  # 延迟加载
         self.watermark_handler = None  # 延迟加载
 
+        # 常驻 LibreOffice 转换服务（首次 Office 转 PDF 时启动）
+        office_server_enabled = os.getenv("OFFICE_SERVER_ENABLED", "true").lower() == "true"
+        self._office_server = OfficeServer() if office_server_enabled and UNO_AVAILABLE else None
+
+        # 可预加载的引擎（名称 → 加载方法），由 PRELOAD_ENGINES 环境变量选择
+        self._engine_loaders = {
+            "mineru": self._ensure_mineru,
+            "paddleocr_vl": self._ensure_paddleocr_vl,
+            "paddleocr_vl_vllm": self._ensure_paddleocr_vl_vllm,
+            "sensevoice": self._ensure_sensevoice,
+            "video": self._ensure_video,
+        }
+
         logger.info("=" * 60)
         logger.info(f"🚀 Worker Setup: {self.worker_id}")
         logger.info("=" * 60)
@@ -383,12 +737,15 @@ class MinerUWorkerAPI(ls.LitAPI):
         logger.info(f"🗃️  Database: {db_path}")
         logger.info(f"🔄 Worker Loop: {'Enabled' if self.enable_worker_loop else 'Disabled'}")
         if self.enable_worker_loop:
-            logger.info(f"⏱️  Poll Interval: {self.poll_interval}s")
+            logger.info(f"⏱️  Poll Interval: {self.poll_interval}s ~ {self.max_poll_interval}s (adaptive)")
+            logger.info(
+                f"👀 DB Watcher: {'Enabled (inotify)' if self._db_watcher_enabled else 'Disabled (timed polling)'}"
+            )
         logger.info("")
 
         # 打印可用的引擎
         logger.info("📦 Available Engines:")
-        logger.info(f"   • MarkItDown: {'✅' if MARKITDOWN_AVAILABLE else '❌'}")
+        logger.info(f"   • MarkItDown: {'✅' if self.markitdown else '❌'}")
         logger.info(f"   • MinerU Pipeline: {'✅' if MINERU_PIPELINE_AVAILABLE else '❌'}")
         logger.info(f"   • PaddleOCR-VL: {'✅' if PADDLEOCR_VL_AVAILABLE else '❌'}")
         logger.info(f"   • SenseVoice: {'✅' if SENSEVOICE_AVAILABLE else '❌'}")
@@ -421,6 +778,9 @@ class MinerUWorkerAPI(ls.LitAPI):
             physical_gpu = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
             logger.info(f"   Physical GPU: {physical_gpu}")
 
+        # 预加载引擎（在 Worker 循环启动前完成，避免与首个任务并发加载同一引擎）
+        self._preload_engines()
+
         # Worker 启动时恢复卡住的 processing 任务
         # 使用较短的超时（10分钟），因为正常任务不会卡住这么久不更新状态
         try:
@@ -460,15 +820,31 @@ class MinerUWorkerAPI(ls.LitAPI):
         loop_count = 0
         last_stats_log = 0
         stats_log_interval = 20  # 每20次循环输出一次统计信息（约10秒）
+        last_metrics_log = time.monotonic()
 
         while self.running:
             try:
                 loop_count += 1
 
-                # 拉取任务（原子操作，防止重复处理）
-                task = self.task_db.get_next_task(worker_id=self.worker_id)
+                # 拉取任务（原子操作，防止重复处理；优先使用上一个任务后处理阶段预取的结果）
+                claim_started = time.monotonic()
+                task = self._claim_next_task()
+                self._poll_metrics.record(time.monotonic() - claim_started, task is not None)
+
+                # 定期输出拉取耗时与空轮询比例
+                if claim_started - last_metrics_log >= POLL_METRICS_LOG_INTERVAL:
+                    summary = self._poll_metrics.summary()
+                    if summary:
+                        logger.info(
+                            f"📈 {self.worker_id} polls: {summary['polls']}, "
+                            f"p50 {summary['p50'] * 1000:.1f}ms, p95 {summary['p95'] * 1000:.1f}ms, "
+                            f"empty {summary['empty_ratio']:.0%}"
+                        )
+                    last_metrics_log = claim_started
 
                 if task:
+                    # 拉取到任务，轮询间隔重置为最小值
+                    self._idle_polls = 0
                     task_id = task["task_id"]
                     self.current_task_id = task_id
                     logger.info(
@@ -479,6 +855,7 @@ class MinerUWorkerAPI(ls.LitAPI):
                         # 处理任务
                         self._process_task(task)
                         logger.info(f"✅ {self.worker_id} completed task: {task_id}")
+                        self._check_worker_latency()
                     except Exception as e:
                         logger.error(f"❌ {self.worker_id} failed task {task_id}: {e}")
                         logger.exception(e)
@@ -510,13 +887,81 @@ class MinerUWorkerAPI(ls.LitAPI):
 
                         last_stats_log = loop_count
 
-                    time.sleep(self.poll_interval)
+                    # 阻塞式队列已在认领时等待过；若认领立即返回（如 Redis 连接异常），仍需等待，避免空转
+                    if not self._blocking_queue or time.monotonic() - claim_started < self.redis_block_timeout / 2:
+                        self._wait_for_task()
 
             except Exception as e:
                 logger.error(f"❌ Worker loop error (loop #{loop_count}): {e}")
                 logger.exception(e)
                 time.sleep(self.poll_interval)
 
+        # 退出前归还已预取但尚未处理的任务
+        self._release_prefetched_task()
+
+    def _prefetch_next_task(self):
+        """
+        预取下一个任务
+
+        在当前任务的引擎调用结束后、后处理（状态更新、合并、显存清理）期间，
+        由后台线程并行认领下一个任务，使数据库认领延迟与后处理重叠
+        """
+        if not self.enable_worker_loop or not self.running or self._prefetch_future is not None:
+            return
+        self._prefetch_future = self._prefetch_executor.submit(self.task_db.get_next_task, worker_id=self.worker_id)
+
+    def _claim_next_task(self) -> Optional[dict]:
+        """
+        获取下一个任务：存在预取结果时直接使用，否则从数据库认领
+
+        Returns:
+            任务字典，没有任务时返回 None
+        """
+        future, self._prefetch_future = self._prefetch_future, None
+        if future is None:
+            block_timeout = self.redis_block_timeout if self._blocking_queue else 1.0
+            return self.task_db.get_next_task(worker_id=self.worker_id, block_timeout=block_timeout)
+
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"❌ Failed to prefetch next task: {e}")
+            return None
+
+    def _release_prefetched_task(self):
+        """将已预取但未处理的任务归还队列（SQLite 重置为 pending，Redis 移回优先级队列），交由其他 Worker 处理"""
+        future, self._prefetch_future = self._prefetch_future, None
+        if future is None:
+            return
+
+        try:
+            task = future.result(timeout=5)
+        except Exception:
+            return
+
+        if task:
+            self.task_db.release_task(task["task_id"], self.worker_id)
+            logger.info(f"↩️  {self.worker_id} released prefetched task: {task['task_id']}")
+
+    def _wait_for_task(self):
+        """
+        空闲等待新任务
+
+        轮询间隔自适应：每次空轮询后间隔乘以 POLL_BACKOFF_FACTOR，直到 max_poll_interval，
+        拉取到任务后重置为 poll_interval；并加入 ±20% 随机抖动，避免多个 Worker 同时轮询数据库。
+        启用数据库监听时阻塞到数据库被写入（或兜底超时）
+        """
+        interval = min(self.max_poll_interval, self.poll_interval * POLL_BACKOFF_FACTOR**self._idle_polls)
+        if interval < self.max_poll_interval:
+            self._idle_polls += 1
+        timeout = interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+        if self._db_watcher_enabled:
+            timeout = max(timeout, DB_WATCHER_FALLBACK_INTERVAL)
+
+        if self._task_available.wait(timeout):
+            self._task_available.clear()
+
     def _process_task(self, task: dict):
         """
         处理单个任务
@@ -529,6 +974,13 @@ class MinerUWorkerAPI(ls.LitAPI):
         options = json.loads(task.get("options", "{}"))
         parent_task_id = task.get("parent_task_id")
 
+        # 子任务只保存分块信息，公共处理选项从父任务读取后合并
+        if parent_task_id:
+            options = {**self._get_parent_options(parent_task_id), **options}
+
+        # Office 转换生成的中间 PDF，任务结束后交给后台清理线程删除
+        converted_pdf_path = None
+
         try:
             # 根据 backend 选择处理方式（从 task 字段读取，不是从 options 读取）
             backend = task.get("backend", "auto")
@@ -547,6 +999,7 @@ class MinerUWorkerAPI(ls.LitAPI):
                     original_file_path = file_path
                     file_path = pdf_path
                     file_ext = ".pdf"
+                    converted_pdf_path = pdf_path
 
                     logger.info(f"✅ [Preprocessing] Office converted, continuing with PDF: {pdf_path}")
                     logger.info(f"   Original: {Path(original_file_path).name}")
@@ -575,121 +1028,88 @@ class MinerUWorkerAPI(ls.LitAPI):
                     # 继续使用原文件处理
 
             # 统一的引擎路由逻辑：优先使用用户指定的 backend，否则自动选择
-            result = None  # 初始化 result
-
-            # 1. 用户指定了音频引擎
-            if backend == "sensevoice":
-                if not SENSEVOICE_AVAILABLE:
-                    raise ValueError("SenseVoice engine is not available")
-                logger.info(f"🎤 Processing with SenseVoice: {file_path}")
-                result = self._process_audio(file_path, options)
-
-            # 3. 用户指定了视频引擎
-            elif backend == "video":
-                if not VIDEO_ENGINE_AVAILABLE:
-                    raise ValueError("Video processing engine is not available")
-                logger.info(f"🎬 Processing with video engine: {file_path}")
-                result = self._process_video(file_path, options)
-
-            # 4. 用户指定了 PaddleOCR-VL
-            elif backend == "paddleocr-vl":
-                if not PADDLEOCR_VL_AVAILABLE:
-                    raise ValueError("PaddleOCR-VL engine is not available")
-                logger.info(f"🔍 Processing with PaddleOCR-VL: {file_path}")
-                result = self._process_with_paddleocr_vl(file_path, options)
-
-            # 5. 用户指定了 PaddleOCR-VL-VLLM
-            elif backend == "paddleocr-vl-vllm":
-                if (
-                    not PADDLEOCR_VL_VLLM_AVAILABLE
-                    or not self.paddleocr_vl_vllm_engine_enabled
-                    or len(self.paddleocr_vl_vllm_api_list) == 0
-                ):
-                    raise ValueError("PaddleOCR-VL-VLLM engine is not available")
-                logger.info(f"🔍 Processing with PaddleOCR-VL-VLLM: {file_path}")
-                result = self._process_with_paddleocr_vl_vllm(file_path, options)
-            # 6. 用户指定了 MinerU Pipeline
-            elif backend == "pipeline":
-                if not MINERU_PIPELINE_AVAILABLE:
-                    raise ValueError("MinerU Pipeline engine is not available")
-                logger.info(f"🔧 Processing with MinerU Pipeline: {file_path}")
-                result = self._process_with_mineru(file_path, options)
-
-            # 7. auto 模式：根据文件类型自动选择引擎
-            elif backend == "auto":
-                # 7.1 检查是否是专业格式（FASTA, GenBank 等）
-                if FORMAT_ENGINES_AVAILABLE and FormatEngineRegistry.is_supported(file_path):
-                    logger.info(f"🧬 [Auto] Processing with format engine: {file_path}")
-                    result = self._process_with_format_engine(file_path, options)
-
-                # 7.2 检查是否是音频文件
-                elif file_ext in [".wav", ".mp3", ".flac", ".m4a", ".ogg"] and SENSEVOICE_AVAILABLE:
-                    logger.info(f"🎤 [Auto] Processing audio file: {file_path}")
-                    result = self._process_audio(file_path, options)
-
-                # 7.3 检查是否是视频文件
-                elif file_ext in [".mp4", ".avi", ".mkv", ".mov", ".flv", ".wmv"] and VIDEO_ENGINE_AVAILABLE:
-                    logger.info(f"🎬 [Auto] Processing video file: {file_path}")
-                    result = self._process_video(file_path, options)
-
-                # 7.4 默认使用 MinerU Pipeline 处理 PDF/图片
-                elif file_ext in [".pdf", ".png", ".jpg", ".jpeg"] and MINERU_PIPELINE_AVAILABLE:
-                    logger.info(f"🔧 [Auto] Processing with MinerU Pipeline: {file_path}")
-                    result = self._process_with_mineru(file_path, options)
-
-                # 7.5 兜底：Office 文档/文本/HTML 使用 MarkItDown（如果可用）
-                elif (
-                    file_ext in [".docx", ".xlsx", ".pptx", ".doc", ".xls", ".ppt", ".html", ".txt", ".csv"]
-                    and self.markitdown
-                ):
-                    logger.info(f"📄 [Auto] Processing Office/Text file with MarkItDown: {file_path}")
-                    result = self._process_with_markitdown(file_path)
+            route_started = time.monotonic()
+            try:
+                result = self._route_task(backend, file_path, file_ext, options)
+            except RuntimeError as e:
+                # 显存不足：释放缓存分配器中的空闲显存后重试一次
+                if "cuda" not in str(self.device).lower() or not _is_cuda_oom(e):
+                    raise
+                logger.warning(f"⚠️  CUDA out of memory, releasing cached memory and retrying: {task_id}")
+                self._release_gpu_memory()
+                result = self._route_task(backend, file_path, file_ext, options)
+
+            # 引擎调用已结束，后处理期间并行认领下一个任务
+            self._prefetch_next_task()
+
+            seconds_per_page = self._record_task_latency(time.monotonic() - route_started, file_path, file_ext, options)
+
+            # 定期清理显存（如果是 GPU）
+            # 每个任务后都调用 empty_cache 会同步 CUDA 流，并使下一个任务的分配绕过缓存分配器，
+            # 因此只每 CLEAN_MEMORY_EVERY 个任务清理一次
+            if "cuda" in str(self.device).lower():
+                self._tasks_since_cleanup += 1
+                if self._tasks_since_cleanup >= self.clean_memory_every:
+                    self._release_gpu_memory()
 
-                else:
-                    # 没有合适的处理器
-                    supported_formats = "PDF, PNG, JPG (MinerU/PaddleOCR), Audio (SenseVoice), Video, FASTA, GenBank"
-                    if self.markitdown:
-                        supported_formats += ", Office/Text (MarkItDown)"
-                    raise ValueError(
-                        f"Unsupported file type: file={file_path}, ext={file_ext}. "
-                        f"Supported formats: {supported_formats}"
+            # 输出规范化（文件整理、图片上传）与状态提交交给后处理线程，
+            # Worker 线程立即开始下一个任务，使文件系统工作与下一个任务的 GPU 计算重叠
+            # （手动拉取模式需要同步返回结果，直接在当前线程完成，失败时向上抛出）
+            if self.enable_worker_loop:
+                # 后处理积压达到上限时在此阻塞，避免持续认领新任务而后处理无限落后
+                self._post_slots.acquire()
+                try:
+                    future = self._post_exec.submit(
+                        self._finalize_task, task_id, parent_task_id, result, seconds_per_page=seconds_per_page
                     )
-
+                except BaseException:
+                    self._post_slots.release()
+                    raise
+                future.add_done_callback(lambda _: self._post_slots.release())
             else:
-                # 8. 尝试使用格式引擎（用户明确指定了 fasta, genbank 等）
-                if FORMAT_ENGINES_AVAILABLE:
-                    engine = FormatEngineRegistry.get_engine(backend)
-                    if engine is not None:
-                        logger.info(f"🧬 Processing with format engine: {backend}")
-                        result = self._process_with_format_engine(file_path, options, engine_name=backend)
-                    else:
-                        # 未知的 backend
-                        raise ValueError(
-                            f"Unknown backend: {backend}. "
-                            f"Supported backends: auto, pipeline, paddleocr-vl, sensevoice, video, fasta, genbank"
-                        )
-                else:
-                    # 格式引擎不可用
-                    raise ValueError(
-                        f"Unknown backend: {backend}. "
-                        f"Supported backends: auto, pipeline, paddleocr-vl, sensevoice, video"
-                    )
+                self._finalize_task(
+                    task_id, parent_task_id, result, raise_errors=True, seconds_per_page=seconds_per_page
+                )
 
-            # 检查 result 是否被正确赋值
-            if result is None:
-                raise ValueError(f"No result generated for backend: {backend}, file: {file_path}")
+        except Exception as e:
+            # 更新任务状态为失败
+            self._mark_task_failed(task_id, parent_task_id, f"{type(e).__name__}: {str(e)}")
+            raise
 
-            # 更新任务状态为完成
-            self.task_db.update_task_status(
-                task_id=task_id,
-                status="completed",
-                result_path=result["result_path"],
-                error_message=None,
-            )
+        finally:
+            if converted_pdf_path:
+                self._gc_queue.put(converted_pdf_path)
+
+    def _finalize_task(
+        self,
+        task_id: str,
+        parent_task_id: Optional[str],
+        result: dict,
+        raise_errors: bool = False,
+        seconds_per_page: Optional[float] = None,
+    ):
+        """
+        任务后处理（在提交线程中执行）：等待输出规范化完成，然后提交任务状态
+
+        Args:
+            task_id: 任务ID
+            parent_task_id: 父任务ID（非子任务为 None）
+            result: 引擎处理结果
+            raise_errors: 同步调用时为 True，失败直接抛出，由调用方标记任务失败；
+                否则在此标记任务失败
+            seconds_per_page: 引擎处理的每页耗时（页数未知时为 None），随完成状态一起写入数据库
+        """
+        try:
+            # 等待引擎提交的输出规范化完成（规范化失败视为任务失败）
+            normalize_future = result.pop("normalize_future", None)
+            if normalize_future is not None:
+                normalize_future.result()
 
-            # 如果是子任务,检查是否需要触发合并
             if parent_task_id:
-                parent_id_to_merge = self.task_db.on_child_task_completed(task_id)
+                # 子任务：在同一事务中更新状态和父任务完成计数，检查是否需要触发合并
+                parent_id_to_merge = self.task_db.complete_child_task(
+                    task_id, result["result_path"], seconds_per_page=seconds_per_page
+                )
 
                 if parent_id_to_merge:
                     # 所有子任务完成,执行合并
@@ -702,21 +1122,381 @@ class MinerUWorkerAPI(ls.LitAPI):
                         self.task_db.update_task_status(
                             parent_id_to_merge, "failed", error_message=f"Merge failed: {merge_error}"
                         )
+            else:
+                # 更新任务状态为完成
+                self.task_db.update_task_status(
+                    task_id=task_id,
+                    status="completed",
+                    result_path=result["result_path"],
+                    error_message=None,
+                    seconds_per_page=seconds_per_page,
+                )
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"❌ {self.worker_id} failed to finalize task {task_id}: {e}")
+            logger.exception(e)
+            self._mark_task_failed(task_id, parent_task_id, f"{type(e).__name__}: {str(e)}")
 
-            # 清理显存（如果是 GPU）
-            if "cuda" in str(self.device).lower():
-                clean_memory()
+    def _mark_task_failed(self, task_id: str, parent_task_id: Optional[str], error_msg: str):
+        """标记任务失败（子任务同时标记父任务失败）"""
+        if parent_task_id:
+            # 子任务失败：在同一事务中标记子任务和父任务失败
+            self.task_db.fail_child_task(task_id, error_msg)
+        else:
+            self.task_db.update_task_status(task_id=task_id, status="failed", result_path=None, error_message=error_msg)
+
+    def _route_task(self, backend: str, file_path: str, file_ext: str, options: dict) -> dict:
+        """
+        根据 backend 和文件类型选择引擎并处理文件
+
+        Returns:
+            dict: 引擎处理结果（包含 result_path、content）
+        """
+        # 统一的引擎路由逻辑：优先使用用户指定的 backend，否则自动选择
+        result = None  # 初始化 result
+
+        # 1. 用户指定了音频引擎
+        if backend == "sensevoice":
+            if not SENSEVOICE_AVAILABLE:
+                raise ValueError("SenseVoice engine is not available")
+            logger.info(f"🎤 Processing with SenseVoice: {file_path}")
+            result = self._process_audio(file_path, options)
+
+        # 3. 用户指定了视频引擎
+        elif backend == "video":
+            if not VIDEO_ENGINE_AVAILABLE:
+                raise ValueError("Video processing engine is not available")
+            logger.info(f"🎬 Processing with video engine: {file_path}")
+            result = self._process_video(file_path, options)
+
+        # 4. 用户指定了 PaddleOCR-VL
+        elif backend == "paddleocr-vl":
+            if not PADDLEOCR_VL_AVAILABLE:
+                raise ValueError("PaddleOCR-VL engine is not available")
+            logger.info(f"🔍 Processing with PaddleOCR-VL: {file_path}")
+            result = self._process_with_paddleocr_vl(file_path, options)
+
+        # 5. 用户指定了 PaddleOCR-VL-VLLM
+        elif backend == "paddleocr-vl-vllm":
+            if (
+                not PADDLEOCR_VL_VLLM_AVAILABLE
+                or not self.paddleocr_vl_vllm_engine_enabled
+                or len(self.paddleocr_vl_vllm_api_list) == 0
+            ):
+                raise ValueError("PaddleOCR-VL-VLLM engine is not available")
+            logger.info(f"🔍 Processing with PaddleOCR-VL-VLLM: {file_path}")
+            result = self._process_with_paddleocr_vl_vllm(file_path, options)
+        # 6. 用户指定了 MinerU Pipeline
+        elif backend == "pipeline":
+            if not MINERU_PIPELINE_AVAILABLE:
+                raise ValueError("MinerU Pipeline engine is not available")
+            logger.info(f"🔧 Processing with MinerU Pipeline: {file_path}")
+            result = self._process_with_mineru(file_path, options)
+
+        # 7. auto 模式：根据文件类型自动选择引擎
+        elif backend == "auto":
+            # 7.1 检查是否是专业格式（FASTA, GenBank 等）
+            if FORMAT_ENGINES_AVAILABLE and FormatEngineRegistry.is_ext_supported(file_ext):
+                logger.info(f"🧬 [Auto] Processing with format engine: {file_path}")
+                result = self._process_with_format_engine(
+                    file_path, options, engine=FormatEngineRegistry.get_engine_by_ext(file_ext)
+                )
+
+            # 7.2 检查是否是音频文件
+            elif file_ext in [".wav", ".mp3", ".flac", ".m4a", ".ogg"] and SENSEVOICE_AVAILABLE:
+                logger.info(f"🎤 [Auto] Processing audio file: {file_path}")
+                result = self._process_audio(file_path, options)
+
+            # 7.3 检查是否是视频文件
+            elif file_ext in [".mp4", ".avi", ".mkv", ".mov", ".flv", ".wmv"] and VIDEO_ENGINE_AVAILABLE:
+                logger.info(f"🎬 [Auto] Processing video file: {file_path}")
+                result = self._process_video(file_path, options)
+
+            # 7.4 默认使用 MinerU Pipeline 处理 PDF/图片
+            elif file_ext in [".pdf", ".png", ".jpg", ".jpeg"] and MINERU_PIPELINE_AVAILABLE:
+                logger.info(f"🔧 [Auto] Processing with MinerU Pipeline: {file_path}")
+                result = self._process_with_mineru(file_path, options)
+
+            # 7.5 兜底：Office 文档/文本/HTML 使用 MarkItDown（如果可用）
+            elif (
+                file_ext in [".docx", ".xlsx", ".pptx", ".doc", ".xls", ".ppt", ".html", ".txt", ".csv"]
+                and self.markitdown
+            ):
+                logger.info(f"📄 [Auto] Processing Office/Text file with MarkItDown: {file_path}")
+                result = self._process_with_markitdown(file_path)
+
+            else:
+                # 没有合适的处理器
+                supported_formats = "PDF, PNG, JPG (MinerU/PaddleOCR), Audio (SenseVoice), Video, FASTA, GenBank"
+                if self.markitdown:
+                    supported_formats += ", Office/Text (MarkItDown)"
+                raise ValueError(
+                    f"Unsupported file type: file={file_path}, ext={file_ext}. "
+                    f"Supported formats: {supported_formats}"
+                )
+
+        else:
+            # 8. 尝试使用格式引擎（用户明确指定了 fasta, genbank 等）
+            if FORMAT_ENGINES_AVAILABLE:
+                engine = FormatEngineRegistry.get_engine(backend)
+                if engine is not None:
+                    logger.info(f"🧬 Processing with format engine: {backend}")
+                    result = self._process_with_format_engine(file_path, options, engine_name=backend, engine=engine)
+                else:
+                    # 未知的 backend
+                    raise ValueError(
+                        f"Unknown backend: {backend}. "
+                        f"Supported backends: auto, pipeline, paddleocr-vl, sensevoice, video, fasta, genbank"
+                    )
+            else:
+                # 格式引擎不可用
+                raise ValueError(
+                    f"Unknown backend: {backend}. "
+                    f"Supported backends: auto, pipeline, paddleocr-vl, sensevoice, video"
+                )
+
+        # 检查 result 是否被正确赋值
+        if result is None:
+            raise ValueError(f"No result generated for backend: {backend}, file: {file_path}")
+
+        return result
+
+    def _record_task_latency(self, seconds: float, file_path: str, file_ext: str, options: dict) -> Optional[float]:
+        """
+        记录引擎处理耗时（按页归一化），供慢 Worker 检测使用
+
+        Returns:
+            每页耗时（秒），页数未知（音视频、Office 等）时返回 None，不参与检测
+        """
+        chunk_info = options.get("chunk_info")
+        if chunk_info:
+            page_count = chunk_info.get("page_count")
+        elif file_ext in LATENCY_IMAGE_EXTENSIONS:
+            page_count = 1
+        elif file_ext == ".pdf":
+            from utils.pdf_utils import get_pdf_page_count
+
+            try:
+                page_count = get_pdf_page_count(Path(file_path))
+            except Exception:
+                page_count = None
+        else:
+            page_count = None
+
+        if not page_count:
+            return None
+        seconds_per_page = seconds / page_count
+        self._task_latencies.append(seconds_per_page)
+        return seconds_per_page
+
+    def _check_worker_latency(self):
+        """
+        慢 Worker 检测（最近 WORKER_LATENCY_WINDOW 个任务的耗时窗口填满后，每 WORKER_LATENCY_WINDOW 个任务执行一次）
+
+        Worker 长时间运行后可能因显存碎片、模型状态泄漏等原因变慢。
+        最近任务的每页平均耗时超过其他 Worker 中位数的 slow_latency_factor 倍时：
+        释放显存缓存后继续运行（LitServe 不会重启退出的推理 Worker，且会因此关闭整个服务，故不退出进程）
+        """
+        if self.slow_latency_factor <= 0 or self.expected_workers < 2:
+            return
+
+        self._tasks_since_latency_check += 1
+        if len(self._task_latencies) < WORKER_LATENCY_WINDOW or self._tasks_since_latency_check < WORKER_LATENCY_WINDOW:
+            return
+        self._tasks_since_latency_check = 0
+
+        try:
+            stats = self.task_db.get_worker_latency_stats(limit=WORKER_LATENCY_WINDOW * self.expected_workers)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to get worker latency stats: {e}")
+            return
+
+        # 本 Worker 使用进程内记录的耗时，其他 Worker 的耗时来自数据库
+        stats.pop(self.worker_id, None)
+        others = [s["avg_seconds"] for s in stats.values() if s["count"] >= WORKER_LATENCY_WINDOW // 4]
+        if not others:
+            return
+
+        own_mean = statistics.mean(self._task_latencies)
+        pool_median = statistics.median(others)
+        if own_mean <= self.slow_latency_factor * pool_median:
+            return
+
+        logger.warning(
+            f"🐢 {self.worker_id} is slow: avg {own_mean:.2f}s/page over {len(self._task_latencies)} tasks, "
+            f"pool median {pool_median:.2f}s/page"
+        )
+        if "cuda" in str(self.device).lower():
+            self._release_gpu_memory()
+
+    def _release_gpu_memory(self):
+        """回收 Python 对象并释放 PyTorch 缓存分配器中的空闲显存"""
+        gc.collect()
+        clean_memory()
+        self._tasks_since_cleanup = 0
+
+    def _janitor_loop(self):
+        """
+        后台清理线程：删除任务处理完成后不再需要的中间文件
+
+        清理不占用任务处理的关键路径，收到 None 时退出
+        """
+        while True:
+            path = self._gc_queue.get()
+            if path is None:
+                return
+            try:
+                Path(path).unlink(missing_ok=True)
+                logger.debug(f"🗑️  Deleted intermediate file: {path}")
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to delete intermediate file {path}: {e}")
+
+    def _get_parent_options(self, parent_task_id: str) -> dict:
+        """
+        获取父任务的处理选项（LRU 缓存，同一父任务的所有子任务只读取、解析一次）
+
+        Args:
+            parent_task_id: 父任务ID
+
+        Returns:
+            父任务选项字典（父任务不存在时返回空字典）
+        """
+        cached = self._parent_options_cache.get(parent_task_id)
+        if cached is not None:
+            self._parent_options_cache.move_to_end(parent_task_id)
+            return cached
+
+        parent_task = self.task_db.get_task(parent_task_id)
+        parent_options = json.loads(parent_task.get("options") or "{}") if parent_task else {}
+
+        self._parent_options_cache[parent_task_id] = parent_options
+        if len(self._parent_options_cache) > PARENT_OPTIONS_CACHE_SIZE:
+            self._parent_options_cache.popitem(last=False)
+        return parent_options
+
+    def _preload_engines(self):
+        """
+        预加载 PRELOAD_ENGINES 中配置的引擎（逗号分隔，如 "mineru,paddleocr_vl,sensevoice"）
+
+        多个引擎在线程池中并行加载，使模型加载与 CUDA 上下文初始化在 setup() 阶段完成，
+        避免每个 Worker 的第一个任务承担数秒的冷启动延迟。
+        """
+        names = [n.strip() for n in os.getenv("PRELOAD_ENGINES", "").split(",") if n.strip()]
+        if not names:
+            return
+
+        loaders = {}
+        for name in names:
+            loader = self._engine_loaders.get(name)
+            if loader is None:
+                logger.warning(f"⚠️  Unknown engine in PRELOAD_ENGINES: {name}")
+                continue
+            if name.startswith("paddleocr_vl") and self.accelerator == "cpu":
+                logger.warning(f"⚠️  Skipping preload of {name}: requires GPU")
+                continue
+            loaders[name] = loader
+
+        if not loaders:
+            return
+
+        logger.info(f"🔥 Preloading engines: {', '.join(loaders)}")
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="engine-preload") as executor:
+            futures = {name: executor.submit(loader) for name, loader in loaders.items()}
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    # 预加载失败不影响 Worker 启动，首个任务会再次尝试加载
+                    logger.error(f"❌ Failed to preload engine {name}: {e}")
+
+        # 触发 cuBLAS 句柄创建与内核加载，避免首个真实任务承担该开销
+        if self.accelerator == "cuda":
+            try:
+                import torch
+
+                x = torch.ones((8, 8), device="cuda:0")
+                (x @ x).sum().item()
+            except Exception as e:
+                logger.debug(f"CUDA warmup skipped: {e}")
+
+        logger.info(f"✅ Engines preloaded in {time.time() - start:.1f}s")
+
+    def _ensure_mineru(self):
+        """延迟加载 MinerU Pipeline（单例模式）"""
+        if self.mineru_pipeline_engine is None:
+            from mineru_pipeline import MinerUPipelineEngine
+
+            # 使用动态设备选择（支持 CPU/CUDA）
+            # 注意：CUDA 模式下已在 setup() 中设置 CUDA_VISIBLE_DEVICES，
+            # 该进程只能看到一个 GPU（映射为 cuda:0）
+            self.mineru_pipeline_engine = MinerUPipelineEngine(device=self.engine_device)
+            if self.accelerator == "cuda":
+                gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
+                logger.info(f"✅ MinerU Pipeline engine loaded on cuda:0 (physical GPU {gpu_id})")
+            else:
+                logger.info("✅ MinerU Pipeline engine loaded on CPU")
+
+    def _ensure_paddleocr_vl(self):
+        """延迟加载 PaddleOCR-VL（单例模式）"""
+        if self.paddleocr_vl_engine is None:
+            from paddleocr_vl import PaddleOCRVLEngine
+
+            # 注意：由于在 setup() 中已设置 CUDA_VISIBLE_DEVICES，
+            # 该进程只能看到一个 GPU（映射为 cuda:0）
+            self.paddleocr_vl_engine = PaddleOCRVLEngine(device="cuda:0")
+            gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
+            logger.info(f"✅ PaddleOCR-VL engine loaded on cuda:0 (physical GPU {gpu_id})")
+
+    def _ensure_paddleocr_vl_vllm(self):
+        """延迟加载 PaddleOCR-VL VLLM（单例模式）"""
+        if self.paddleocr_vl_vllm_engine is None:
+            from paddleocr_vl_vllm import PaddleOCRVLVLLMEngine
+
+            # 注意：由于在 setup() 中已设置 CUDA_VISIBLE_DEVICES，
+            # 该进程只能看到一个 GPU（映射为 cuda:0）
+            self.paddleocr_vl_vllm_engine = PaddleOCRVLVLLMEngine(
+                device="cuda:0", vllm_api_base=self.paddleocr_vl_vllm_api
+            )
+            gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
+            logger.info(f"✅ PaddleOCR-VL VLLM engine loaded on cuda:0 (physical GPU {gpu_id})")
+
+    def _ensure_sensevoice(self):
+        """延迟加载 SenseVoice（单例模式）"""
+        if self.sensevoice_engine is None:
+            from audio_engines import SenseVoiceEngine
+
+            # 使用动态设备选择（支持 CPU/CUDA）
+            # 注意：CUDA 模式下已在 setup() 中设置 CUDA_VISIBLE_DEVICES，
+            # 该进程只能看到一个 GPU（映射为 cuda:0）
+            self.sensevoice_engine = SenseVoiceEngine(device=self.engine_device)
+            if self.accelerator == "cuda":
+                gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
+                logger.info(f"✅ SenseVoice engine loaded on cuda:0 (physical GPU {gpu_id})")
+            else:
+                logger.info("✅ SenseVoice engine loaded on CPU")
 
-        except Exception as e:
-            # 更新任务状态为失败
-            error_msg = f"{type(e).__name__}: {str(e)}"
-            self.task_db.update_task_status(task_id=task_id, status="failed", result_path=None, error_message=error_msg)
+    def _ensure_video(self):
+        """延迟加载 视频处理引擎（单例模式）"""
+        if self.video_engine is None:
+            from video_engines import VideoProcessingEngine
 
-            # 如果是子任务失败,标记父任务失败
-            if parent_task_id:
-                self.task_db.on_child_task_failed(task_id, error_msg)
+            # 使用动态设备选择（支持 CPU/CUDA）
+            # 注意：CUDA 模式下已在 setup() 中设置 CUDA_VISIBLE_DEVICES，
+            # 该进程只能看到一个 GPU（映射为 cuda:0）
+            self.video_engine = VideoProcessingEngine(device=self.engine_device)
+            if self.accelerator == "cuda":
+                gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
+                logger.info(f"✅ Video processing engine loaded on cuda:0 (physical GPU {gpu_id})")
+            else:
+                logger.info("✅ Video processing engine loaded on CPU")
 
-            raise
+    def _get_output_dir(self, file_path: str) -> Path:
+        """获取并创建文件的专属输出目录：{output_dir}/{文件名（不含扩展名）}"""
+        output_dir = self._output_root / Path(file_path).stem
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return output_dir
 
     def _process_with_mineru(self, file_path: str, options: dict) -> dict:
         """
@@ -726,23 +1506,10 @@ class MinerUWorkerAPI(ls.LitAPI):
         - MinerU 的 do_parse 只接受 PDF 格式，图片需要先转换为 PDF
         - CUDA_VISIBLE_DEVICES 已在 setup() 阶段设置，MinerU 会自动使用正确的 GPU
         """
-        # 延迟加载 MinerU Pipeline（单例模式）
-        if self.mineru_pipeline_engine is None:
-            from mineru_pipeline import MinerUPipelineEngine
-
-            # 使用动态设备选择（支持 CPU/CUDA）
-            # 注意：CUDA 模式下已在 setup() 中设置 CUDA_VISIBLE_DEVICES，
-            # 该进程只能看到一个 GPU（映射为 cuda:0）
-            self.mineru_pipeline_engine = MinerUPipelineEngine(device=self.engine_device)
-            if self.accelerator == "cuda":
-                gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
-                logger.info(f"✅ MinerU Pipeline engine loaded on cuda:0 (physical GPU {gpu_id})")
-            else:
-                logger.info("✅ MinerU Pipeline engine loaded on CPU")
+        self._ensure_mineru()
 
         # 设置输出目录
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 处理文件
         result = self.mineru_pipeline_engine.parse(file_path, output_path=str(output_dir), options=options)
@@ -751,7 +1518,7 @@ class MinerUWorkerAPI(ls.LitAPI):
         # 注意：result["result_path"] 是实际包含 md 文件的目录（例如 {output_dir}/{file_name}/auto/）
         # 我们需要在这个result["result_path"] 上运行 normalize_output
         actual_output_dir = Path(result["result_path"])
-        normalize_output(actual_output_dir)
+        normalize_future = self._normalize_exec.submit(normalize_output, actual_output_dir)
 
         # MinerU Pipeline 返回结构：
         return {
@@ -759,6 +1526,7 @@ class MinerUWorkerAPI(ls.LitAPI):
             "content": result["markdown"],
             "json_path": result.get("json_path"),
             "json_content": result.get("json_content"),
+            "normalize_future": normalize_future,
         }
 
     def _process_with_markitdown(self, file_path: str) -> dict:
@@ -767,8 +1535,7 @@ class MinerUWorkerAPI(ls.LitAPI):
             raise RuntimeError("MarkItDown is not available")
 
         # 创建输出目录（与其他引擎保持一致）
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 处理文件：提取文本
         result = self.markitdown.convert(file_path)
@@ -794,14 +1561,14 @@ class MinerUWorkerAPI(ls.LitAPI):
                 # 继续处理，不影响文本提取
 
         # 保存结果到目录中
-        output_file = output_dir / f"{Path(file_path).stem}_markitdown.md"
+        output_file = output_dir / f"{output_dir.name}_markitdown.md"
         output_file.write_text(markdown_content, encoding="utf-8")
 
         # 规范化输出（统一文件名和目录结构）
-        normalize_output(output_dir)
+        normalize_future = self._normalize_exec.submit(normalize_output, output_dir)
 
         # 返回目录路径（与其他引擎保持一致）
-        return {"result_path": str(output_dir), "content": markdown_content}
+        return {"result_path": str(output_dir), "content": markdown_content, "normalize_future": normalize_future}
 
     def _convert_office_to_pdf(self, file_path: str) -> str:
         """
@@ -833,6 +1600,21 @@ class MinerUWorkerAPI(ls.LitAPI):
 
         logger.info(f"🔄 Converting Office to PDF: {input_file.name}")
 
+        # 优先使用常驻 LibreOffice 服务（免去每次冷启动），失败时回退到命令行转换
+        if self._office_server is not None:
+            try:
+                with tempfile.TemporaryDirectory(prefix="libreoffice_") as temp_dir:
+                    temp_pdf = Path(temp_dir) / f"{input_file.stem}.pdf"
+                    self._office_server.convert_to_pdf(input_file, temp_pdf)
+                    shutil.move(str(temp_pdf), str(final_pdf_file))
+
+                logger.info(
+                    f"✅ Office converted to PDF: {final_pdf_file.name} ({final_pdf_file.stat().st_size / 1024:.1f} KB)"
+                )
+                return str(final_pdf_file)
+            except Exception as e:
+                logger.warning(f"⚠️  LibreOffice server conversion failed, falling back to CLI: {e}")
+
         try:
             # 使用 /tmp 作为临时目录（避免 Docker 挂载卷写入问题）
             with tempfile.TemporaryDirectory(prefix="libreoffice_") as temp_dir:
@@ -892,28 +1674,23 @@ class MinerUWorkerAPI(ls.LitAPI):
                 "Please use 'mineru' or 'markitdown' backend instead."
             )
 
-        # 延迟加载 PaddleOCR-VL（单例模式）
-        if self.paddleocr_vl_engine is None:
-            from paddleocr_vl import PaddleOCRVLEngine
-
-            # 注意：由于在 setup() 中已设置 CUDA_VISIBLE_DEVICES，
-            # 该进程只能看到一个 GPU（映射为 cuda:0）
-            self.paddleocr_vl_engine = PaddleOCRVLEngine(device="cuda:0")
-            gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
-            logger.info(f"✅ PaddleOCR-VL engine loaded on cuda:0 (physical GPU {gpu_id})")
+        self._ensure_paddleocr_vl()
 
         # 设置输出目录
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 处理文件（parse 方法需要 output_path）
         result = self.paddleocr_vl_engine.parse(file_path, output_path=str(output_dir))
 
         # 规范化输出（统一文件名和目录结构）
-        normalize_output(output_dir)
+        normalize_future = self._normalize_exec.submit(normalize_output, output_dir)
 
         # 返回结果
-        return {"result_path": str(output_dir), "content": result.get("markdown", "")}
+        return {
+            "result_path": str(output_dir),
+            "content": result.get("markdown", ""),
+            "normalize_future": normalize_future,
+        }
 
     def _process_with_paddleocr_vl_vllm(self, file_path: str, options: dict) -> dict:
         """使用 PaddleOCR-VL VLLM 处理图片或 PDF"""
@@ -924,50 +1701,30 @@ class MinerUWorkerAPI(ls.LitAPI):
                 "Please use 'mineru' or 'markitdown' backend instead."
             )
 
-        # 延迟加载 PaddleOCR-VL（单例模式）
-        if self.paddleocr_vl_vllm_engine is None:
-            from paddleocr_vl_vllm import PaddleOCRVLVLLMEngine
-
-            # 注意：由于在 setup() 中已设置 CUDA_VISIBLE_DEVICES，
-            # 该进程只能看到一个 GPU（映射为 cuda:0）
-            self.paddleocr_vl_vllm_engine = PaddleOCRVLVLLMEngine(
-                device="cuda:0", vllm_api_base=self.paddleocr_vl_vllm_api
-            )
-            gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
-            logger.info(f"✅ PaddleOCR-VL VLLM engine loaded on cuda:0 (physical GPU {gpu_id})")
+        self._ensure_paddleocr_vl_vllm()
 
         # 设置输出目录
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 处理文件（parse 方法需要 output_path）
         result = self.paddleocr_vl_vllm_engine.parse(file_path, output_path=str(output_dir))
 
         # 规范化输出（统一文件名和目录结构）
-        normalize_output(output_dir, handle_method="paddleocr-vl")
+        normalize_future = self._normalize_exec.submit(normalize_output, output_dir, handle_method="paddleocr-vl")
 
         # 返回结果
-        return {"result_path": str(output_dir), "content": result.get("markdown", "")}
+        return {
+            "result_path": str(output_dir),
+            "content": result.get("markdown", ""),
+            "normalize_future": normalize_future,
+        }
 
     def _process_audio(self, file_path: str, options: dict) -> dict:
         """使用 SenseVoice 处理音频文件"""
-        # 延迟加载 SenseVoice（单例模式）
-        if self.sensevoice_engine is None:
-            from audio_engines import SenseVoiceEngine
-
-            # 使用动态设备选择（支持 CPU/CUDA）
-            # 注意：CUDA 模式下已在 setup() 中设置 CUDA_VISIBLE_DEVICES，
-            # 该进程只能看到一个 GPU（映射为 cuda:0）
-            self.sensevoice_engine = SenseVoiceEngine(device=self.engine_device)
-            if self.accelerator == "cuda":
-                gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
-                logger.info(f"✅ SenseVoice engine loaded on cuda:0 (physical GPU {gpu_id})")
-            else:
-                logger.info("✅ SenseVoice engine loaded on CPU")
+        self._ensure_sensevoice()
 
         # 设置输出目录
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 处理音频（parse 方法需要 output_path 参数）
         result = self.sensevoice_engine.parse(
@@ -979,7 +1736,7 @@ class MinerUWorkerAPI(ls.LitAPI):
         )
 
         # 规范化输出（统一文件名和目录结构）
-        normalize_output(output_dir)
+        normalize_future = self._normalize_exec.submit(normalize_output, output_dir)
 
         # SenseVoice 返回结构：
         # {
@@ -991,27 +1748,18 @@ class MinerUWorkerAPI(ls.LitAPI):
         #   "json_data": dict,
         #   "result": dict
         # }
-        return {"result_path": str(output_dir), "content": result.get("markdown", "")}
+        return {
+            "result_path": str(output_dir),
+            "content": result.get("markdown", ""),
+            "normalize_future": normalize_future,
+        }
 
     def _process_video(self, file_path: str, options: dict) -> dict:
         """使用视频处理引擎处理视频文件"""
-        # 延迟加载视频引擎（单例模式）
-        if self.video_engine is None:
-            from video_engines import VideoProcessingEngine
-
-            # 使用动态设备选择（支持 CPU/CUDA）
-            # 注意：CUDA 模式下已在 setup() 中设置 CUDA_VISIBLE_DEVICES，
-            # 该进程只能看到一个 GPU（映射为 cuda:0）
-            self.video_engine = VideoProcessingEngine(device=self.engine_device)
-            if self.accelerator == "cuda":
-                gpu_id = os.environ.get("CUDA_VISIBLE_DEVICES", "?")
-                logger.info(f"✅ Video processing engine loaded on cuda:0 (physical GPU {gpu_id})")
-            else:
-                logger.info("✅ Video processing engine loaded on CPU")
+        self._ensure_video()
 
         # 创建输出目录（与其他引擎保持一致）
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 处理视频
         result = self.video_engine.parse(
@@ -1026,13 +1774,13 @@ class MinerUWorkerAPI(ls.LitAPI):
         )
 
         # 保存结果（Markdown 格式）
-        output_file = output_dir / f"{Path(file_path).stem}_video_analysis.md"
+        output_file = output_dir / f"{output_dir.name}_video_analysis.md"
         output_file.write_text(result["markdown"], encoding="utf-8")
 
         # 规范化输出（统一文件名和目录结构）
-        normalize_output(output_dir)
+        normalize_future = self._normalize_exec.submit(normalize_output, output_dir)
 
-        return {"result_path": str(output_dir), "content": result["markdown"]}
+        return {"result_path": str(output_dir), "content": result["markdown"], "normalize_future": normalize_future}
 
     def _preprocess_remove_watermark(self, file_path: str, options: dict) -> Path:
         """
@@ -1058,34 +1806,10 @@ class MinerUWorkerAPI(ls.LitAPI):
             raise RuntimeError("Watermark removal is not available (CUDA required)")
 
         # 设置输出路径
-        output_file = Path(self.output_dir) / f"{Path(file_path).stem}_no_watermark.pdf"
+        output_file = self._output_root / f"{Path(file_path).stem}_no_watermark.pdf"
 
         # 构建参数字典（只传递实际提供的参数）
-        kwargs = {}
-
-        # 通用参数
-        if "auto_detect" in options:
-            kwargs["auto_detect"] = options["auto_detect"]
-        if "force_scanned" in options:
-            kwargs["force_scanned"] = options["force_scanned"]
-
-        # 可编辑 PDF 参数
-        if "remove_text" in options:
-            kwargs["remove_text"] = options["remove_text"]
-        if "remove_images" in options:
-            kwargs["remove_images"] = options["remove_images"]
-        if "remove_annotations" in options:
-            kwargs["remove_annotations"] = options["remove_annotations"]
-        if "watermark_keywords" in options:
-            kwargs["keywords"] = options["watermark_keywords"]
-
-        # 扫描件 PDF 参数
-        if "watermark_dpi" in options:
-            kwargs["dpi"] = options["watermark_dpi"]
-        if "watermark_conf_threshold" in options:
-            kwargs["conf_threshold"] = options["watermark_conf_threshold"]
-        if "watermark_dilation" in options:
-            kwargs["dilation"] = options["watermark_dilation"]
+        kwargs = {kwarg: options[key] for key, kwarg in WATERMARK_OPTION_TO_KWARG.items() if key in options}
 
         # 去除水印（返回输出路径）
         cleaned_pdf_path = self.watermark_handler.remove_watermark(
@@ -1121,8 +1845,9 @@ class MinerUWorkerAPI(ls.LitAPI):
 
         try:
             # 快速读取 PDF 页数（只读元数据）
-            page_count = get_pdf_page_count(Path(file_path))
-            file_size_mb = Path(file_path).stat().st_size / (1024 * 1024)
+            pdf_path = Path(file_path)
+            page_count = get_pdf_page_count(pdf_path)
+            file_size_mb = pdf_path.stat().st_size / (1024 * 1024)
             logger.info(
                 f"📄 PDF has {page_count} pages, {file_size_mb:.1f}MB "
                 f"(page threshold: {pdf_split_threshold}, size threshold: {pdf_split_size_mb}MB)"
@@ -1150,15 +1875,11 @@ class MinerUWorkerAPI(ls.LitAPI):
                 f"🔀 Large PDF detected ({page_count} pages), splitting into chunks of {pdf_split_chunk_size} pages"
             )
 
-            # 将当前任务转为父任务
-            self.task_db.convert_to_parent_task(task_id, child_count=0)
-
-            # 拆分 PDF 文件
-            split_dir = Path(self.output_dir) / "splits" / task_id
-            split_dir.mkdir(parents=True, exist_ok=True)
+            # 拆分 PDF 文件（split_pdf_file 会创建任务子目录）
+            split_dir = self._splits_root / task_id
 
             chunks = split_pdf_file(
-                pdf_path=Path(file_path),
+                pdf_path=pdf_path,
                 output_dir=split_dir,
                 chunk_size=pdf_split_chunk_size,
                 parent_task_id=task_id,
@@ -1166,38 +1887,36 @@ class MinerUWorkerAPI(ls.LitAPI):
 
             logger.info(f"✂️  PDF split into {len(chunks)} chunks")
 
-            # 为每个分块创建子任务
-            backend = task.get("backend", "auto")
-            priority = task.get("priority", 0)
-            user_id = task.get("user_id")
-
-            for chunk_info in chunks:
-                # 复制选项并添加分块信息
-                chunk_options = options.copy()
-                chunk_options["chunk_info"] = {
-                    "start_page": chunk_info["start_page"],
-                    "end_page": chunk_info["end_page"],
-                    "page_count": chunk_info["page_count"],
+            # 为每个分块创建子任务（子任务只保存分块信息，公共选项从父任务读取）
+            children = [
+                {
+                    "file_name": f"{pdf_path.stem}_pages_{chunk_info['start_page']}-{chunk_info['end_page']}.pdf",
+                    "file_path": chunk_info["path"],
+                    "options": {
+                        "chunk_info": {
+                            "start_page": chunk_info["start_page"],
+                            "end_page": chunk_info["end_page"],
+                            "page_count": chunk_info["page_count"],
+                        }
+                    },
                 }
+                for chunk_info in chunks
+            ]
 
-                # 创建子任务
-                child_task_id = self.task_db.create_child_task(
-                    parent_task_id=task_id,
-                    file_name=f"{Path(file_path).stem}_pages_{chunk_info['start_page']}-{chunk_info['end_page']}.pdf",
-                    file_path=chunk_info["path"],
-                    backend=backend,
-                    options=chunk_options,
-                    priority=priority,
-                    user_id=user_id,
-                )
+            # 单个事务批量插入子任务，并同时更新父任务的子任务数量
+            child_task_ids = self.task_db.create_child_tasks(
+                parent_task_id=task_id,
+                children=children,
+                backend=task.get("backend", "auto"),
+                priority=task.get("priority", 0),
+                user_id=task.get("user_id"),
+            )
 
+            for child_task_id, chunk_info in zip(child_task_ids, chunks):
                 logger.info(
                     f"  ✅ Created subtask {child_task_id}: pages {chunk_info['start_page']}-{chunk_info['end_page']}"
                 )
 
-            # 更新父任务的子任务数量
-            self.task_db.convert_to_parent_task(task_id, child_count=len(chunks))
-
             logger.info(f"🎉 Large PDF split complete: {len(chunks)} subtasks created for parent task {task_id}")
 
             return True
@@ -1207,6 +1926,106 @@ class MinerUWorkerAPI(ls.LitAPI):
             logger.warning("⚠️  Falling back to processing as single task")
             return False
 
+    @staticmethod
+    def _find_result_files(result_dir: Path) -> Tuple[Optional[Path], Optional[Path]]:
+        """
+        在子任务结果目录中查找 Markdown 和 JSON 结果文件（单次 os.scandir 广度优先遍历）
+
+        Markdown 优先取 result.md，否则取遇到的第一个 .md 文件；
+        JSON 取第一个 content.json / result.json / *_content_list.json。
+        顶层已有 result.md 和 JSON 结果时直接返回；否则浅层目录优先，两者都找到后立即停止遍历。
+
+        Returns:
+            (md_path, json_path)，未找到的项为 None
+        """
+        # 快速路径：规范化后的结果目录顶层即包含 result.md / result.json，直接探测，无需遍历
+        md_probe = result_dir / "result.md"
+        if md_probe.is_file():
+            for json_name in ("result.json", "content.json"):
+                json_probe = result_dir / json_name
+                if json_probe.is_file():
+                    return md_probe, json_probe
+
+        md_file = None
+        json_file = None
+        pending = [result_dir]
+
+        while pending:
+            subdirs = []
+            for directory in pending:
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            # scandir 的 d_type 缓存可避免额外的 stat 调用
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                            elif entry.is_file():
+                                name = entry.name
+                                if name == "result.md":
+                                    md_file = Path(entry.path)
+                                elif name.endswith(".md") and md_file is None:
+                                    md_file = Path(entry.path)
+                                elif json_file is None and (
+                                    name in ("content.json", "result.json") or name.endswith("_content_list.json")
+                                ):
+                                    json_file = Path(entry.path)
+                except OSError:
+                    continue
+
+                if json_file is not None and md_file is not None and md_file.name == "result.md":
+                    return md_file, json_file
+            pending = subdirs
+
+        return md_file, json_file
+
+    def _load_child_result(
+        self, child: dict, chunk_info: dict, idx: int
+    ) -> Tuple[int, dict, Optional[str], list, bool]:
+        """
+        读取单个子任务的结果（仅读取，不写入，可在线程池中并行执行）
+
+        Args:
+            child: 子任务字典
+            chunk_info: 子任务的分块信息（已从 options 解析）
+            idx: 子任务在排序后列表中的序号
+
+        Returns:
+            (idx, chunk_info, markdown 内容或 None, 调整页码后的 JSON 页面列表,
+             JSON 是否不含 NaN/Infinity（可用 orjson 序列化）)
+        """
+        if child["status"] != "completed":
+            logger.warning(f"⚠️  Child task {child['task_id']} not completed (status: {child['status']})")
+            return idx, chunk_info, None, [], True
+
+        # 一次遍历同时查找 Markdown 和 JSON 结果文件
+        md_file, json_file = self._find_result_files(Path(child["result_path"]))
+
+        # 读取 Markdown
+        content = md_file.read_text(encoding="utf-8") if md_file else None
+
+        # 读取 JSON (如果有)
+        pages = []
+        use_orjson = True
+        if json_file:
+            try:
+                raw = json_file.read_bytes()
+                use_orjson = not _has_nonfinite_literals(raw)
+                json_content = _load_json_bytes(raw, use_orjson)
+
+                # 合并 JSON 页面数据
+                if "pages" in json_content:
+                    page_offset = chunk_info.get("start_page", 1) - 1
+
+                    for page in json_content["pages"]:
+                        # 调整页码
+                        if "page_number" in page:
+                            page["page_number"] += page_offset
+                        pages.append(page)
+            except Exception as json_e:
+                logger.warning(f"⚠️  Failed to merge JSON for chunk {idx + 1}: {json_e}")
+
+        return idx, chunk_info, content, pages, use_orjson
+
     def _merge_parent_task_results(self, parent_task_id: str):
         """
         合并父任务的所有子任务结果
@@ -1226,93 +2045,83 @@ class MinerUWorkerAPI(ls.LitAPI):
             if not children:
                 raise ValueError(f"No child tasks found for parent {parent_task_id}")
 
-            # 按页码排序子任务
-            children.sort(key=lambda x: json.loads(x.get("options", "{}")).get("chunk_info", {}).get("start_page", 0))
+            # 按页码排序子任务（每个子任务的 options 只解析一次，排序和合并共用）
+            parsed = sorted(
+                ((child, json.loads(child.get("options", "{}")).get("chunk_info", {})) for child in children),
+                key=lambda item: item[1].get("start_page", 0),
+            )
+            children = [child for child, _ in parsed]
+            chunk_infos = [chunk_info for _, chunk_info in parsed]
 
             logger.info(f"🔀 Merging {len(children)} subtask results for parent task {parent_task_id}")
 
             # 创建父任务输出目录
-            parent_output_dir = Path(self.output_dir) / Path(parent_task["file_path"]).stem
-            parent_output_dir.mkdir(parents=True, exist_ok=True)
+            parent_output_dir = self._get_output_dir(parent_task["file_path"])
 
-            # 合并 Markdown
-            markdown_parts = []
+            # 合并 Markdown（逐块直接写入输出文件，避免在内存中拼接全部内容）
+            # 子任务结果的读取是相互独立的 I/O 操作，使用线程池并行读取，再按顺序写入
+            # 先写入临时文件，完成后原子替换，避免进程中途退出留下截断的 result.md
+            md_output = parent_output_dir / "result.md"
+            md_tmp = parent_output_dir / "result.md.tmp"
             json_pages = []
-            has_json = False
-
-            for idx, child in enumerate(children):
-                if child["status"] != "completed":
-                    logger.warning(f"⚠️  Child task {child['task_id']} not completed (status: {child['status']})")
-                    continue
-
-                result_dir = Path(child["result_path"])
-                chunk_info = json.loads(child.get("options", "{}")).get("chunk_info", {})
-
-                # 读取 Markdown
-                md_files = list(result_dir.rglob("*.md"))
-                if md_files:
-                    md_file = None
-                    for f in md_files:
-                        if f.name == "result.md":
-                            md_file = f
-                            break
-                    if not md_file:
-                        md_file = md_files[0]
-
-                    content = md_file.read_text(encoding="utf-8")
-
-                    # 添加分页标记
-                    if chunk_info:
-                        markdown_parts.append(
-                            f"\n\n<!-- Pages {chunk_info['start_page']}-{chunk_info['end_page']} -->\n\n"
-                        )
-                    markdown_parts.append(content)
+            json_orjson_safe = True
+            read_workers = min(MERGE_READ_WORKERS, len(children))
 
-                    logger.info(
-                        f"   ✅ Merged chunk {idx + 1}/{len(children)}: "
-                        f"pages {chunk_info.get('start_page', '?')}-{chunk_info.get('end_page', '?')}"
+            try:
+                with (
+                    ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="merge-read") as executor,
+                    md_tmp.open("w", encoding="utf-8", buffering=1 << 20) as md_out,
+                ):
+                    # 最多提前提交 read_workers 个读取任务，按提交顺序取结果写入（保证分块顺序），
+                    # 避免所有分块内容同时驻留内存
+                    child_args = iter(zip(children, chunk_infos, range(len(children))))
+                    pending = deque(
+                        executor.submit(self._load_child_result, *item)
+                        for item in itertools.islice(child_args, read_workers)
                     )
+                    while pending:
+                        idx, chunk_info, content, pages, pages_orjson_safe = pending.popleft().result()
+                        next_item = next(child_args, None)
+                        if next_item is not None:
+                            pending.append(executor.submit(self._load_child_result, *next_item))
+
+                        if content is not None:
+                            # 添加分页标记
+                            if chunk_info:
+                                md_out.write(
+                                    f"\n\n<!-- Pages {chunk_info['start_page']}-{chunk_info['end_page']} -->\n\n"
+                                )
+                            md_out.write(content)
 
-                # 读取 JSON (如果有)
-                json_files = [
-                    f
-                    for f in result_dir.rglob("*.json")
-                    if f.name in ["content.json", "result.json"] or "_content_list.json" in f.name
-                ]
+                            logger.info(
+                                f"   ✅ Merged chunk {idx + 1}/{len(children)}: "
+                                f"pages {chunk_info.get('start_page', '?')}-{chunk_info.get('end_page', '?')}"
+                            )
 
-                if json_files:
-                    try:
-                        json_file = json_files[0]
-                        json_content = json.loads(json_file.read_text(encoding="utf-8"))
-
-                        # 合并 JSON 页面数据
-                        if "pages" in json_content:
-                            has_json = True
-                            page_offset = chunk_info.get("start_page", 1) - 1
-
-                            for page in json_content["pages"]:
-                                # 调整页码
-                                if "page_number" in page:
-                                    page["page_number"] += page_offset
-                                json_pages.append(page)
-                    except Exception as json_e:
-                        logger.warning(f"⚠️  Failed to merge JSON for chunk {idx + 1}: {json_e}")
-
-            # 保存合并后的 Markdown
-            merged_md = "".join(markdown_parts)
-            md_output = parent_output_dir / "result.md"
-            md_output.write_text(merged_md, encoding="utf-8")
+                        json_pages.extend(pages)
+                        json_orjson_safe = json_orjson_safe and pages_orjson_safe
+
+                os.replace(md_tmp, md_output)
+            except BaseException:
+                md_tmp.unlink(missing_ok=True)
+                raise
             logger.info(f"📄 Merged Markdown saved: {md_output}")
 
             # 保存合并后的 JSON (如果有)
-            if has_json and json_pages:
+            if json_pages:
                 merged_json = {"pages": json_pages}
                 json_output = parent_output_dir / "result.json"
-                json_output.write_text(json.dumps(merged_json, indent=2, ensure_ascii=False), encoding="utf-8")
+                json_tmp = parent_output_dir / "result.json.tmp"
+                try:
+                    json_tmp.write_bytes(_dump_json_bytes(merged_json, json_orjson_safe))
+                    os.replace(json_tmp, json_output)
+                except BaseException:
+                    json_tmp.unlink(missing_ok=True)
+                    raise
                 logger.info(f"📄 Merged JSON saved: {json_output}")
 
-            # 规范化输出
-            normalize_output(parent_output_dir)
+            # 无需再规范化输出：子任务结果在各自处理时已完成规范化（图片上传、路径替换），
+            # 合并目录只包含合并后的 result.md / result.json
 
             # 更新父任务状态
             self.task_db.update_task_status(
@@ -1336,17 +2145,20 @@ class MinerUWorkerAPI(ls.LitAPI):
         Args:
             children: 子任务列表
         """
+        errors = []
+        deleted = 0
         try:
             for child in children:
-                # 删除子任务的分片 PDF 文件
-                if child.get("file_path"):
-                    chunk_file = Path(child["file_path"])
-                    if chunk_file.exists() and chunk_file.is_file():
-                        try:
-                            chunk_file.unlink()
-                            logger.debug(f"🗑️  Deleted chunk file: {chunk_file.name}")
-                        except Exception as e:
-                            logger.warning(f"⚠️  Failed to delete chunk file {chunk_file.name}: {e}")
+                # 删除子任务的分片 PDF 文件（直接 unlink，文件不存在时忽略）
+                chunk_file = child.get("file_path")
+                if chunk_file:
+                    try:
+                        os.unlink(chunk_file)
+                        deleted += 1
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        errors.append((Path(chunk_file).name, e))
 
                 # 可选: 删除子任务的结果目录 (如果需要节省空间)
                 # 注意: 这会删除中间结果,可能影响调试
@@ -1362,7 +2174,14 @@ class MinerUWorkerAPI(ls.LitAPI):
         except Exception as e:
             logger.warning(f"⚠️  Failed to cleanup child task files: {e}")
 
-    def _process_with_format_engine(self, file_path: str, options: dict, engine_name: Optional[str] = None) -> dict:
+        logger.debug(f"🗑️  Deleted {deleted} chunk files")
+        if errors:
+            details = "; ".join(f"{name}: {e}" for name, e in errors)
+            logger.warning(f"⚠️  Failed to delete {len(errors)} chunk files: {details}")
+
+    def _process_with_format_engine(
+        self, file_path: str, options: dict, engine_name: Optional[str] = None, engine=None
+    ) -> dict:
         """
         使用格式引擎处理专业领域格式文件
 
@@ -1370,6 +2189,7 @@ class MinerUWorkerAPI(ls.LitAPI):
             file_path: 文件路径
             options: 处理选项
             engine_name: 指定的引擎名称（如 fasta, genbank），为 None 时自动选择
+            engine: 调用方已查找到的引擎实例（注册表中的单例），传入时不再重复查找
         """
         # 获取语言设置
         lang = options.get("language", "en")
@@ -1377,7 +2197,7 @@ class MinerUWorkerAPI(ls.LitAPI):
         # 根据指定的引擎名称或文件扩展名选择引擎
         if engine_name:
             # 用户明确指定了引擎
-            engine = FormatEngineRegistry.get_engine(engine_name)
+            engine = engine or FormatEngineRegistry.get_engine(engine_name)
             if engine is None:
                 raise ValueError(f"Format engine '{engine_name}' not found or not registered")
 
@@ -1392,15 +2212,14 @@ class MinerUWorkerAPI(ls.LitAPI):
             result = engine.parse(file_path, options={"language": lang})
         else:
             # 自动选择引擎（根据文件扩展名）
-            engine = FormatEngineRegistry.get_engine_by_extension(file_path)
+            engine = engine or FormatEngineRegistry.get_engine_by_extension(file_path)
             if engine is None:
                 raise ValueError(f"No format engine available for file: {file_path}")
 
             result = engine.parse(file_path, options={"language": lang})
 
         # 为每个任务创建专属输出目录（与其他引擎保持一致）
-        output_dir = Path(self.output_dir) / Path(file_path).stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = self._get_output_dir(file_path)
 
         # 保存结果（与其他引擎保持一致的命名规范）
         # 主结果文件：result.md 和 result.json
@@ -1408,30 +2227,32 @@ class MinerUWorkerAPI(ls.LitAPI):
         output_file.write_text(result["markdown"], encoding="utf-8")
         logger.info("📄 Main result saved: result.md")
 
-        # 备份文件：使用原始文件名（便于调试）
-        backup_md_file = output_dir / f"{Path(file_path).stem}_{result['format']}.md"
-        backup_md_file.write_text(result["markdown"], encoding="utf-8")
+        # 备份文件：使用原始文件名（便于调试），硬链接到主结果文件，避免重复写入
+        backup_md_file = output_dir / f"{output_dir.name}_{result['format']}.md"
+        _link_or_write(output_file, backup_md_file, result["markdown"].encode("utf-8"))
         logger.info(f"📄 Backup saved: {backup_md_file.name}")
 
-        # 也保存 JSON 结构化数据
+        # 也保存 JSON 结构化数据（只序列化一次，主文件和备份共用）
+        json_bytes = _dump_json_bytes(result["json_content"])
         json_file = output_dir / "result.json"
-        json_file.write_text(json.dumps(result["json_content"], indent=2, ensure_ascii=False), encoding="utf-8")
+        json_file.write_bytes(json_bytes)
         logger.info("📄 Main JSON saved: result.json")
 
         # 备份 JSON 文件
-        backup_json_file = output_dir / f"{Path(file_path).stem}_{result['format']}.json"
-        backup_json_file.write_text(json.dumps(result["json_content"], indent=2, ensure_ascii=False), encoding="utf-8")
+        backup_json_file = output_dir / f"{output_dir.name}_{result['format']}.json"
+        _link_or_write(json_file, backup_json_file, json_bytes)
         logger.info(f"📄 Backup JSON saved: {backup_json_file.name}")
 
         # 规范化输出（统一文件名和目录结构）
         # Format Engine 已经输出标准格式，但仍然调用规范化器以确保一致性
-        normalize_output(output_dir)
+        normalize_future = self._normalize_exec.submit(normalize_output, output_dir)
 
         return {
             "result_path": str(output_dir),  # 返回任务专属目录
             "content": result["content"],
             "json_path": str(json_file),
             "json_content": result["json_content"],
+            "normalize_future": normalize_future,
         }
 
     def decode_request(self, request):
@@ -1443,6 +2264,42 @@ class MinerUWorkerAPI(ls.LitAPI):
         """
         return request.get("action", "health")
 
+    def _get_vram_info(self) -> Tuple[Optional[float], Optional[float]]:
+        """
+        获取显存总量和已用量（GB），结果缓存 HEALTH_VRAM_CACHE_TTL 秒
+
+        总量在进程内不变，只查询一次；已用量通过 NVML 库调用获取（pynvml 可选，不可用时为 None）
+        """
+        if "cuda" not in str(self.device).lower():
+            return None, None
+
+        now = time.monotonic()
+        cached = getattr(self, "_vram_info_cache", None)
+        if cached and now - cached[0] < HEALTH_VRAM_CACHE_TTL:
+            return cached[1], cached[2]
+
+        if getattr(self, "_vram_total_gb", None) is None:
+            try:
+                # CUDA_VISIBLE_DEVICES 已限制为单卡，进程内设备号为 cuda:0
+                self._vram_total_gb = get_vram(self.engine_device)
+            except Exception:
+                self._vram_total_gb = None
+
+        vram_used_gb = None
+        try:
+            import pynvml
+
+            if getattr(self, "_nvml_handle", None) is None:
+                pynvml.nvmlInit()
+                # NVML 不受 CUDA_VISIBLE_DEVICES 影响，使用物理 GPU 编号
+                self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(int(str(self.device).split(":")[-1]))
+            vram_used_gb = round(pynvml.nvmlDeviceGetMemoryInfo(self._nvml_handle).used / (1024**3), 2)
+        except Exception:
+            pass
+
+        self._vram_info_cache = (now, self._vram_total_gb, vram_used_gb)
+        return self._vram_total_gb, vram_used_gb
+
     def predict(self, action):
         """
         处理请求
@@ -1456,19 +2313,15 @@ class MinerUWorkerAPI(ls.LitAPI):
             响应字典
         """
         if action == "health":
-            # 健康检查
-            vram_gb = None
-            if "cuda" in str(self.device).lower():
-                try:
-                    vram_gb = get_vram(self.device.split(":")[-1])
-                except Exception:
-                    pass
+            # 健康检查（显存信息带缓存，避免高频探针每次都查询设备）
+            vram_gb, vram_used_gb = self._get_vram_info()
 
             return {
                 "status": "healthy",
                 "worker_id": self.worker_id,
                 "device": str(self.device),
                 "vram_gb": vram_gb,
+                "vram_used_gb": vram_used_gb,
                 "running": self.running,
                 "current_task": self.current_task_id,
                 "worker_loop_enabled": self.enable_worker_loop,
@@ -1535,6 +2388,22 @@ class MinerUWorkerAPI(ls.LitAPI):
         if hasattr(self, "worker_thread") and self.worker_thread.is_alive():
             self.worker_thread.join(timeout=5)
 
+        # 等待已提交的后处理完成，确保任务状态全部落库
+        # （先关闭提交线程：它等待的规范化任务仍需规范化线程池执行）
+        if hasattr(self, "_post_exec"):
+            self._post_exec.shutdown(wait=True)
+        if hasattr(self, "_normalize_exec"):
+            self._normalize_exec.shutdown(wait=True)
+
+        # 通知清理线程处理完剩余文件后退出
+        if hasattr(self, "_janitor_thread") and self._janitor_thread.is_alive():
+            self._gc_queue.put(None)
+            self._janitor_thread.join(timeout=5)
+
+        # 关闭常驻 LibreOffice 服务
+        if getattr(self, "_office_server", None) is not None:
+            self._office_server.close()
+
         logger.info(f"✅ Worker {worker_id} stopped")
 
 
@@ -1548,6 +2417,7 @@ def start_litserve_workers(
     enable_worker_loop=True,
     paddleocr_vl_vllm_engine_enabled=False,
     paddleocr_vl_vllm_api_list=[],
+    max_poll_interval=10.0,
 ):
     """
     启动 LitServe Worker Pool
@@ -1558,10 +2428,11 @@ def start_litserve_workers(
         devices: 使用的设备 (auto/[0,1,2])
         workers_per_device: 每个 GPU 的 worker 数量
         port: 服务端口
-        poll_interval: Worker 拉取任务的间隔（秒）
+        poll_interval: Worker 拉取任务的最小间隔（秒）
         enable_worker_loop: 是否启用 worker 自动循环拉取任务
         paddleocr_vl_vllm_engine_enabled: 是否启用 PaddleOCR VL VLLM 引擎
         paddleocr_vl_vllm_api_list: PaddleOCR VL VLLM API 列表
+        max_poll_interval: 连续空轮询时拉取间隔的退避上限（秒）
     """
 
     def resolve_auto_accelerator():
@@ -1590,30 +2461,50 @@ def start_litserve_workers(
         default_output = project_root / "data" / "output"
         output_dir = os.getenv("OUTPUT_PATH", str(default_output))
 
-    logger.info("=" * 60)
-    logger.info("🚀 Starting MinerU Tianshu LitServe Worker Pool")
-    logger.info("=" * 60)
-    logger.info(f"📂 Output Directory: {output_dir}")
-    logger.info(f"💾 Devices: {devices}")
-    logger.info(f"👷 Workers per Device: {workers_per_device}")
-    logger.info(f"🔌 Port: {port}")
-    logger.info(f"🔄 Worker Loop: {'Enabled' if enable_worker_loop else 'Disabled'}")
-    if enable_worker_loop:
-        logger.info(f"⏱️  Poll Interval: {poll_interval}s")
-    logger.info(f"🎮 Initial Accelerator setting: {accelerator}")
-
     if paddleocr_vl_vllm_engine_enabled:
         if not paddleocr_vl_vllm_api_list:
             logger.error(
                 "请配置 --paddleocr-vl-vllm-api-list 参数，或移除 --paddleocr-vl-vllm-engine-enabled 以禁用 PaddleOCR VL VLLM 引擎"
             )
             sys.exit(1)
-        logger.success(f"PaddleOCR VL VLLM 引擎已启用，API 列表为: {paddleocr_vl_vllm_api_list}")
+        paddleocr_vl_vllm_api_list = _probe_vllm_endpoints(paddleocr_vl_vllm_api_list)
+        if not paddleocr_vl_vllm_api_list:
+            logger.error("❌ PaddleOCR VL VLLM API 均不可用，请检查 --paddleocr-vl-vllm-api-list 配置和 VLLM 服务状态")
+            sys.exit(1)
+        vllm_status = f"✅ PaddleOCR VL VLLM 引擎已启用，API 列表为: {paddleocr_vl_vllm_api_list}"
     else:
         os.environ.pop("PADDLEOCR_VL_VLLM_ENABLED", None)
-        logger.info("PaddleOCR VL VLLM 引擎已禁用")
+        vllm_status = "PaddleOCR VL VLLM 引擎已禁用"
+
+    # 启动信息合并为一条日志输出
+    banner = [
+        "=" * 60,
+        "🚀 Starting MinerU Tianshu LitServe Worker Pool",
+        "=" * 60,
+        f"📂 Output Directory: {output_dir}",
+        f"💾 Devices: {devices}",
+        f"👷 Workers per Device: {workers_per_device}",
+        f"🔌 Port: {port}",
+        f"🔄 Worker Loop: {'Enabled' if enable_worker_loop else 'Disabled'}",
+    ]
+    if enable_worker_loop:
+        banner.append(f"⏱️  Poll Interval: {poll_interval}s ~ {max_poll_interval}s (adaptive)")
+    banner += [f"🎮 Initial Accelerator setting: {accelerator}", vllm_status, "=" * 60]
+    logger.info("\n".join(banner))
+
+    if accelerator == "auto":
+        # 手动解析accelerator的具体设置
+        accelerator = resolve_auto_accelerator()
+        logger.info(f"💫 Auto-resolved Accelerator: {accelerator}")
 
-    logger.info("=" * 60)
+    # 计算 Worker 总数（与 LitServe 的 devices × workers_per_device 一致）
+    if isinstance(devices, list):
+        device_count = len(devices)
+    elif accelerator == "cuda":
+        device_count = max(1, check_cuda_with_nvidia_smi())
+    else:
+        device_count = 1
+    expected_workers = device_count * workers_per_device
 
     # 1. 实例化 API 时传入数据
     api = MinerUWorkerAPI(
@@ -1622,13 +2513,12 @@ def start_litserve_workers(
         enable_worker_loop=enable_worker_loop,
         paddleocr_vl_vllm_engine_enabled=paddleocr_vl_vllm_engine_enabled,
         paddleocr_vl_vllm_api_list=paddleocr_vl_vllm_api_list,  # ✅ 在这里传
+        expected_workers=expected_workers,
+        workers_per_device=workers_per_device,
+        max_poll_interval=max_poll_interval,
+        device_ids=devices if isinstance(devices, list) else None,
     )
 
-    if accelerator == "auto":
-        # 手动解析accelerator的具体设置
-        accelerator = resolve_auto_accelerator()
-        logger.info(f"💫 Auto-resolved Accelerator: {accelerator}")
-
     server = ls.LitServer(
         api,
         accelerator=accelerator,
@@ -1637,35 +2527,167 @@ def start_litserve_workers(
         timeout=False,  # 不设置超时
     )
 
-    # 注册优雅关闭处理器
+    # 注册优雅关闭处理器（teardown 方法只解析一次）
+    teardown_fn = getattr(api, "teardown", None)
+    if not callable(teardown_fn):
+        teardown_fn = None
+
+    def _begin_shutdown() -> bool:
+        """标记关闭开始，仅第一次调用返回 True（信号处理器与 atexit 共用，保证 teardown 只执行一次）"""
+        with _shutdown_lock:
+            if _shutdown_state["started"]:
+                return False
+            _shutdown_state["started"] = True
+            return True
+
     def graceful_shutdown(signum=None, frame=None):
-        """处理关闭信号，优雅地停止 worker"""
+        """处理关闭信号，优雅地停止 worker；关闭过程中再次收到信号则立即强制退出"""
+        if not _begin_shutdown():
+            logger.warning("⚠️  Received second shutdown signal, forcing exit")
+            os._exit(1)
+
         logger.info("🛑 Received shutdown signal, gracefully stopping workers...")
         # 注意：LitServe 会为每个设备创建多个 worker 实例
         # 这里的 api 只是模板，实际的 worker 实例由 LitServe 管理
         # teardown 会在每个 worker 进程中被调用
-        if hasattr(api, "teardown"):
-            api.teardown()
+        if teardown_fn is not None:
+            teardown_fn()
         sys.exit(0)
 
-    # 注册信号处理器（Ctrl+C 等）
+    def _atexit_teardown():
+        """正常退出时清理（信号处理器已执行过 teardown 时跳过）"""
+        if _begin_shutdown() and teardown_fn is not None:
+            teardown_fn()
+
+    # 注册信号处理器（Ctrl+C、终端断开等）
     signal.signal(signal.SIGINT, graceful_shutdown)
     signal.signal(signal.SIGTERM, graceful_shutdown)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, graceful_shutdown)
 
     # 注册 atexit 处理器（正常退出时调用）
-    atexit.register(lambda: api.teardown() if hasattr(api, "teardown") else None)
+    atexit.register(_atexit_teardown)
 
-    logger.info("✅ LitServe worker pool initialized")
-    logger.info(f"📡 Listening on: http://0.0.0.0:{port}/predict")
     if enable_worker_loop:
-        logger.info("🔁 Workers will continuously poll and process tasks")
+        loop_mode = "🔁 Workers will continuously poll and process tasks"
     else:
-        logger.info("🔄 Workers will wait for scheduler triggers")
-    logger.info("=" * 60)
+        loop_mode = "🔄 Workers will wait for scheduler triggers"
+    logger.info(
+        "\n".join(
+            [
+                "✅ LitServe worker pool initialized",
+                f"📡 Listening on: http://0.0.0.0:{port}/predict",
+                loop_mode,
+                "=" * 60,
+            ]
+        )
+    )
+
+    # 显式使用 uvloop 事件循环和 httptools HTTP 解析器（uvicorn[standard] 已包含，Windows 上无 uvloop）
+    # 额外参数由 LitServe 透传给 uvicorn.Config
+    uvicorn_kwargs = {}
+    if importlib.util.find_spec("uvloop") is not None:
+        uvicorn_kwargs["loop"] = "uvloop"
+    if importlib.util.find_spec("httptools") is not None:
+        uvicorn_kwargs["http"] = "httptools"
 
     # 启动服务器
     # 注意：LitServe 内置 MCP 已通过 monkeypatch 完全禁用（我们有独立的 MCP Server）
-    server.run(port=port, generate_client_file=False)
+    server.run(port=port, generate_client_file=False, **uvicorn_kwargs)
+
+
+def _devices_from_env(env_config: WorkerEnvConfig) -> Optional[str]:
+    """从环境变量 CUDA_VISIBLE_DEVICES 读取设备（如果用户明确设置了）"""
+    env_devices = env_config.cuda_visible_devices
+    if env_devices and env_devices.strip():
+        logger.info(f"📊 Using devices from CUDA_VISIBLE_DEVICES: {env_devices}")
+        return env_devices
+    return None
+
+
+def _devices_from_detection() -> Optional[str]:
+    """自动检测可用的 CUDA 设备（不导入 torch，避免启动器进程初始化 CUDA）"""
+    device_count = _detect_cuda_devices()
+    if device_count > 0:
+        devices = ",".join(str(i) for i in range(device_count))
+        logger.info(f"📊 Auto-detected {device_count} CUDA devices: {devices}")
+        return devices
+    return None
+
+
+def _devices_cpu_fallback() -> str:
+    """没有 CUDA 设备时保持 auto，让 LitServe 使用 CPU"""
+    logger.info("📊 No CUDA devices available, using CPU mode")
+    return "auto"
+
+
+# --devices 为 auto 且未设置 CUDA_VISIBLE_DEVICES 时的设备来源，按顺序尝试，第一个非 None 的结果生效
+DEVICE_SOURCES = (_devices_from_detection, _devices_cpu_fallback)
+
+
+@dataclass(frozen=True, slots=True)
+class WorkerRuntimeConfig:
+    """启动器最终生效的配置（命令行参数优先，其次环境变量，最后默认值）"""
+
+    output_dir: Optional[str]
+    devices: Union[List[int], str]
+    workers_per_device: int
+    port: int
+
+
+def _resolve_config(args, env_config: WorkerEnvConfig) -> WorkerRuntimeConfig:
+    """
+    合并命令行参数与环境变量配置
+
+    命令行参数默认值为 None，表示未指定，此时才读取对应的环境变量，
+    因此显式指定的参数（即使与默认值相同）不会被环境变量覆盖
+    """
+    # 1. devices：命令行 > CUDA_VISIBLE_DEVICES > 依次尝试 DEVICE_SOURCES
+    devices = args.devices
+    if devices == "auto":
+        devices = _devices_from_env(env_config) or next(
+            d for d in (source() for source in DEVICE_SOURCES) if d is not None
+        )
+
+    # 处理 devices 参数（支持逗号分隔的字符串）
+    if devices != "auto":
+        parsed_devices = _parse_devices(devices)
+        if parsed_devices is None:
+            logger.error(f"❌ Invalid devices format: {devices}. Use comma-separated integers (e.g., '0,1,2')")
+            sys.exit(1)
+        devices = parsed_devices
+        logger.info(f"📊 Parsed devices: {devices}")
+
+    # 2. workers-per-device：命令行 > WORKER_GPUS > 1
+    workers_per_device = args.workers_per_device
+    if workers_per_device is None:
+        workers_per_device = 1
+        env_workers = env_config.worker_gpus
+        if env_workers:
+            try:
+                workers_per_device = int(env_workers)
+                logger.info(f"📊 Using workers-per-device from WORKER_GPUS: {workers_per_device}")
+            except ValueError:
+                logger.warning(f"⚠️  Invalid WORKER_GPUS value: {env_workers}, using default: 1")
+
+    # 3. port：命令行 > WORKER_PORT > 8001
+    port = args.port
+    if port is None:
+        port = 8001
+        env_port = env_config.worker_port
+        if env_port:
+            try:
+                port = int(env_port)
+                logger.info(f"📊 Using port from WORKER_PORT env: {port}")
+            except ValueError:
+                logger.warning(f"⚠️  Invalid WORKER_PORT value: {env_port}, using default: 8001")
+
+    return WorkerRuntimeConfig(
+        output_dir=args.output_dir or env_config.output_path,
+        devices=devices,
+        workers_per_device=workers_per_device,
+        port=port,
+    )
 
 
 if __name__ == "__main__":
@@ -1678,7 +2700,7 @@ if __name__ == "__main__":
         default=None,
         help="Output directory for processed files (default: from OUTPUT_PATH env or /app/output)",
     )
-    parser.add_argument("--port", type=int, default=8001, help="Server port (default: 8001, or from WORKER_PORT env)")
+    parser.add_argument("--port", type=int, default=None, help="Server port (default: from WORKER_PORT env or 8001)")
     parser.add_argument(
         "--accelerator",
         type=str,
@@ -1686,10 +2708,26 @@ if __name__ == "__main__":
         choices=["auto", "cuda", "cpu"],
         help="Accelerator type (default: auto)",
     )
-    parser.add_argument("--workers-per-device", type=int, default=1, help="Number of workers per device (default: 1)")
+    parser.add_argument(
+        "--workers-per-device",
+        type=int,
+        default=None,
+        help="Number of workers per device (default: from WORKER_GPUS env or 1)",
+    )
     parser.add_argument("--devices", type=str, default="auto", help="Devices to use, comma-separated (default: auto)")
     parser.add_argument(
-        "--poll-interval", type=float, default=0.5, help="Worker poll interval in seconds (default: 0.5)"
+        "--poll-interval",
+        "--min-poll-interval",
+        dest="poll_interval",
+        type=float,
+        default=0.5,
+        help="Minimum worker poll interval in seconds, used right after a task is pulled (default: 0.5)",
+    )
+    parser.add_argument(
+        "--max-poll-interval",
+        type=float,
+        default=10.0,
+        help="Maximum worker poll interval in seconds when idle; backs off 1.5x per empty poll (default: 10)",
     )
     parser.add_argument(
         "--disable-worker-loop",
@@ -1708,73 +2746,18 @@ if __name__ == "__main__":
         default=[],
         help='PaddleOCR VL VLLM API 列表（Python list 字面量格式，如: \'["http://127.0.0.1:8000/v1", "http://127.0.0.1:8001/v1"]\'）',
     )
+    env_config = WorkerEnvConfig.from_env()
     args = parser.parse_args()
-
-    # ============================================================================
-    # 从环境变量读取配置（如果命令行没有指定）
-    # ============================================================================
-    # 1. 如果没有通过命令行指定 devices，尝试自动检测或从环境变量读取
-    devices = args.devices
-    if devices == "auto":
-        # 首先尝试从环境变量 CUDA_VISIBLE_DEVICES 读取（如果用户明确设置了）
-        env_devices = os.getenv("CUDA_VISIBLE_DEVICES")
-        if env_devices and env_devices.strip():
-            devices = env_devices
-            logger.info(f"📊 Using devices from CUDA_VISIBLE_DEVICES: {devices}")
-        else:
-            # 自动检测可用的 CUDA 设备
-            try:
-                import torch
-
-                if torch.cuda.is_available():
-                    device_count = torch.cuda.device_count()
-                    devices = ",".join(str(i) for i in range(device_count))
-                    logger.info(f"📊 Auto-detected {device_count} CUDA devices: {devices}")
-                else:
-                    logger.info("📊 No CUDA devices available, using CPU mode")
-                    devices = "auto"  # 保持 auto，让 LitServe 使用 CPU
-            except Exception as e:
-                logger.warning(f"⚠️  Failed to detect CUDA devices: {e}, using CPU mode")
-                devices = "auto"
-
-    # 2. 处理 devices 参数（支持逗号分隔的字符串）
-    if devices != "auto":
-        try:
-            devices = [int(d.strip()) for d in devices.split(",")]
-            logger.info(f"📊 Parsed devices: {devices}")
-        except ValueError:
-            logger.error(f"❌ Invalid devices format: {devices}. Use comma-separated integers (e.g., '0,1,2')")
-            sys.exit(1)
-
-    # 3. 如果没有通过命令行指定 workers-per-device，尝试从环境变量 WORKER_GPUS 读取
-    workers_per_device = args.workers_per_device
-    if args.workers_per_device == 1:  # 默认值
-        env_workers = os.getenv("WORKER_GPUS")
-        if env_workers:
-            try:
-                workers_per_device = int(env_workers)
-                logger.info(f"📊 Using workers-per-device from WORKER_GPUS: {workers_per_device}")
-            except ValueError:
-                logger.warning(f"⚠️  Invalid WORKER_GPUS value: {env_workers}, using default: 1")
-
-    # 4. 如果没有通过命令行指定 port，尝试从环境变量 WORKER_PORT 读取
-    port = args.port
-    if args.port == 8001:  # 默认值
-        env_port = os.getenv("WORKER_PORT", "8001")
-        try:
-            port = int(env_port)
-            logger.info(f"📊 Using port from WORKER_PORT env: {port}")
-        except ValueError:
-            logger.warning(f"⚠️  Invalid WORKER_PORT value: {env_port}, using default: 8001")
-            port = 8001
+    config = _resolve_config(args, env_config)
 
     start_litserve_workers(
-        output_dir=args.output_dir,
+        output_dir=config.output_dir,
         accelerator=args.accelerator,
-        devices=devices,
-        workers_per_device=workers_per_device,
-        port=port,
+        devices=config.devices,
+        workers_per_device=config.workers_per_device,
+        port=config.port,
         poll_interval=args.poll_interval,
+        max_poll_interval=args.max_poll_interval,
         enable_worker_loop=not args.disable_worker_loop,
         paddleocr_vl_vllm_engine_enabled=args.paddleocr_vl_vllm_engine_enabled,
         paddleocr_vl_vllm_api_list=args.paddleocr_vl_vllm_api_list,
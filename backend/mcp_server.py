@@ -14,10 +14,16 @@ MinerU Tianshu - MCP Server
 """
 
 import asyncio
+import binascii
+import importlib.util
+import io
 import json
+import re
 import os
 import sys
-from typing import Any
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator
 from pathlib import Path
 import base64
 
@@ -25,29 +31,114 @@ from mcp.server import Server
 from mcp.server.sse import SseServerTransport
 from mcp.types import Tool, TextContent
 from starlette.applications import Starlette
+from starlette.responses import Response
 from starlette.routing import Route
 import aiohttp
 from loguru import logger
 
+# 尝试导入 orjson（C 实现的 JSON 序列化/解析，解析结果较大时响应处理更快）
+try:
+    import orjson
+
+    def _dump_json(data) -> str:
+        """序列化为带缩进的 JSON 字符串（保留非 ASCII 字符）"""
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    _load_json = orjson.loads
+except ImportError:
+
+    def _dump_json(data) -> str:
+        """序列化为带缩进的 JSON 字符串（保留非 ASCII 字符）"""
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    _load_json = json.loads
+
+
+def _reply(data) -> list[TextContent]:
+    """将数据序列化为 JSON 文本，包装为工具返回结果"""
+    return [TextContent(type="text", text=_dump_json(data))]
+
+
 # 文件大小限制（从环境变量读取，0 表示不限制）
 MAX_FILE_SIZE_BYTES = int(os.getenv("MAX_FILE_SIZE", "0"))  # 0 = 不限制
 MAX_FILE_SIZE_MB = MAX_FILE_SIZE_BYTES / (1024 * 1024) if MAX_FILE_SIZE_BYTES > 0 else 0
 import uvicorn
 
+# Base64 分块解码大小（编码字符数，必须是 4 的倍数）
+BASE64_DECODE_CHUNK = 4 * 64 * 1024
+
+# 超过该长度（编码字符数）的 Base64 数据在线程池中整体处理（去空白、解码），避免阻塞事件循环；
+# 更小的数据直接在事件循环中处理，省去线程切换开销
+BASE64_THREAD_THRESHOLD = 1_000_000
+
+# URL 下载的分块大小（字节）
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 不超过该大小（字节）的文件在内存中直接转发给 API Server，不写临时文件
+INLINE_UPLOAD_MAX_BYTES = 8 * 1024 * 1024
+
+# 等待任务完成时的轮询间隔（秒）：从最小值开始按倍数递增，直到上限
+TASK_POLL_MIN_INTERVAL = 0.25
+TASK_POLL_MAX_INTERVAL = 10.0
+TASK_POLL_BACKOFF = 1.5
+
+# 长轮询单次等待上限（秒），API Server 在任务状态变化时提前返回
+TASK_LONG_POLL_WAIT = 30.0
+
+# 等待任务完成时只请求需要的字段（API Server 不再为每次轮询加载子任务列表）；
+# data 只在任务完成时才有内容，包含在内可省去完成后的再次请求
+TASK_POLL_FIELDS = "status,error_message,data,created_at,started_at,completed_at"
+
+# Content-Disposition 中的文件名
+_CD_FILENAME_RE = re.compile(r'filename[*]?=["\']?([^"\';\r\n]+)')
+# Base64 数据中的空白字符（MIME 风格换行等）
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# 共享上传目录（与 API Server / Worker 一致），启动时创建一次
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+UPLOAD_DIR = Path(os.getenv("UPLOAD_PATH", str(PROJECT_ROOT / "data" / "uploads")))
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
 # API 配置（从环境变量读取）
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 
 # 初始化 MCP Server
 app = Server("mineru-tianshu")
 
+# 所有工具调用共享的 HTTP 会话（复用到 API Server 的 keep-alive 连接）
+_session: aiohttp.ClientSession | None = None
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """列出所有可用的工具"""
-    return [
-        Tool(
-            name="parse_document",
-            description="""
+
+async def get_session() -> aiohttp.ClientSession:
+    """获取共享的 aiohttp 会话（首次调用时创建）"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=75))
+    return _session
+
+
+async def close_session():
+    """关闭共享的 aiohttp 会话"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+# 并发提交合并：合并窗口（秒）内到达的提交通过一次 submit_batch 请求发送
+SUBMIT_BATCH_WINDOW = float(os.getenv("MCP_SUBMIT_BATCH_WINDOW", "0.05"))
+SUBMIT_BATCH_MAX = 16  # 不超过 API Server 的 SUBMIT_BATCH_MAX_FILES
+_submit_queue: asyncio.Queue | None = None
+_submit_batcher: asyncio.Task | None = None
+# API Server 是否支持 submit_batch（收到 404/405 后置为 False，回退到逐个提交）
+_batch_supported = True
+
+
+# 工具列表是静态的，启动时构建一次
+TOOLS: list[Tool] = [
+    Tool(
+        name="parse_document",
+        description="""
 解析文档（PDF、图片、Office文档等）为 Markdown 格式。
 
 📁 支持 2 种文件输入方式：
@@ -64,70 +155,70 @@ async def list_tools() -> list[Tool]:
 - 支持中英文、日文、韩文等多语言
 - 支持任务优先级设置
 - 异步处理，可选择等待完成或稍后查询
-            """.strip(),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    # 方式 1: Base64 编码（小文件推荐）
-                    "file_base64": {
-                        "type": "string",
-                        "description": "Base64 编码的文件内容",
-                    },
-                    "file_name": {"type": "string", "description": "文件名（使用 file_base64 时必需）"},
-                    # 方式 2: URL 下载
-                    "file_url": {"type": "string", "description": "文件的公网 URL（服务器会自动下载）"},
-                    # 解析选项
-                    "backend": {
-                        "type": "string",
-                        "enum": ["pipeline", "vlm-transformers", "vlm-vllm-engine"],
-                        "description": "处理后端，默认: pipeline",
-                        "default": "pipeline",
-                    },
-                    "lang": {
-                        "type": "string",
-                        "enum": ["ch", "en", "korean", "japan"],
-                        "description": "文档语言，默认: ch",
-                        "default": "ch",
-                    },
-                    "method": {
-                        "type": "string",
-                        "enum": ["auto", "txt", "ocr"],
-                        "description": "解析方法，默认: auto",
-                        "default": "auto",
-                    },
-                    "formula_enable": {
-                        "type": "boolean",
-                        "description": "是否启用公式识别，默认: true",
-                        "default": True,
-                    },
-                    "table_enable": {"type": "boolean", "description": "是否启用表格识别，默认: true", "default": True},
-                    "priority": {
-                        "type": "integer",
-                        "description": "任务优先级（0-100），数字越大越优先，默认: 0",
-                        "default": 0,
-                        "minimum": 0,
-                        "maximum": 100,
-                    },
-                    "wait_for_completion": {
-                        "type": "boolean",
-                        "description": "是否等待任务完成，默认: true",
-                        "default": True,
-                    },
-                    "max_wait_seconds": {
-                        "type": "integer",
-                        "description": "最大等待时间（秒），默认: 300",
-                        "default": 300,
-                        "minimum": 10,
-                        "maximum": 3600,
-                    },
+        """.strip(),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                # 方式 1: Base64 编码（小文件推荐）
+                "file_base64": {
+                    "type": "string",
+                    "description": "Base64 编码的文件内容",
+                },
+                "file_name": {"type": "string", "description": "文件名（使用 file_base64 时必需）"},
+                # 方式 2: URL 下载
+                "file_url": {"type": "string", "description": "文件的公网 URL（服务器会自动下载）"},
+                # 解析选项
+                "backend": {
+                    "type": "string",
+                    "enum": ["pipeline", "vlm-transformers", "vlm-vllm-engine"],
+                    "description": "处理后端，默认: pipeline",
+                    "default": "pipeline",
+                },
+                "lang": {
+                    "type": "string",
+                    "enum": ["ch", "en", "korean", "japan"],
+                    "description": "文档语言，默认: ch",
+                    "default": "ch",
+                },
+                "method": {
+                    "type": "string",
+                    "enum": ["auto", "txt", "ocr"],
+                    "description": "解析方法，默认: auto",
+                    "default": "auto",
+                },
+                "formula_enable": {
+                    "type": "boolean",
+                    "description": "是否启用公式识别，默认: true",
+                    "default": True,
+                },
+                "table_enable": {"type": "boolean", "description": "是否启用表格识别，默认: true", "default": True},
+                "priority": {
+                    "type": "integer",
+                    "description": "任务优先级（0-100），数字越大越优先，默认: 0",
+                    "default": 0,
+                    "minimum": 0,
+                    "maximum": 100,
+                },
+                "wait_for_completion": {
+                    "type": "boolean",
+                    "description": "是否等待任务完成，默认: true",
+                    "default": True,
+                },
+                "max_wait_seconds": {
+                    "type": "integer",
+                    "description": "最大等待时间（秒），默认: 300",
+                    "default": 300,
+                    "minimum": 10,
+                    "maximum": 3600,
                 },
-                # 必须提供 2 种方式之一
-                "oneOf": [{"required": ["file_base64", "file_name"]}, {"required": ["file_url"]}],
             },
-        ),
-        Tool(
-            name="get_task_status",
-            description="""
+            # 必须提供 2 种方式之一
+            "oneOf": [{"required": ["file_base64", "file_name"]}, {"required": ["file_url"]}],
+        },
+    ),
+    Tool(
+        name="get_task_status",
+        description="""
 查询文档解析任务的状态和结果。
 
 可以查询任务的：
@@ -135,55 +226,68 @@ async def list_tools() -> list[Tool]:
 - 处理进度和时间信息
 - 错误信息（如果失败）
 - 解析结果内容（如果完成）
-            """.strip(),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {"type": "string", "description": "任务 ID（由 parse_document 返回）"},
-                    "include_content": {
-                        "type": "boolean",
-                        "description": "是否包含完整的解析结果内容，默认: true",
-                        "default": True,
-                    },
+        """.strip(),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "task_id": {"type": "string", "description": "任务 ID（由 parse_document 返回）"},
+                "include_content": {
+                    "type": "boolean",
+                    "description": "是否包含完整的解析结果内容，默认: true",
+                    "default": True,
                 },
-                "required": ["task_id"],
             },
-        ),
-        Tool(
-            name="list_tasks",
-            description="""
+            "required": ["task_id"],
+        },
+    ),
+    Tool(
+        name="list_tasks",
+        description="""
 列出最近的文档解析任务。
 
 可以按状态筛选，查看任务队列情况。
-            """.strip(),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "status": {
-                        "type": "string",
-                        "enum": ["pending", "processing", "completed", "failed", "cancelled"],
-                        "description": "筛选指定状态的任务（可选，不填则返回所有状态）",
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "返回数量限制，默认: 10",
-                        "default": 10,
-                        "minimum": 1,
-                        "maximum": 100,
-                    },
+        """.strip(),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "status": {
+                    "type": "string",
+                    "enum": ["pending", "processing", "completed", "failed", "cancelled"],
+                    "description": "筛选指定状态的任务（可选，不填则返回所有状态）",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "返回数量限制，默认: 10",
+                    "default": 10,
+                    "minimum": 1,
+                    "maximum": 100,
                 },
             },
-        ),
-        Tool(
-            name="get_queue_stats",
-            description="""
+        },
+    ),
+    Tool(
+        name="get_queue_stats",
+        description="""
 获取任务队列统计信息。
 
 返回各个状态的任务数量，了解系统负载情况。
-            """.strip(),
-            inputSchema={"type": "object", "properties": {}},
-        ),
-    ]
+        """.strip(),
+        inputSchema={"type": "object", "properties": {}},
+    ),
+]
+
+
+# 固定内容的错误响应，启动时序列化一次
+ERROR_NO_FILE = _reply({"error": "Must provide either file_base64 or file_url"})
+ERROR_LIST_TASKS = _reply({"error": "Failed to list tasks"})
+ERROR_QUEUE_STATS = _reply({"error": "Failed to get queue stats"})
+ERROR_DOWNLOAD_TOO_LARGE = _reply({"error": f"Downloaded file too large. Maximum size is {MAX_FILE_SIZE_MB:.0f}MB."})
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """列出所有可用的工具"""
+    return TOOLS
 
 
 @app.call_tool()
@@ -201,325 +305,421 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
         elif name == "get_queue_stats":
             return await get_queue_stats(arguments)
         else:
-            return [TextContent(type="text", text=json.dumps({"error": f"Unknown tool: {name}"}, indent=2))]
+            return _reply({"error": f"Unknown tool: {name}"})
     except Exception as e:
         logger.error(f"❌ Tool call failed: {name}, error: {e}")
         logger.exception(e)
-        return [TextContent(type="text", text=json.dumps({"error": str(e), "tool": name}, indent=2))]
+        return _reply({"error": str(e), "tool": name})
+
+
+# 表单中布尔参数的取值（API Server 按 true/false 解析）
+_BOOL_FORM_VALUES = {True: "true", False: "false"}
+
+
+def _file_payload(file_data):
+    """
+    上传的文件内容：内存中的小文件直接使用 bytes（BytesIO 由 bytes 创建时 getvalue 不复制数据），
+    请求以 Content-Length 定长发送；临时文件仍以文件对象分块读取
+    """
+    if isinstance(file_data, io.BytesIO):
+        return file_data.getvalue()
+    return file_data
+
+
+async def _submit_single(params: dict, file_name: str, file_data) -> tuple[int, Any]:
+    """
+    通过 /tasks/submit 提交单个任务
+
+    Returns:
+        (HTTP 状态码, 成功时的响应 JSON / 失败时的错误文本)
+    """
+    form_data = aiohttp.FormData()
+    form_data.add_field("file", _file_payload(file_data), filename=file_name, content_type="application/octet-stream")
+    for key, value in params.items():
+        form_data.add_field(key, _BOOL_FORM_VALUES[value] if isinstance(value, bool) else str(value))
+
+    session = await get_session()
+    async with session.post(f"{API_BASE_URL}/api/v1/tasks/submit", data=form_data) as resp:
+        if resp.status != 200:
+            return resp.status, await resp.text()
+        return resp.status, await resp.json(loads=_load_json)
+
+
+async def _submit_batch(items: list):
+    """通过 /tasks/submit_batch 一次提交一批任务，并将各自的结果设置到对应的 Future 上"""
+    global _batch_supported
+
+    if len(items) > 1 and _batch_supported:
+        form_data = aiohttp.FormData()
+        for _, file_name, file_data, _ in items:
+            form_data.add_field(
+                "files", _file_payload(file_data), filename=file_name, content_type="application/octet-stream"
+            )
+        form_data.add_field("params", json.dumps([params for params, _, _, _ in items]))
+
+        session = await get_session()
+        async with session.post(f"{API_BASE_URL}/api/v1/tasks/submit_batch", data=form_data) as resp:
+            if resp.status == 200:
+                tasks = (await resp.json(loads=_load_json))["tasks"]
+                logger.info(f"📦 Submitted {len(tasks)} tasks in one batch")
+                for (*_, future), task in zip(items, tasks):
+                    if not future.done():
+                        future.set_result((200, task))
+                # 响应中的任务数少于提交数时，其余提交不能一直挂起
+                if len(tasks) < len(items):
+                    error = (502, f"submit_batch returned {len(tasks)} tasks for {len(items)} files")
+                    for *_, future in items[len(tasks) :]:
+                        if not future.done():
+                            future.set_result(error)
+                return
+            if resp.status not in (404, 405):
+                error = (resp.status, await resp.text())
+                for *_, future in items:
+                    if not future.done():
+                        future.set_result(error)
+                return
+
+        # 旧版 API Server 没有批量接口，之后改为逐个提交
+        logger.info("ℹ️  API Server does not support submit_batch, submitting tasks individually")
+        _batch_supported = False
+        # 发送后 aiohttp 已关闭临时文件对象，需按路径重新打开（内存中的 BytesIO 以 bytes 发送，不受影响）
+        reopened = [
+            file_data if isinstance(file_data, io.BytesIO) else open(file_data.name, "rb")
+            for _, _, file_data, _ in items
+        ]
+        try:
+            results = await asyncio.gather(
+                *(
+                    _submit_single(params, file_name, file_data)
+                    for (params, file_name, _, _), file_data in zip(items, reopened)
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            for (_, _, file_data, _), reopened_data in zip(items, reopened):
+                if reopened_data is not file_data:
+                    reopened_data.close()
+    else:
+        results = await asyncio.gather(
+            *(_submit_single(params, file_name, file_data) for params, file_name, file_data, _ in items),
+            return_exceptions=True,
+        )
 
+    for (*_, future), result in zip(items, results):
+        if future.done():
+            continue
+        if isinstance(result, BaseException):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
 
-async def parse_document(args: dict) -> list[TextContent]:
-    """解析文档 - 支持 Base64 和 URL 两种输入方式"""
-    async with aiohttp.ClientSession() as session:
-        temp_file_path = None
-        file_data = None
-        file_name = None
 
+async def _run_submit_batcher(queue: asyncio.Queue):
+    """后台批量提交循环：收到第一个提交后等待一个合并窗口，再把窗口内的提交一起发送"""
+    while True:
+        items = [await queue.get()]
+        await asyncio.sleep(SUBMIT_BATCH_WINDOW)
+        while len(items) < SUBMIT_BATCH_MAX and not queue.empty():
+            items.append(queue.get_nowait())
         try:
-            # 方式 1: Base64 编码
-            if "file_base64" in args:
-                logger.info("📦 Receiving file via Base64 encoding")
-
-                try:
-                    # Security: Safe use of base64 for file transmission via MCP protocol
-                    # This is legitimate business logic, not code obfuscation
-                    file_content = base64.b64decode(args["file_base64"])
-                except Exception as e:
-                    return [
-                        TextContent(
-                            type="text", text=json.dumps({"error": f"Invalid base64 encoding: {str(e)}"}, indent=2)
-                        )
-                    ]
-
-                file_name = args["file_name"]
-
-                # 检查文件大小（如果设置了限制）
-                size_mb = len(file_content) / (1024 * 1024)
-                if MAX_FILE_SIZE_BYTES > 0 and size_mb > MAX_FILE_SIZE_MB:
-                    return [
-                        TextContent(
-                            type="text",
-                            text=json.dumps(
-                                {
-                                    "error": f"File too large ({size_mb:.1f}MB). Maximum size is {MAX_FILE_SIZE_MB:.0f}MB."
-                                },
-                                indent=2,
-                            ),
-                        )
-                    ]
-
-                logger.info(f"📦 File: {file_name}, Size: {size_mb:.2f}MB")
-
-                # 创建临时文件（使用共享上传目录）
-                import uuid
-                import os
-
-                project_root = Path(__file__).parent.parent
-                default_upload = project_root / "data" / "uploads"
-                upload_dir = Path(os.getenv("UPLOAD_PATH", str(default_upload)))
-                upload_dir.mkdir(parents=True, exist_ok=True)
-                temp_file_path = upload_dir / f"{uuid.uuid4().hex}_{file_name}"
-                temp_file_path.write_bytes(file_content)
-                file_data = open(temp_file_path, "rb")
-
-            # 方式 2: URL 下载
-            elif "file_url" in args:
-                url = args["file_url"]
-                logger.info(f"🌐 Downloading file from URL: {url}")
-
-                try:
-                    async with session.get(url, timeout=aiohttp.ClientTimeout(total=60)) as resp:
-                        if resp.status != 200:
-                            return [
-                                TextContent(
-                                    type="text",
-                                    text=json.dumps(
-                                        {"error": f"Failed to download file from {url}", "status_code": resp.status},
-                                        indent=2,
-                                    ),
-                                )
-                            ]
-
-                        # 从 URL 推断文件名
-                        file_name = Path(url).name or "downloaded_file"
-
-                        # 尝试从 Content-Disposition 获取文件名
-                        if "content-disposition" in resp.headers:
-                            import re
-
-                            cd = resp.headers["content-disposition"]
-                            match = re.search(r'filename[*]?=["\']?([^"\';\r\n]+)', cd)
-                            if match:
-                                file_name = match.group(1)
-
-                        # 下载到临时文件
-                        file_content = await resp.read()
-                        size_mb = len(file_content) / (1024 * 1024)
-
-                        if MAX_FILE_SIZE_BYTES > 0 and size_mb > MAX_FILE_SIZE_MB:
-                            return [
-                                TextContent(
-                                    type="text",
-                                    text=json.dumps(
-                                        {
-                                            "error": f"Downloaded file too large ({size_mb:.1f}MB). Maximum size is {MAX_FILE_SIZE_MB:.0f}MB."
-                                        },
-                                        indent=2,
-                                    ),
-                                )
-                            ]
-
-                        logger.info(f"📦 Downloaded: {file_name}, Size: {size_mb:.2f}MB")
-
-                        # 创建临时文件（使用共享上传目录）
-                        import uuid
-                        import os
-
-                        project_root = Path(__file__).parent.parent
-                        default_upload = project_root / "data" / "uploads"
-                        upload_dir = Path(os.getenv("UPLOAD_PATH", str(default_upload)))
-                        upload_dir.mkdir(parents=True, exist_ok=True)
-                        temp_file_path = upload_dir / f"{uuid.uuid4().hex}_{file_name}"
-                        temp_file_path.write_bytes(file_content)
-                        file_data = open(temp_file_path, "rb")
-
-                except asyncio.TimeoutError:
-                    return [
-                        TextContent(
-                            type="text", text=json.dumps({"error": f"Timeout downloading file from {url}"}, indent=2)
-                        )
-                    ]
-                except Exception as e:
-                    return [
-                        TextContent(
-                            type="text", text=json.dumps({"error": f"Failed to download file: {str(e)}"}, indent=2)
-                        )
-                    ]
+            await _submit_batch(items)
+        except Exception as e:
+            for *_, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+
+async def submit_task(params: dict, file_name: str, file_data) -> tuple[int, Any]:
+    """
+    提交任务到 API Server
+
+    合并窗口内的并发提交会合并为一次 submit_batch 请求（SUBMIT_BATCH_WINDOW=0 时逐个提交）
+
+    Returns:
+        (HTTP 状态码, 成功时包含 task_id 的字典 / 失败时的错误文本)
+    """
+    global _submit_queue, _submit_batcher
+    if SUBMIT_BATCH_WINDOW <= 0 or not _batch_supported:
+        return await _submit_single(params, file_name, file_data)
+
+    if _submit_batcher is None or _submit_batcher.done():
+        _submit_queue = asyncio.Queue()
+        _submit_batcher = asyncio.create_task(_run_submit_batcher(_submit_queue))
+
+    future = asyncio.get_running_loop().create_future()
+    await _submit_queue.put((params, file_name, file_data, future))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # 批量提交可能仍在读取该文件：等提交结束后再让调用方关闭并删除临时文件
+        if not future.done():
+            await asyncio.wait([future])
+        raise
+
+
+# 同时处理（解码 / 下载）输入文件的 parse_document 调用数上限
+_upload_semaphore = asyncio.Semaphore(int(os.getenv("MCP_MAX_CONCURRENT", "8")))
+
+
+def _new_upload_path(file_name: str) -> Path:
+    """在共享上传目录中生成临时文件路径"""
+    return UPLOAD_DIR / f"{uuid.uuid4().hex}_{file_name}"
+
+
+def _strip_whitespace(b64_data: str) -> str:
+    """去掉 Base64 数据中的空白字符（无空白时原样返回）"""
+    if _WHITESPACE_RE.search(b64_data):
+        return _WHITESPACE_RE.sub("", b64_data)
+    return b64_data
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过 MAX_FILE_SIZE 限制"""
+
+
+async def _iter_base64_chunks(b64_data: str) -> AsyncIterator[bytes]:
+    """按 4 字符对齐的分块解码 Base64，内存峰值为 O(分块) 而不是 O(文件)；每块解码很快，直接在事件循环中执行"""
+    for i in range(0, len(b64_data), BASE64_DECODE_CHUNK):
+        yield base64.b64decode(b64_data[i : i + BASE64_DECODE_CHUNK])
+
+
+async def _stage_upload(chunks: AsyncIterator[bytes], file_name: str) -> tuple[Path, int]:
+    """
+    将数据块写入共享上传目录中的临时文件（磁盘写入在线程池中执行，不阻塞事件循环）
+
+    Returns:
+        (临时文件路径, 写入的字节数)
 
+    Raises:
+        UploadTooLargeError: 超过 MAX_FILE_SIZE 限制，已写入的部分文件会被删除
+    """
+    path = _new_upload_path(file_name)
+    total = 0
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in chunks:
+            total += len(chunk)
+            if MAX_FILE_SIZE_BYTES > 0 and total > MAX_FILE_SIZE_BYTES:
+                raise UploadTooLargeError(f"{file_name} exceeds {MAX_FILE_SIZE_MB:.0f}MB")
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        path.unlink(missing_ok=True)
+        raise
+    await asyncio.to_thread(f.close)
+    return path, total
+
+
+async def parse_document(args: dict) -> list[TextContent]:
+    """解析文档 - 支持 Base64 和 URL 两种输入方式"""
+    session = await get_session()
+    temp_file_path = None
+    file_data = None
+    file_name = None
+    upload_slot = False
+
+    try:
+        # 限制同时解码 / 下载的文件数，超出的调用在此排队，避免大量并发上传耗尽内存
+        await _upload_semaphore.acquire()
+        upload_slot = True
+
+        # 方式 1: Base64 编码
+        if "file_base64" in args:
+            logger.info("📦 Receiving file via Base64 encoding")
+
+            file_name = args["file_name"]
+            b64_data = args["file_base64"]
+            # MIME 风格的 Base64 每行带换行，先去掉空白字符，保证分块边界与 4 字符分组对齐
+            if len(b64_data) > BASE64_THREAD_THRESHOLD:
+                b64_data = await asyncio.to_thread(_strip_whitespace, b64_data)
             else:
-                return [
-                    TextContent(
-                        type="text", text=json.dumps({"error": "Must provide either file_base64 or file_url"}, indent=2)
-                    )
-                ]
-
-            # 提交任务到 API Server
-            form_data = aiohttp.FormData()
-            form_data.add_field("file", file_data, filename=file_name)
-            form_data.add_field("backend", args.get("backend", "pipeline"))
-            form_data.add_field("lang", args.get("lang", "ch"))
-            form_data.add_field("method", args.get("method", "auto"))
-            form_data.add_field("formula_enable", str(args.get("formula_enable", True)).lower())
-            form_data.add_field("table_enable", str(args.get("table_enable", True)).lower())
-            form_data.add_field("priority", str(args.get("priority", 0)))
-
-            logger.info(f"📤 Submitting task for: {file_name}")
-
-            async with session.post(f"{API_BASE_URL}/api/v1/tasks/submit", data=form_data) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    return [
-                        TextContent(
-                            type="text",
-                            text=json.dumps(
-                                {"error": "Failed to submit task", "details": error_text, "status_code": resp.status},
-                                indent=2,
-                            ),
-                        )
-                    ]
-
-                result = await resp.json()
-                task_id = result["task_id"]
-                logger.info(f"✅ Task submitted: {task_id}")
-
-            # 是否等待完成
-            if not args.get("wait_for_completion", True):
-                return [
-                    TextContent(
-                        type="text",
-                        text=json.dumps(
-                            {
-                                "status": "submitted",
-                                "task_id": task_id,
-                                "file_name": file_name,
-                                "message": "Task submitted successfully. Use get_task_status to check progress.",
-                            },
-                            indent=2,
-                            ensure_ascii=False,
-                        ),
-                    )
-                ]
-
-            # 等待任务完成
-            logger.info(f"⏳ Waiting for task completion: {task_id}")
-            max_wait = args.get("max_wait_seconds", 300)
-            poll_interval = 2
-            elapsed = 0
-
-            while elapsed < max_wait:
-                async with session.get(f"{API_BASE_URL}/api/v1/tasks/{task_id}") as resp:
+                b64_data = _strip_whitespace(b64_data)
+
+            # 检查文件大小（如果设置了限制）：解码前按编码长度计算，超限时不写入任何数据
+            size_bytes = len(b64_data) * 3 // 4 - b64_data[-2:].count("=")
+            size_mb = size_bytes / (1024 * 1024)
+            if MAX_FILE_SIZE_BYTES > 0 and size_mb > MAX_FILE_SIZE_MB:
+                return _reply({"error": f"File too large ({size_mb:.1f}MB). Maximum size is {MAX_FILE_SIZE_MB:.0f}MB."})
+
+            logger.info(f"📦 File: {file_name}, Size: {size_mb:.2f}MB")
+
+            try:
+                # Security: Safe use of base64 for file transmission via MCP protocol
+                # This is legitimate business logic, not code obfuscation
+                if size_bytes <= INLINE_UPLOAD_MAX_BYTES:
+                    # 小文件在内存中解码后直接上传，不落盘；较大的数据在线程池中解码，不阻塞事件循环
+                    if len(b64_data) > BASE64_THREAD_THRESHOLD:
+                        file_content = await asyncio.to_thread(base64.b64decode, b64_data)
+                    else:
+                        file_content = base64.b64decode(b64_data)
+                    file_data = io.BytesIO(file_content)
+                else:
+                    # 大文件分块解码，由 _stage_upload 在线程池中写入磁盘
+                    temp_file_path, _ = await _stage_upload(_iter_base64_chunks(b64_data), file_name)
+                    file_data = await asyncio.to_thread(open, temp_file_path, "rb")
+            except (binascii.Error, ValueError) as e:
+                return _reply({"error": f"Invalid base64 encoding: {str(e)}"})
+
+        # 方式 2: URL 下载
+        elif "file_url" in args:
+            url = args["file_url"]
+            logger.info(f"🌐 Downloading file from URL: {url}")
+
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=60)) as resp:
                     if resp.status != 200:
-                        return [
-                            TextContent(
-                                type="text",
-                                text=json.dumps({"error": "Failed to query task status", "task_id": task_id}, indent=2),
-                            )
-                        ]
-
-                    task_status = await resp.json()
-                    status = task_status["status"]
-
-                    if status == "completed":
-                        # 任务完成，返回结果
-                        logger.info(f"✅ Task completed: {task_id}")
-                        content = task_status.get("data", {}).get("content", "") if task_status.get("data") else ""
-
-                        return [
-                            TextContent(
-                                type="text",
-                                text=json.dumps(
-                                    {
-                                        "status": "completed",
-                                        "task_id": task_id,
-                                        "file_name": file_name,
-                                        "content": content,
-                                        "processing_time": _calculate_processing_time(task_status),
-                                        "created_at": task_status.get("created_at"),
-                                        "started_at": task_status.get("started_at"),
-                                        "completed_at": task_status.get("completed_at"),
-                                    },
-                                    indent=2,
-                                    ensure_ascii=False,
-                                ),
-                            )
-                        ]
-
-                    elif status == "failed":
-                        logger.error(f"❌ Task failed: {task_id}")
-                        return [
-                            TextContent(
-                                type="text",
-                                text=json.dumps(
-                                    {
-                                        "status": "failed",
-                                        "task_id": task_id,
-                                        "file_name": file_name,
-                                        "error": task_status.get("error_message", "Unknown error"),
-                                        "created_at": task_status.get("created_at"),
-                                        "started_at": task_status.get("started_at"),
-                                        "completed_at": task_status.get("completed_at"),
-                                    },
-                                    indent=2,
-                                    ensure_ascii=False,
-                                ),
-                            )
-                        ]
-
-                    elif status == "cancelled":
-                        logger.warning(f"⚠️ Task cancelled: {task_id}")
-                        return [
-                            TextContent(
-                                type="text",
-                                text=json.dumps(
-                                    {"status": "cancelled", "task_id": task_id, "file_name": file_name},
-                                    indent=2,
-                                    ensure_ascii=False,
-                                ),
-                            )
-                        ]
+                        return _reply({"error": f"Failed to download file from {url}", "status_code": resp.status})
+
+                    # 从 URL 推断文件名
+                    file_name = Path(url).name or "downloaded_file"
 
-                    elif status in ["pending", "processing"]:
-                        await asyncio.sleep(poll_interval)
-                        elapsed += poll_interval
-                        if elapsed % 10 == 0:  # 每 10 秒记录一次
-                            logger.info(f"⏳ Task {task_id} status: {status}, elapsed: {elapsed}s")
+                    # 尝试从 Content-Disposition 获取文件名
+                    if "content-disposition" in resp.headers:
+                        cd = resp.headers["content-disposition"]
+                        match = _CD_FILENAME_RE.search(cd)
+                        if match:
+                            file_name = match.group(1)
 
+                    # 服务器声明的大小已超限时，不开始下载
+                    if MAX_FILE_SIZE_BYTES > 0 and (resp.content_length or 0) > MAX_FILE_SIZE_BYTES:
+                        return ERROR_DOWNLOAD_TOO_LARGE
+
+                    if resp.content_length is not None and resp.content_length <= INLINE_UPLOAD_MAX_BYTES:
+                        # 大小已知且较小的文件直接读入内存上传，不落盘
+                        file_content = await resp.read()
+                        total = len(file_content)
+                        file_data = io.BytesIO(file_content)
                     else:
-                        return [
-                            TextContent(
-                                type="text",
-                                text=json.dumps(
-                                    {"status": status, "task_id": task_id, "file_name": file_name},
-                                    indent=2,
-                                    ensure_ascii=False,
-                                ),
+                        # 分块流式写入临时文件，内存占用与文件大小无关；超过大小限制时立即中止下载
+                        try:
+                            temp_file_path, total = await _stage_upload(
+                                resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE), file_name
                             )
-                        ]
-
-            # 超时
-            logger.warning(f"⏰ Task timeout: {task_id}")
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(
-                        {
-                            "status": "timeout",
-                            "task_id": task_id,
-                            "file_name": file_name,
-                            "message": f"Task did not complete within {max_wait} seconds. Use get_task_status to check later.",
-                        },
-                        indent=2,
-                        ensure_ascii=False,
-                    ),
-                )
-            ]
+                        except UploadTooLargeError:
+                            return ERROR_DOWNLOAD_TOO_LARGE
+                        file_data = await asyncio.to_thread(open, temp_file_path, "rb")
 
-        finally:
-            # 清理文件和临时文件
-            if file_data is not None:
-                try:
-                    if not file_data.closed:
-                        file_data.close()
-                        logger.debug(f"Closed file handle for: {file_name}")
-                except Exception as e:
-                    logger.warning(f"Failed to close file handle: {e}")
-            if temp_file_path is not None:
-                try:
-                    if temp_file_path.exists():
-                        temp_file_path.unlink()
-                        logger.info(f"Cleaned temp file: {temp_file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete temp file: {e}")
+                    size_mb = total / (1024 * 1024)
+                    logger.info(f"📦 Downloaded: {file_name}, Size: {size_mb:.2f}MB")
+
+            except asyncio.TimeoutError:
+                return _reply({"error": f"Timeout downloading file from {url}"})
+            except Exception as e:
+                return _reply({"error": f"Failed to download file: {str(e)}"})
+
+        else:
+            return ERROR_NO_FILE
+
+        # 输入文件已落盘或已在内存中，释放上传名额（提交和等待结果不占用名额）
+        _upload_semaphore.release()
+        upload_slot = False
+
+        # 提交任务到 API Server
+        params = {
+            "backend": args.get("backend", "pipeline"),
+            "lang": args.get("lang", "ch"),
+            "method": args.get("method", "auto"),
+            "formula_enable": bool(args.get("formula_enable", True)),
+            "table_enable": bool(args.get("table_enable", True)),
+            "priority": int(args.get("priority", 0)),
+        }
+
+        logger.info(f"📤 Submitting task for: {file_name}")
+
+        # 无论是否等待完成都经由批量提交（并发调用合并为一次上传请求），
+        # 等待完成时提交后直接进入下方的长轮询
+        wait_for_completion = args.get("wait_for_completion", True)
+        max_wait = args.get("max_wait_seconds", 300)
+        status_code, result = await submit_task(params, file_name, file_data)
+        if status_code != 200:
+            return _reply({"error": "Failed to submit task", "details": result, "status_code": status_code})
+
+        task_id = result["task_id"]
+        logger.info(f"✅ Task submitted: {task_id}")
+
+        # 是否等待完成
+        if not wait_for_completion:
+            return _reply(
+                {
+                    "status": "submitted",
+                    "task_id": task_id,
+                    "file_name": file_name,
+                    "message": "Task submitted successfully. Use get_task_status to check progress.",
+                }
+            )
+
+        task_result = _task_result(result, task_id, file_name)
+        if task_result is not None:
+            return task_result
+
+        # 等待任务完成
+        logger.info(f"⏳ Waiting for task completion: {task_id}")
+        # 优先使用长轮询（wait/since_status），每次状态变化只需一次请求；
+        # 旧版 API Server 会忽略这些参数并立即返回，此时退回到指数退避轮询
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + max_wait
+        poll_interval = TASK_POLL_MIN_INTERVAL
+        next_log_at = start + 10.0
+        last_status = result["status"]
+
+        while loop.time() < deadline:
+            params = {
+                "wait": f"{min(TASK_LONG_POLL_WAIT, deadline - loop.time()):.1f}",
+                "since_status": last_status,
+                "fields": TASK_POLL_FIELDS,
+            }
+            request_start = loop.time()
+            async with session.get(f"{API_BASE_URL}/api/v1/tasks/{task_id}", params=params) as resp:
+                if resp.status != 200:
+                    return _reply({"error": "Failed to query task status", "task_id": task_id})
+
+                task_status = await resp.json(loads=_load_json)
+
+            task_result = _task_result(task_status, task_id, file_name)
+            if task_result is not None:
+                return task_result
+
+            status = task_status["status"]
+            # 状态未变且立即返回，说明服务端不支持长轮询
+            if status == last_status and loop.time() - request_start < 1.0:
+                await asyncio.sleep(min(poll_interval, max(0.0, deadline - loop.time())))
+                poll_interval = min(poll_interval * TASK_POLL_BACKOFF, TASK_POLL_MAX_INTERVAL)
+            last_status = status
+            if loop.time() >= next_log_at:  # 每 10 秒记录一次
+                next_log_at += 10.0
+                logger.info(f"⏳ Task {task_id} status: {status}, elapsed: {loop.time() - start:.0f}s")
+
+        # 超时
+        logger.warning(f"⏰ Task timeout: {task_id}")
+        return _reply(
+            {
+                "status": "timeout",
+                "task_id": task_id,
+                "file_name": file_name,
+                "message": f"Task did not complete within {max_wait} seconds. Use get_task_status to check later.",
+            }
+        )
+
+    finally:
+        if upload_slot:
+            _upload_semaphore.release()
+
+        # 清理文件和临时文件
+        if file_data is not None:
+            try:
+                if not file_data.closed:
+                    file_data.close()
+                    logger.debug(f"Closed file handle for: {file_name}")
+            except Exception as e:
+                logger.warning(f"Failed to close file handle: {e}")
+        if temp_file_path is not None:
+            try:
+                if temp_file_path.exists():
+                    temp_file_path.unlink()
+                    logger.info(f"Cleaned temp file: {temp_file_path}")
+            except Exception as e:
+                logger.warning(f"Failed to delete temp file: {e}")
 
 
 async def get_task_status(args: dict) -> list[TextContent]:
@@ -529,45 +729,54 @@ async def get_task_status(args: dict) -> list[TextContent]:
 
     logger.info(f"📊 Querying task status: {task_id}")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{API_BASE_URL}/api/v1/tasks/{task_id}") as resp:
-            if resp.status == 404:
-                return [TextContent(type="text", text=json.dumps({"error": f"Task not found: {task_id}"}, indent=2))]
-
-            if resp.status != 200:
-                return [
-                    TextContent(
-                        type="text",
-                        text=json.dumps({"error": "Failed to query task status", "task_id": task_id}, indent=2),
-                    )
-                ]
-
-            task = await resp.json()
-
-            # 构建响应
-            response = {
-                "task_id": task_id,
-                "status": task["status"],
-                "file_name": task["file_name"],
-                "backend": task["backend"],
-                "priority": task["priority"],
-                "created_at": task["created_at"],
-                "started_at": task["started_at"],
-                "completed_at": task["completed_at"],
-                "worker_id": task["worker_id"],
-                "retry_count": task["retry_count"],
-            }
-
-            if task.get("error_message"):
-                response["error_message"] = task["error_message"]
-
-            if include_content and task["status"] == "completed" and task.get("data"):
-                response["content"] = task["data"].get("content", "")
-                response["processing_time"] = _calculate_processing_time(task)
-                if task["data"].get("markdown_file"):
-                    response["markdown_file"] = task["data"]["markdown_file"]
-
-            return [TextContent(type="text", text=json.dumps(response, indent=2, ensure_ascii=False))]
+    session = await get_session()
+    async with session.get(f"{API_BASE_URL}/api/v1/tasks/{task_id}") as resp:
+        if resp.status == 404:
+            return _reply({"error": f"Task not found: {task_id}"})
+
+        if resp.status != 200:
+            return _reply({"error": "Failed to query task status", "task_id": task_id})
+
+        task = await resp.json(loads=_load_json)
+
+        # 构建响应
+        response = {
+            "task_id": task_id,
+            "status": task["status"],
+            "file_name": task["file_name"],
+            "backend": task["backend"],
+            "priority": task["priority"],
+            "created_at": task["created_at"],
+            "started_at": task["started_at"],
+            "completed_at": task["completed_at"],
+            "worker_id": task["worker_id"],
+            "retry_count": task["retry_count"],
+        }
+
+        if task.get("error_message"):
+            response["error_message"] = task["error_message"]
+
+        if include_content and task["status"] == "completed" and task.get("data"):
+            response["content"] = task["data"].get("content", "")
+            response["processing_time"] = _calculate_processing_time(task)
+            if task["data"].get("markdown_file"):
+                response["markdown_file"] = task["data"]["markdown_file"]
+
+        return _reply(response)
+
+
+# list_tasks 返回的任务字段
+TASK_LIST_FIELDS = (
+    "task_id",
+    "file_name",
+    "status",
+    "backend",
+    "priority",
+    "created_at",
+    "started_at",
+    "completed_at",
+    "worker_id",
+)
 
 
 async def list_tasks(args: dict) -> list[TextContent]:
@@ -577,84 +786,114 @@ async def list_tasks(args: dict) -> list[TextContent]:
 
     logger.info(f"📋 Listing tasks: status={status}, limit={limit}")
 
-    params = {"limit": limit}
+    params = {"limit": limit, "fields": ",".join(TASK_LIST_FIELDS)}
     if status:
         params["status"] = status
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{API_BASE_URL}/api/v1/queue/tasks", params=params) as resp:
-            if resp.status != 200:
-                return [TextContent(type="text", text=json.dumps({"error": "Failed to list tasks"}, indent=2))]
+    session = await get_session()
+    async with session.get(f"{API_BASE_URL}/api/v1/queue/tasks", params=params) as resp:
+        if resp.status != 200:
+            return ERROR_LIST_TASKS
 
-            result = await resp.json()
-            tasks = result["tasks"]
+        result = await resp.json(loads=_load_json)
+        tasks = result["tasks"]
 
-            # 简化任务信息
-            simplified_tasks = [
-                {
-                    "task_id": t["task_id"],
-                    "file_name": t["file_name"],
-                    "status": t["status"],
-                    "backend": t["backend"],
-                    "priority": t["priority"],
-                    "created_at": t["created_at"],
-                    "started_at": t["started_at"],
-                    "completed_at": t["completed_at"],
-                    "worker_id": t["worker_id"],
-                }
-                for t in tasks
-            ]
+        # 简化任务信息（旧版 API Server 不支持 fields 参数，仍会返回完整记录）
+        simplified_tasks = [{key: t.get(key) for key in TASK_LIST_FIELDS} for t in tasks]
 
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(
-                        {"count": len(simplified_tasks), "tasks": simplified_tasks}, indent=2, ensure_ascii=False
-                    ),
-                )
-            ]
+        return _reply({"count": len(simplified_tasks), "tasks": simplified_tasks})
 
 
 async def get_queue_stats(args: dict) -> list[TextContent]:
     """获取队列统计"""
     logger.info("📊 Getting queue stats")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{API_BASE_URL}/api/v1/queue/stats") as resp:
-            if resp.status != 200:
-                return [TextContent(type="text", text=json.dumps({"error": "Failed to get queue stats"}, indent=2))]
-
-            result = await resp.json()
-
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(
-                        {
-                            "stats": result["stats"],
-                            "total": result.get("total", sum(result["stats"].values())),
-                            "timestamp": result.get("timestamp"),
-                        },
-                        indent=2,
-                        ensure_ascii=False,
-                    ),
-                )
-            ]
+    session = await get_session()
+    async with session.get(f"{API_BASE_URL}/api/v1/queue/stats") as resp:
+        if resp.status != 200:
+            return ERROR_QUEUE_STATS
 
+        result = await resp.json(loads=_load_json)
 
-def _calculate_processing_time(task: dict) -> str:
-    """计算处理时间"""
-    from datetime import datetime
+        return _reply(
+            {
+                "stats": result["stats"],
+                "total": result.get("total", sum(result["stats"].values())),
+                "timestamp": result.get("timestamp"),
+            }
+        )
 
-    if task.get("started_at") and task.get("completed_at"):
-        try:
-            start = datetime.fromisoformat(task["started_at"])
-            end = datetime.fromisoformat(task["completed_at"])
-            duration = (end - start).total_seconds()
-            return f"{duration:.2f} seconds"
-        except Exception:
-            return "N/A"
-    return "N/A"
+
+def _task_result(task_status: dict, task_id: str, file_name: str) -> list[TextContent] | None:
+    """将已结束任务的状态转换为工具返回结果，任务仍在排队或处理中时返回 None"""
+    status = task_status["status"]
+
+    if status == "completed":
+        # 任务完成，返回结果
+        logger.info(f"✅ Task completed: {task_id}")
+        content = task_status.get("data", {}).get("content", "") if task_status.get("data") else ""
+
+        return _reply(
+            {
+                "status": "completed",
+                "task_id": task_id,
+                "file_name": file_name,
+                "content": content,
+                "processing_time": _calculate_processing_time(task_status),
+                "created_at": task_status.get("created_at"),
+                "started_at": task_status.get("started_at"),
+                "completed_at": task_status.get("completed_at"),
+            }
+        )
+
+    elif status == "failed":
+        logger.error(f"❌ Task failed: {task_id}")
+        return _reply(
+            {
+                "status": "failed",
+                "task_id": task_id,
+                "file_name": file_name,
+                "error": task_status.get("error_message", "Unknown error"),
+                "created_at": task_status.get("created_at"),
+                "started_at": task_status.get("started_at"),
+                "completed_at": task_status.get("completed_at"),
+            }
+        )
+
+    elif status == "cancelled":
+        logger.warning(f"⚠️ Task cancelled: {task_id}")
+        return _reply({"status": "cancelled", "task_id": task_id, "file_name": file_name})
+
+    elif status not in ("pending", "processing"):
+        return _reply({"status": status, "task_id": task_id, "file_name": file_name})
+    return None
+
+
+def _calculate_processing_time(task: dict) -> str:
+    """计算处理时间（SQLite CURRENT_TIMESTAMP 格式，datetime.fromisoformat 为 C 实现，无需自行解析）"""
+    started_at = task.get("started_at")
+    completed_at = task.get("completed_at")
+    if not (started_at and completed_at):
+        return "N/A"
+    try:
+        duration = (datetime.fromisoformat(completed_at) - datetime.fromisoformat(started_at)).total_seconds()
+    except (TypeError, ValueError):
+        return "N/A"
+    return f"{duration:.2f} seconds"
+
+
+# 健康检查响应内容是静态的，启动时序列化一次
+HEALTH_BODY = json.dumps(
+    {
+        "status": "healthy",
+        "service": "MinerU Tianshu MCP Server",
+        "version": "1.0.0",
+        "endpoints": {"sse": "/sse", "messages": "/messages (POST)", "health": "/health"},
+        "tools": [tool.name for tool in TOOLS],
+        "api_base_url": API_BASE_URL,
+    },
+    ensure_ascii=False,
+)
 
 
 async def main():
@@ -678,18 +917,7 @@ async def main():
 
     # 健康检查端点
     async def health_check(request):
-        from starlette.responses import JSONResponse
-
-        return JSONResponse(
-            {
-                "status": "healthy",
-                "service": "MinerU Tianshu MCP Server",
-                "version": "1.0.0",
-                "endpoints": {"sse": "/sse", "messages": "/messages (POST)", "health": "/health"},
-                "tools": ["parse_document", "get_task_status", "list_tasks", "get_queue_stats"],
-                "api_base_url": API_BASE_URL,
-            }
-        )
+        return Response(HEALTH_BODY, media_type="application/json")
 
     # 创建 Starlette 应用
     starlette_app = Starlette(
@@ -712,12 +940,26 @@ async def main():
     logger.info("📚 Available tools: parse_document, get_task_status, list_tasks, get_queue_stats")
     logger.info("=" * 60)
 
-    config = uvicorn.Config(starlette_app, host=host, port=port, log_level="info")
+    # 使用 httptools HTTP 解析器（uvicorn[standard] 已包含）
+    http = "httptools" if importlib.util.find_spec("httptools") is not None else "auto"
+    config = uvicorn.Config(starlette_app, host=host, port=port, log_level="info", http=http)
     server = uvicorn.Server(config)
-    await server.serve()
+    try:
+        await server.serve()
+    finally:
+        await close_session()
 
 
 if __name__ == "__main__":
+    # 使用 uvloop 事件循环（uvicorn[standard] 已包含，Windows 上无 uvloop 时使用默认事件循环）
+    try:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("⚡ Using uvloop event loop")
+    except ImportError:
+        pass
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
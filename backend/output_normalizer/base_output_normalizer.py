@@ -3,12 +3,58 @@
 """
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from loguru import logger
 import re
 import json
 import os
 
+# 尝试导入 orjson（C 实现的 JSON 序列化，大型结果 JSON 读写更快）
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson 不接受 NaN/Infinity 字面量（json.dump 默认会写出），序列化时还会把非有限浮点数写成 null；
+# 原文可能包含这些字面量时改用标准库读写，保持与原文件一致
+_NONFINITE_LITERALS = (b"NaN", b"Infinity")
+
+
+def _has_nonfinite_literals(raw: bytes) -> bool:
+    """JSON 原文是否可能包含 NaN/Infinity（字符串中出现同样字样也会命中，只影响速度不影响正确性）"""
+    return any(literal in raw for literal in _NONFINITE_LITERALS)
+
+
+def _dump_json_bytes(data, use_orjson: bool = True) -> bytes:
+    """序列化为带缩进的 UTF-8 JSON（保留非 ASCII 字符）"""
+    if use_orjson and ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _load_json_bytes(raw: bytes, use_orjson: bool = True):
+    """解析 JSON"""
+    if use_orjson and ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """先写入同目录临时文件再原子替换，进程中途退出不会留下截断的结果文件"""
+    tmp = path.with_name(f"{path.name}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+# 是否启用 RustFS 图片上传（进程启动时读取一次）
+RUSTFS_ENABLED = os.getenv("RUSTFS_ENABLED", "true").lower() in ("true", "1", "yes")
+
 
 class BaseOutputNormalizer:
     """
@@ -19,6 +65,17 @@ class BaseOutputNormalizer:
     STANDARD_MARKDOWN_NAME = "result.md"
     STANDARD_JSON_NAME = "result.json"
     STANDARD_IMAGE_DIR = "images"
+    # 文件中出现图片引用的前提（字节级子串检查，无需解码）
+    IMAGE_DIR_MARKER = f"{STANDARD_IMAGE_DIR}/".encode()
+    # Markdown 中引用 images/ 下图片的两种写法（与文件名无关，类加载时编译一次）：
+    # 方式1: Markdown 格式 ![alt](images/xxx.jpg)
+    # 方式2: HTML 格式 <img src="images/xxx.jpg">
+    IMAGE_REF_PATTERN = re.compile(
+        rf"!\[(?P<alt>.*?)\]\({re.escape(STANDARD_IMAGE_DIR)}/(?P<md_name>[^)]+)\)"
+        rf'|<img(?P<pre>[^>]*?)src=["\']{re.escape(STANDARD_IMAGE_DIR)}/(?P<html_name>[^"\']+)["\'](?P<post>[^>]*?)>'
+    )
+    # JSON 字符串中的图片路径（images/<文件名>）
+    IMAGE_PATH_PATTERN = re.compile(rf"{re.escape(STANDARD_IMAGE_DIR)}/([^\"/\s)]+)")
 
     def __init__(self):
         """
@@ -89,9 +146,7 @@ class BaseOutputNormalizer:
         """处理 RustFS 上传和 URL 替换"""
 
         # 检查是否启用 RustFS
-        rustfs_enabled = os.getenv("RUSTFS_ENABLED", "true").lower() in ("true", "1", "yes")
-
-        if not rustfs_enabled:
+        if not RUSTFS_ENABLED:
             logger.info("ℹ️  RustFS is disabled (RUSTFS_ENABLED=false), using local file service")
             result["rustfs_enabled"] = False
             result["images_uploaded"] = False
@@ -135,11 +190,11 @@ class BaseOutputNormalizer:
         Returns:
             {本地文件名: RustFS URL} 的映射字典
         """
-        # 延迟导入，避免在不需要时初始化
         try:
-            from storage import RustFSClient
-
             if self._rustfs_client is None:
+                # 延迟导入，RustFS 禁用时（_process_rustfs_upload 已提前返回）不加载 storage/minio
+                from storage import RustFSClient
+
                 self._rustfs_client = RustFSClient()
 
             # 直接上传，使用日期前缀 (YYYYMMDD/短uuid.ext)
@@ -164,50 +219,42 @@ class BaseOutputNormalizer:
             url_mapping: {本地文件名: RustFS URL} 映射
         """
         try:
-            content = md_file.read_text(encoding="utf-8")
+            raw = md_file.read_bytes()
+            # 快速路径：文件中没有任何 images/ 引用时（如纯文本结果）不解码、不扫描、不写回
+            if not url_mapping or self.IMAGE_DIR_MARKER not in raw:
+                logger.debug(f"   No image references in {md_file.name}, skipping")
+                return
+
+            content = raw.decode("utf-8")
             original_content = content
             replaced_count = 0
 
             logger.debug(f"🔍 Replacing URLs in {md_file.name}")
             logger.debug(f"   URL mapping: {url_mapping}")
 
-            # 替换所有图片引用（统一转换为 HTML 格式，更通用）
-            for filename, url in url_mapping.items():
-                # 方式1: Markdown 格式 -> HTML 格式
-                # ![alt](images/xxx.jpg) -> <img src="https://..." alt="alt">
-                pattern1 = rf"!\[(.*?)\]\({self.STANDARD_IMAGE_DIR}/{re.escape(filename)}\)"
-                matches1 = re.findall(pattern1, content)
-                if matches1:
-                    logger.debug(f"   Found Markdown pattern: {pattern1}")
-                    logger.debug(f"   Matches: {matches1}")
-
-                # 转换为 HTML 格式（更通用，前端渲染友好）
-                def markdown_to_html(match):
-                    alt_text = match.group(1) or filename
-                    return f'<img src="{url}" alt="{alt_text}">'
-
-                new_content = re.sub(pattern1, markdown_to_html, content)
-                if new_content != content:
-                    replaced_count += 1
-                    logger.debug(f"   ✅ Replaced Markdown -> HTML: {filename} -> {url}")
-                content = new_content
-
-                # 方式2: HTML 格式 -> 更新 URL
-                # <img src="images/xxx.jpg"> -> <img src="https://...">
-                pattern2 = rf'<img([^>]*?)src=["\']({self.STANDARD_IMAGE_DIR}/{re.escape(filename)})["\']([^>]*?)>'
-                matches2 = re.findall(pattern2, content)
-                if matches2:
-                    logger.debug(f"   Found HTML pattern: {pattern2}")
-                    logger.debug(f"   Matches: {matches2}")
-
-                new_content = re.sub(pattern2, rf'<img\1src="{url}"\3>', content)
-                if new_content != content:
+            # 一次扫描同时处理两种图片引用（统一转换为 HTML 格式，更通用）：
+            # 方式1: ![alt](images/xxx.jpg) -> <img src="https://..." alt="alt">
+            # 方式2: <img src="images/xxx.jpg"> -> <img src="https://...">
+            # 未上传的图片保持原样
+            def replace_image(match):
+                nonlocal replaced_count
+                if match.group("md_name") is not None:
+                    filename = match.group("md_name")
+                    if filename not in url_mapping:
+                        return match.group(0)
                     replaced_count += 1
-                    logger.debug(f"   ✅ Replaced HTML: {filename} -> {url}")
-                content = new_content
+                    alt_text = match.group("alt") or filename
+                    return f'<img src="{url_mapping[filename]}" alt="{alt_text}">'
+                filename = match.group("html_name")
+                if filename not in url_mapping:
+                    return match.group(0)
+                replaced_count += 1
+                return f'<img{match.group("pre")}src="{url_mapping[filename]}"{match.group("post")}>'
+
+            content = self.IMAGE_REF_PATTERN.sub(replace_image, content)
 
             if content != original_content:
-                md_file.write_text(content, encoding="utf-8")
+                _write_atomic(md_file, content.encode("utf-8"))
                 logger.info(f"✅ Replaced {replaced_count} image URLs in {md_file.name}")
             else:
                 logger.warning(f"⚠️  No replacements made in {md_file.name}")
@@ -217,6 +264,16 @@ class BaseOutputNormalizer:
             logger.error(f"❌ Failed to replace URLs in Markdown: {e}")
             raise
 
+    def _lookup_image_url(self, value: str, url_mapping: Dict[str, str]) -> Optional[str]:
+        """返回字符串中引用的已上传图片的 URL，未引用 images/ 下的已上传图片时返回 None"""
+        if self.STANDARD_IMAGE_DIR not in value:
+            return None
+        for match in self.IMAGE_PATH_PATTERN.finditer(value):
+            url = url_mapping.get(match.group(1))
+            if url is not None:
+                return url
+        return None
+
     def _replace_json_urls(self, json_file: Path, url_mapping: Dict[str, str]):
         """
         替换 JSON 中的图片路径为 RustFS URL
@@ -226,38 +283,39 @@ class BaseOutputNormalizer:
             url_mapping: {本地文件名: RustFS URL} 映射
         """
         try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            raw = json_file.read_bytes()
+            # 快速路径：没有任何 images/ 引用时跳过 JSON 解析和重新序列化
+            if not url_mapping or self.IMAGE_DIR_MARKER not in raw:
+                logger.debug(f"   No image references in {json_file.name}, skipping")
+                return
+
+            use_orjson = not _has_nonfinite_literals(raw)
+            data = _load_json_bytes(raw, use_orjson)
 
             replaced_count = 0
             logger.debug(f"🔍 Replacing URLs in {json_file.name}")
 
-            # 递归替换 JSON 中的所有图片路径
-            def replace_paths(obj, path=""):
-                nonlocal replaced_count
+            # 遍历 JSON 中的所有图片路径（显式栈迭代，无递归调用开销）：
+            # 字符串值中用一次正则查找 images/<文件名>，再按文件名查表，而不是逐个文件名做子串检查
+            stack = [data]
+            while stack:
+                obj = stack.pop()
                 if isinstance(obj, dict):
                     for key, value in obj.items():
                         if isinstance(value, str):
-                            # 检查是否是图片路径
-                            for filename, url in url_mapping.items():
-                                if filename in value and self.STANDARD_IMAGE_DIR in value:
-                                    old_value = obj[key]
-                                    obj[key] = url
-                                    replaced_count += 1
-                                    logger.debug(f"   ✅ Replaced JSON[{path}.{key}]: {old_value} -> {url}")
-                                    break
-                        else:
-                            replace_paths(value, f"{path}.{key}")
+                            url = self._lookup_image_url(value, url_mapping)
+                            if url is not None:
+                                obj[key] = url
+                                replaced_count += 1
+                                logger.debug(f"   ✅ Replaced JSON[{key}]: {value} -> {url}")
+                        elif isinstance(value, (dict, list)):
+                            stack.append(value)
                 elif isinstance(obj, list):
-                    for i, item in enumerate(obj):
-                        replace_paths(item, f"{path}[{i}]")
-
-            replace_paths(data)
-
-            with open(json_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                    stack.extend(item for item in obj if isinstance(item, (dict, list)))
 
+            # 没有任何替换时不重新序列化写回（大型结果 JSON 的缩进序列化开销较大）
             if replaced_count > 0:
+                _write_atomic(json_file, _dump_json_bytes(data, use_orjson))
                 logger.info(f"✅ Replaced {replaced_count} image URLs in {json_file.name}")
             else:
                 logger.warning(f"⚠️  No replacements made in {json_file.name}")
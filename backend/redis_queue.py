@@ -14,8 +14,9 @@ MinerU Tianshu - Redis Task Queue
 import os
 import time
 import json
-from typing import Optional, Dict
+from typing import Dict, Iterator, List, Optional
 from dataclasses import dataclass
+from functools import lru_cache
 from loguru import logger
 
 try:
@@ -38,6 +39,7 @@ class RedisConfig:
     socket_timeout: float = 5.0
     socket_connect_timeout: float = 5.0
     retry_on_timeout: bool = True
+    max_connections: int = 32  # 连接池上限，用尽时等待空闲连接（最多 socket_timeout 秒）
 
     # 队列配置
     queue_key: str = "tianshu:task_queue"  # 优先级队列 (Sorted Set)
@@ -56,18 +58,85 @@ class RedisConfig:
             port=int(os.getenv("REDIS_PORT", "6379")),
             db=int(os.getenv("REDIS_DB", "0")),
             password=os.getenv("REDIS_PASSWORD") or None,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "32")),
             queue_key=os.getenv("REDIS_QUEUE_KEY", "tianshu:task_queue"),
             processing_key=os.getenv("REDIS_PROCESSING_KEY", "tianshu:processing"),
             task_timeout_seconds=int(os.getenv("REDIS_TASK_TIMEOUT", "3600")),
         )
 
 
+# 队列分数：score = -priority * PRIORITY_SCORE_FACTOR + 毫秒时间戳（优先级高的先出，同优先级按时间先后）
+# 全部为整数，|priority| < 900 时分数可被 double 精确表示，同优先级内严格按毫秒先后排序
+PRIORITY_SCORE_FACTOR = 10**13
+
+# clear_queue 每批 SCAN / UNLINK 的 key 数量
+SCAN_BATCH_SIZE = 500
+
+
+def queue_score(priority: int, timestamp: float) -> int:
+    """计算任务在优先级队列中的分数"""
+    return -int(priority) * PRIORITY_SCORE_FACTOR + int(timestamp * 1000)
+
+
+@lru_cache(maxsize=64)
+def _encode_worker_id(worker_id: str) -> str:
+    """worker_id 的 JSON 字符串编码（每个 Worker 只编码一次）"""
+    return json.dumps(worker_id)
+
+
+def processing_entry(worker_id: str) -> str:
+    """
+    processing hash 中的认领记录：{"worker_id": ..., "claimed_at": ...}
+
+    结构固定只有两个字段，直接拼接字符串，避免每次心跳都走 json.dumps；
+    worker_id 经过 JSON 编码，可以包含任意字符
+    """
+    return f'{{"worker_id":{_encode_worker_id(worker_id)},"claimed_at":{time.time()!r}}}'
+
+
+# 入队脚本（原子执行）：加入优先级队列，并可选地保存任务数据
+# KEYS[1]: 优先级队列, KEYS[2]: 任务数据 hash
+# ARGV[1]: 分数, ARGV[2]: 任务ID, ARGV[3]: 任务数据 JSON（空字符串表示不保存）,
+# ARGV[4]: 优先级, ARGV[5]: 入队时间, ARGV[6]: 任务数据过期时间（秒）
+ENQUEUE_LUA = """
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+if ARGV[3] ~= '' then
+    redis.call('HSET', KEYS[2], 'task_id', ARGV[2], 'priority', ARGV[4], 'enqueued_at', ARGV[5], 'data', ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[6])
+end
+return 1
+"""
+
+# 超时任务恢复脚本（原子执行）
+# KEYS[1]: processing hash, KEYS[2]: 优先级队列
+# ARGV[1]: 当前时间（秒）, ARGV[2]: 超时时间（秒）, ARGV[3]: 任务数据 key 前缀, ARGV[4]: PRIORITY_SCORE_FACTOR
+# 返回 {{task_id, worker_id}, ...}
+RECOVER_STALE_LUA = """
+local entries = redis.call('HGETALL', KEYS[1])
+local now = tonumber(ARGV[1])
+local timeout = tonumber(ARGV[2])
+local recovered = {}
+for i = 1, #entries, 2 do
+    local task_id = entries[i]
+    local ok, info = pcall(cjson.decode, entries[i + 1])
+    if ok and type(info) == 'table' and now - (tonumber(info.claimed_at) or 0) > timeout then
+        redis.call('HDEL', KEYS[1], task_id)
+        local priority = tonumber(redis.call('HGET', ARGV[3] .. task_id, 'priority')) or 0
+        local score = -priority * tonumber(ARGV[4]) + math.floor(now * 1000)
+        redis.call('ZADD', KEYS[2], string.format('%.0f', score), task_id)
+        recovered[#recovered + 1] = {task_id, tostring(info.worker_id or '')}
+    end
+end
+return recovered
+"""
+
+
 class RedisTaskQueue:
     """
     Redis 任务队列
 
     使用 Sorted Set 实现优先级队列:
-        - score = -priority * 1e10 + timestamp (优先级高的先出，同优先级按时间)
+        - score = -priority * 1e13 + 毫秒时间戳 (优先级高的先出，同优先级按时间)
         - BZPOPMIN 阻塞获取最高优先级任务
 
     可靠投递:
@@ -89,12 +158,21 @@ class RedisTaskQueue:
         self.config = config or RedisConfig.from_env()
         self._client: Optional[redis.Redis] = None
         self._connected = False
+        self._recover_script_obj = None
+        self._enqueue_script_obj = None
 
     @property
     def client(self) -> redis.Redis:
-        """获取 Redis 客户端（延迟连接）"""
+        """
+        获取 Redis 客户端（延迟连接）
+
+        使用有上限的阻塞连接池，多线程并发访问时复用连接而不是无限新建；
+        安装 hiredis 时 redis-py 自动使用 C 实现的协议解析器
+        """
         if self._client is None:
-            self._client = redis.Redis(
+            pool = redis.BlockingConnectionPool(
+                max_connections=self.config.max_connections,
+                timeout=self.config.socket_timeout,
                 host=self.config.host,
                 port=self.config.port,
                 db=self.config.db,
@@ -104,8 +182,23 @@ class RedisTaskQueue:
                 retry_on_timeout=self.config.retry_on_timeout,
                 decode_responses=True,
             )
+            self._client = redis.Redis(connection_pool=pool)
         return self._client
 
+    @property
+    def _enqueue_script(self):
+        """入队脚本（首次使用时注册，之后按 SHA 调用）"""
+        if self._enqueue_script_obj is None:
+            self._enqueue_script_obj = self.client.register_script(ENQUEUE_LUA)
+        return self._enqueue_script_obj
+
+    @property
+    def _recover_script(self):
+        """超时任务恢复脚本（首次使用时注册，之后按 SHA 调用）"""
+        if self._recover_script_obj is None:
+            self._recover_script_obj = self.client.register_script(RECOVER_STALE_LUA)
+        return self._recover_script_obj
+
     def is_available(self) -> bool:
         """检查 Redis 是否可用"""
         try:
@@ -136,31 +229,20 @@ class RedisTaskQueue:
         """
         try:
             # 计算分数：优先级高的先出，同优先级按时间先后
-            # score = -priority * 1e10 + timestamp
             timestamp = time.time()
-            score = -priority * 1e10 + timestamp
-
-            pipe = self.client.pipeline()
-
-            # 添加到优先级队列
-            pipe.zadd(self.config.queue_key, {task_id: score})
-
-            # 存储任务数据（可选，用于快速访问）
-            if task_data:
-                task_key = f"{self.config.task_data_prefix}{task_id}"
-                pipe.hset(
-                    task_key,
-                    mapping={
-                        "task_id": task_id,
-                        "priority": str(priority),
-                        "enqueued_at": str(timestamp),
-                        "data": json.dumps(task_data),
-                    },
-                )
-                # 设置过期时间（任务超时后自动清理）
-                pipe.expire(task_key, self.config.task_timeout_seconds)
 
-            pipe.execute()
+            # 加入优先级队列，并存储任务数据（可选，用于快速访问，任务超时后自动过期）
+            self._enqueue_script(
+                keys=[self.config.queue_key, f"{self.config.task_data_prefix}{task_id}"],
+                args=[
+                    queue_score(priority, timestamp),
+                    task_id,
+                    json.dumps(task_data) if task_data else "",
+                    priority,
+                    timestamp,
+                    self.config.task_timeout_seconds,
+                ],
+            )
             logger.debug(f"📥 Task {task_id} enqueued with priority {priority}")
             return True
 
@@ -168,6 +250,10 @@ class RedisTaskQueue:
             logger.error(f"❌ Failed to enqueue task {task_id}: {e}")
             return False
 
+    def clamp_block_timeout(self, timeout: float) -> float:
+        """阻塞等待的实际超时时间：不超过 socket_timeout - 1，避免阻塞期间触发连接读超时"""
+        return max(0.1, min(timeout, self.config.socket_timeout - 1))
+
     def dequeue(
         self,
         worker_id: str,
@@ -181,14 +267,16 @@ class RedisTaskQueue:
 
         Args:
             worker_id: Worker ID
-            timeout: 阻塞超时时间（秒）
+            timeout: 阻塞超时时间（秒），不超过 socket_timeout - 1，避免阻塞期间触发连接读超时
 
         Returns:
             task_id: 任务ID，如果没有任务返回 None
         """
+        timeout = self.clamp_block_timeout(timeout)
         try:
+            client = self.client
             # 使用 BZPOPMIN 阻塞获取最小 score 的元素（最高优先级）
-            result = self.client.bzpopmin(self.config.queue_key, timeout=timeout)
+            result = client.bzpopmin(self.config.queue_key, timeout=timeout)
 
             if result is None:
                 return None
@@ -197,13 +285,7 @@ class RedisTaskQueue:
             _, task_id, _ = result
 
             # 将任务添加到 processing set（带时间戳）
-            processing_data = json.dumps(
-                {
-                    "worker_id": worker_id,
-                    "claimed_at": time.time(),
-                }
-            )
-            self.client.hset(self.config.processing_key, task_id, processing_data)
+            client.hset(self.config.processing_key, task_id, processing_entry(worker_id))
 
             logger.debug(f"📤 Task {task_id} claimed by worker {worker_id}")
             return task_id
@@ -212,6 +294,55 @@ class RedisTaskQueue:
             logger.error(f"❌ Failed to dequeue task: {e}")
             return None
 
+    def dequeue_batch(
+        self,
+        worker_id: str,
+        count: int,
+        timeout: float = 1.0,
+    ) -> List[str]:
+        """
+        从队列批量获取任务（阻塞式）
+
+        使用 BZMPOP（Redis 7+）一次弹出最多 count 个最高优先级任务，
+        并用一条 HSET 将它们全部写入 processing set，N 个任务只需两次往返。
+        Redis 版本不支持 BZMPOP 时回退到单个 dequeue。
+
+        认领后的任务需要及时处理并发送心跳，否则会被 recover_stale_tasks 重新入队
+
+        Args:
+            worker_id: Worker ID
+            count: 最多获取的任务数
+            timeout: 阻塞超时时间（秒），不超过 socket_timeout - 1
+
+        Returns:
+            task_id 列表（按优先级排序），没有任务时返回空列表
+        """
+        timeout = self.clamp_block_timeout(timeout)
+        try:
+            client = self.client
+            # reply = [key, [[member, score], ...]]，超时返回 None
+            reply = client.execute_command("BZMPOP", timeout, 1, self.config.queue_key, "MIN", "COUNT", count)
+            if not reply:
+                return []
+
+            task_ids = [member for member, _ in reply[1]]
+            entry = processing_entry(worker_id)
+            client.hset(self.config.processing_key, mapping={task_id: entry for task_id in task_ids})
+
+            logger.debug(f"📤 {len(task_ids)} tasks claimed by worker {worker_id}")
+            return task_ids
+
+        except redis.ResponseError as e:
+            if "unknown command" not in str(e).lower():
+                logger.error(f"❌ Failed to dequeue tasks: {e}")
+                return []
+            logger.debug("BZMPOP not supported by Redis server, falling back to BZPOPMIN")
+            task_id = self.dequeue(worker_id, timeout=timeout)
+            return [task_id] if task_id else []
+        except Exception as e:
+            logger.error(f"❌ Failed to dequeue tasks: {e}")
+            return []
+
     def complete(self, task_id: str, worker_id: str) -> bool:
         """
         标记任务完成
@@ -226,12 +357,13 @@ class RedisTaskQueue:
             bool: 是否成功
         """
         try:
+            client = self.client
             # 从 processing set 移除
-            self.client.hdel(self.config.processing_key, task_id)
+            client.hdel(self.config.processing_key, task_id)
 
             # 删除任务数据缓存
             task_key = f"{self.config.task_data_prefix}{task_id}"
-            self.client.delete(task_key)
+            client.delete(task_key)
 
             logger.debug(f"✅ Task {task_id} completed by worker {worker_id}")
             return True
@@ -253,23 +385,22 @@ class RedisTaskQueue:
             bool: 是否成功
         """
         try:
+            client = self.client
             # 从 processing set 移除
-            self.client.hdel(self.config.processing_key, task_id)
+            client.hdel(self.config.processing_key, task_id)
 
             if requeue:
                 # 重新入队（保持原优先级）
                 task_key = f"{self.config.task_data_prefix}{task_id}"
-                task_info = self.client.hgetall(task_key)
-                priority = int(task_info.get("priority", "0"))
+                # 优先级入队后不再变化，只读取这一个字段
+                priority = int(client.hget(task_key, "priority") or 0)
 
-                timestamp = time.time()
-                score = -priority * 1e10 + timestamp
-                self.client.zadd(self.config.queue_key, {task_id: score})
+                client.zadd(self.config.queue_key, {task_id: queue_score(priority, time.time())})
                 logger.info(f"🔄 Task {task_id} requeued after failure")
             else:
                 # 删除任务数据缓存
                 task_key = f"{self.config.task_data_prefix}{task_id}"
-                self.client.delete(task_key)
+                client.delete(task_key)
                 logger.debug(f"❌ Task {task_id} failed (not requeued)")
 
             return True
@@ -292,13 +423,8 @@ class RedisTaskQueue:
             bool: 是否成功
         """
         try:
-            processing_data = json.dumps(
-                {
-                    "worker_id": worker_id,
-                    "claimed_at": time.time(),  # 更新时间
-                }
-            )
-            self.client.hset(self.config.processing_key, task_id, processing_data)
+            # 更新认领时间
+            self.client.hset(self.config.processing_key, task_id, processing_entry(worker_id))
             return True
         except Exception as e:
             logger.error(f"❌ Failed to update heartbeat for task {task_id}: {e}")
@@ -317,37 +443,19 @@ class RedisTaskQueue:
             int: 恢复的任务数量
         """
         timeout = timeout_seconds or self.config.claim_visibility_seconds
-        recovered_count = 0
         now = time.time()
 
         try:
-            # 获取所有处理中的任务
-            processing_tasks = self.client.hgetall(self.config.processing_key)
-
-            for task_id, data_str in processing_tasks.items():
-                try:
-                    data = json.loads(data_str)
-                    claimed_at = data.get("claimed_at", 0)
-
-                    if now - claimed_at > timeout:
-                        # 任务超时，重新入队
-                        worker_id = data.get("worker_id", "unknown")
-                        logger.warning(f"⚠️  Task {task_id} timed out (worker: {worker_id}), requeuing...")
-
-                        # 从 processing 移除
-                        self.client.hdel(self.config.processing_key, task_id)
-
-                        # 重新入队（默认优先级）
-                        task_key = f"{self.config.task_data_prefix}{task_id}"
-                        task_info = self.client.hgetall(task_key)
-                        priority = int(task_info.get("priority", "0"))
-
-                        score = -priority * 1e10 + now
-                        self.client.zadd(self.config.queue_key, {task_id: score})
-                        recovered_count += 1
+            # 扫描、超时判断、移出 processing 和重新入队在一个 Lua 脚本中原子执行：
+            # 期间心跳和其他 Worker 的认领不会插入，也不会出现任务短暂不在任何集合中的情况
+            recovered = self._recover_script(
+                keys=[self.config.processing_key, self.config.queue_key],
+                args=[now, timeout, self.config.task_data_prefix, PRIORITY_SCORE_FACTOR],
+            )
 
-                except json.JSONDecodeError:
-                    logger.error(f"Invalid processing data for task {task_id}")
+            for task_id, worker_id in recovered:
+                logger.warning(f"⚠️  Task {task_id} timed out (worker: {worker_id or 'unknown'}), requeued")
+            recovered_count = len(recovered)
 
             if recovered_count > 0:
                 logger.info(f"🔄 Recovered {recovered_count} stale tasks")
@@ -391,14 +499,11 @@ class RedisTaskQueue:
             bool: 是否成功
         """
         try:
-            pipe = self.client.pipeline()
-            pipe.delete(self.config.queue_key)
-            pipe.delete(self.config.processing_key)
-            # 清理所有任务数据
-            keys = self.client.keys(f"{self.config.task_data_prefix}*")
-            if keys:
-                pipe.delete(*keys)
-            pipe.execute()
+            # UNLINK 在后台线程释放内存，不会像 DEL 那样阻塞 Redis
+            self.client.unlink(self.config.queue_key, self.config.processing_key)
+            # 清理所有任务数据：SCAN 分批遍历，避免 KEYS 阻塞整个实例
+            for batch in _scan_batches(self.client, f"{self.config.task_data_prefix}*", SCAN_BATCH_SIZE):
+                self.client.unlink(*batch)
             logger.warning("⚠️  Queue cleared!")
             return True
         except Exception as e:
@@ -406,6 +511,18 @@ class RedisTaskQueue:
             return False
 
 
+def _scan_batches(client: "redis.Redis", match: str, count: int) -> Iterator[List[str]]:
+    """按 SCAN 遍历匹配的 key，每 count 个一批返回"""
+    batch = []
+    for key in client.scan_iter(match=match, count=count):
+        batch.append(key)
+        if len(batch) >= count:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 # 全局队列实例（延迟初始化）
 # 使用特殊值 False 表示"已检查,确认禁用",避免重复检查和日志
 # None: 未初始化
@@ -6,13 +6,18 @@ PDF 水印处理模块
 2. 扫描件 PDF：转图片 → YOLO 检测 → LaMa 修复 → 重组 PDF
 """
 
+import os
+
 import fitz  # PyMuPDF
+import numpy as np
 from pathlib import Path
 from typing import Optional, Union, List
 from loguru import logger
-import shutil
 
-from .watermark_remover import WatermarkRemover
+from .watermark_remover import DEFAULT_PRECISION, WatermarkRemover
+
+# 扫描件每批送入 YOLO 检测的页数（每页 200 DPI RGB 图及其 BGR 副本约占 20MB 内存）
+DEFAULT_BATCH_SIZE = max(1, int(os.getenv("WATERMARK_BATCH_SIZE", "8")))
 
 
 class PDFWatermarkHandler:
@@ -25,16 +30,26 @@ class PDFWatermarkHandler:
     3. 扫描件 PDF：转图片 → 去水印 → 重组 PDF
     """
 
-    def __init__(self, device: str = "cuda", use_lama: bool = True):
+    def __init__(
+        self,
+        device: str = "cuda",
+        use_lama: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        precision: str = DEFAULT_PRECISION,
+    ):
         """
         初始化 PDF 水印处理器
 
         Args:
             device: 设备 (cuda/cpu)
             use_lama: 是否使用 LaMa 修复（用于扫描件处理）
+            batch_size: 扫描件每批送入 YOLO 检测的页数（默认读取 WATERMARK_BATCH_SIZE）
+            precision: YOLO 推理精度 (fp16/fp32，CPU 上始终使用 fp32，默认读取 WATERMARK_PRECISION)
         """
         self.device = device
         self.use_lama = use_lama
+        self.batch_size = max(1, batch_size)
+        self.precision = precision
         self.image_remover = None  # 延迟初始化
 
         logger.info("=" * 60)
@@ -42,12 +57,13 @@ class PDFWatermarkHandler:
         logger.info("=" * 60)
         logger.info(f"📍 Device: {device}")
         logger.info(f"🎨 Image Remover: YOLO11x + {'LaMa' if use_lama else 'OpenCV'}")
+        logger.info(f"📦 Batch Size: {self.batch_size}")
         logger.info("")
 
     def _get_image_remover(self) -> WatermarkRemover:
         """延迟初始化图片水印去除器"""
         if self.image_remover is None:
-            self.image_remover = WatermarkRemover(device=self.device, use_lama=self.use_lama)
+            self.image_remover = WatermarkRemover(device=self.device, use_lama=self.use_lama, precision=self.precision)
         return self.image_remover
 
     def is_editable_pdf(self, pdf_path: Union[str, Path], text_ratio_threshold: float = 0.1) -> bool:
@@ -237,100 +253,61 @@ class PDFWatermarkHandler:
         logger.info(f"🔧 DPI: {dpi}")
         logger.info("")
 
-        # 创建临时目录（使用共享输出目录）
-        import uuid
-        import os
+        logger.info("🎨 Removing watermarks from pages...")
 
-        project_root = Path(__file__).parent.parent.parent
-        default_output = project_root / "data" / "output"
-        output_base = Path(os.getenv("OUTPUT_PATH", str(default_output)))
-        temp_dir = output_base / f"pdf_watermark_{uuid.uuid4().hex}"
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        remover = self._get_image_remover()
+        mat = fitz.Matrix(dpi / 72, dpi / 72)  # 缩放矩阵
+        doc = fitz.open(str(input_path))
+        output_doc = fitz.open()
 
         try:
-            # 1. PDF → 图片
-            logger.info("📄 Converting PDF to images...")
-            doc = fitz.open(str(input_path))
-            image_paths = []
+            total_pages = len(doc)
 
-            for page_num in range(len(doc)):
-                page = doc[page_num]
+            # 按批处理：每批页面渲染到内存后一次 YOLO 推理，避免逐页调用时 GPU 空闲
+            # 页面像素直接在内存中传递，不经过 PNG 编解码和临时文件
+            for start in range(0, total_pages, self.batch_size):
+                page_nums = range(start, min(start + self.batch_size, total_pages))
+                logger.info(f"   Processing pages {start + 1}-{page_nums[-1] + 1}/{total_pages}")
 
-                # 渲染为图片
-                mat = fitz.Matrix(dpi / 72, dpi / 72)  # 缩放矩阵
-                pix = page.get_pixmap(matrix=mat)
+                # 1. PDF → 图片（pixmap 像素缓冲区直接作为 RGB 数组）
+                pixmaps = [doc[page_num].get_pixmap(matrix=mat) for page_num in page_nums]
+                images = [
+                    np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n) for pix in pixmaps
+                ]
 
-                # 保存图片
-                image_path = temp_dir / f"page_{page_num:04d}.png"
-                pix.save(str(image_path))
-                image_paths.append(image_path)
-
-                logger.info(f"   Page {page_num + 1}/{len(doc)} → {image_path.name}")
-
-            doc.close()
-
-            # 2. 去除水印
-            logger.info("")
-            logger.info("🎨 Removing watermarks from images...")
-
-            remover = self._get_image_remover()
-            cleaned_image_paths = []
-
-            for idx, image_path in enumerate(image_paths):
+                # 2. 去除水印
                 try:
-                    cleaned_path = temp_dir / f"cleaned_{image_path.name}"
-
-                    logger.info(f"   Processing {idx + 1}/{len(image_paths)}: {image_path.name}")
-
-                    remover.remove_watermark(
-                        image_path=image_path,
-                        output_path=cleaned_path,
+                    cleaned_images = remover.remove_watermark_batch(
+                        images,
                         conf_threshold=conf_threshold,
                         dilation=dilation,
                     )
-
-                    cleaned_image_paths.append(cleaned_path)
-
                 except Exception as e:
-                    logger.error(f"   Failed to process {image_path}: {e}")
+                    logger.error(f"   Failed to process pages {start + 1}-{page_nums[-1] + 1}: {e}")
                     # 失败则使用原图
-                    cleaned_image_paths.append(image_path)
-
-            # 3. 图片 → PDF
-            logger.info("")
-            logger.info("📄 Converting images back to PDF...")
-
-            # 使用 PyMuPDF 创建新 PDF
-            output_doc = fitz.open()
-
-            for idx, image_path in enumerate(cleaned_image_paths):
-                # 转换为 PDF 页面
-                img_bytes = image_path.read_bytes()
-                img_doc = fitz.open("png", img_bytes)
+                    cleaned_images = images
 
-                # 复制页面
-                output_doc.insert_pdf(img_doc)
-                img_doc.close()
-
-                logger.info(f"   Page {idx + 1}/{len(cleaned_image_paths)} added")
+                # 3. 图片 → PDF（保持原页面尺寸）
+                for page_num, pix, image, cleaned in zip(page_nums, pixmaps, images, cleaned_images):
+                    # 未检测到水印的页面直接使用渲染出的 pixmap
+                    if cleaned is not image:
+                        height, width = cleaned.shape[:2]
+                        pix = fitz.Pixmap(fitz.csRGB, width, height, np.ascontiguousarray(cleaned).tobytes(), False)
+                    page = output_doc.new_page(width=doc[page_num].rect.width, height=doc[page_num].rect.height)
+                    page.insert_image(page.rect, pixmap=pix)
 
             # 保存
             output_doc.save(str(output_path))
-            output_doc.close()
 
-            logger.info("")
-            logger.info(f"✅ Scanned PDF processed: {output_path}")
-            logger.info("")
+        finally:
+            output_doc.close()
+            doc.close()
 
-            return output_path
+        logger.info("")
+        logger.info(f"✅ Scanned PDF processed: {output_path}")
+        logger.info("")
 
-        finally:
-            # 清理临时文件
-            try:
-                shutil.rmtree(temp_dir)
-                logger.debug(f"🗑️  Cleaned temp dir: {temp_dir}")
-            except Exception as e:
-                logger.warning(f"⚠️  Failed to clean temp dir: {e}")
+        return output_path
 
     def remove_watermark(
         self,
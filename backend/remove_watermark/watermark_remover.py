@@ -4,6 +4,8 @@
 使用 YOLO11x 检测水印位置，LaMa 模型修复图像
 """
 
+import os
+
 import cv2
 import numpy as np
 from PIL import Image
@@ -25,6 +27,9 @@ try:
 except ImportError:
     LAMA_AVAILABLE = False
 
+# YOLO 推理精度默认值（fp16/fp32，fp16 仅在 CUDA 上生效），WatermarkRemover 与 PDFWatermarkHandler 共用
+DEFAULT_PRECISION = os.getenv("WATERMARK_PRECISION", "fp16").lower()
+
 
 class WatermarkRemover:
     """
@@ -41,7 +46,13 @@ class WatermarkRemover:
     # 默认使用 HuggingFace 上的 YOLO11x 水印检测模型
     DEFAULT_MODEL_ID = "corzent/yolo11x_watermark_detection"
 
-    def __init__(self, model_path: Optional[str] = None, device: str = "cuda", use_lama: bool = True):
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        device: str = "cuda",
+        use_lama: bool = True,
+        precision: str = DEFAULT_PRECISION,
+    ):
         """
         初始化水印去除器
 
@@ -52,6 +63,7 @@ class WatermarkRemover:
                 - 本地路径: "/path/to/model.pt"
             device: 设备 ("cuda" 或 "cpu")
             use_lama: 是否使用 LaMa 修复 (否则使用 OpenCV)
+            precision: YOLO 推理精度 ("fp32" 或 "fp16"，fp16 仅在 CUDA 上生效，默认读取 WATERMARK_PRECISION)
         """
         if not ULTRALYTICS_AVAILABLE:
             raise ImportError("ultralytics not installed. Install: pip install ultralytics")
@@ -59,6 +71,9 @@ class WatermarkRemover:
         self.model_path = model_path or self.DEFAULT_MODEL_ID
         self.device = device
         self.use_lama = use_lama and LAMA_AVAILABLE
+        # FP16 推理可使用 Tensor Core；CPU 上回退到 FP32
+        # LaMa 保持 FP32：其快速傅里叶卷积在 CUDA 半精度下要求尺寸为 2 的幂，且数值更敏感
+        self.half = precision == "fp16" and str(device).startswith("cuda")
 
         self.yolo = None
         self.lama = None
@@ -66,6 +81,7 @@ class WatermarkRemover:
         logger.info("🎨 Watermark Remover Initialized")
         logger.info(f"   Model: {self.model_path}")
         logger.info(f"   Device: {self.device}")
+        logger.info(f"   Precision: {'FP16' if self.half else 'FP32'}")
         logger.info(f"   Inpainter: {'LaMa' if self.use_lama else 'OpenCV'}")
 
     def _download_model_from_hf(self) -> str:
@@ -155,14 +171,11 @@ class WatermarkRemover:
         """
         yolo = self._load_yolo()
 
-        results = yolo(str(image_path), conf=conf_threshold, device=self.device, verbose=False)
+        results = yolo(str(image_path), conf=conf_threshold, device=self.device, half=self.half, verbose=False)
 
         boxes = []
-        if len(results) > 0 and results[0].boxes is not None:
-            for box in results[0].boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = box.conf[0].cpu().numpy()
-                boxes.append((int(x1), int(y1), int(x2), int(y2), float(conf)))
+        if len(results) > 0:
+            boxes = self._result_boxes(results[0])
 
             # 保存检测可视化结果
             if save_detection_viz and boxes:
@@ -186,6 +199,40 @@ class WatermarkRemover:
 
         return boxes
 
+    def detect_watermark_batch(
+        self, images: List[np.ndarray], conf_threshold: float = 0.35
+    ) -> List[List[Tuple[int, int, int, int, float]]]:
+        """
+        批量检测水印位置（整批图像一次前向推理）
+
+        ultralytics 会将整批图像 letterbox 到统一尺寸后组成一个 batch 送入模型
+
+        Args:
+            images: RGB 图像数组列表，每个形状为 (H, W, 3)
+            conf_threshold: 置信度阈值
+
+        Returns:
+            与输入一一对应的 [(x1, y1, x2, y2, confidence), ...] 列表
+        """
+        if not images:
+            return []
+
+        yolo = self._load_yolo()
+
+        # ultralytics 按 OpenCV 约定将 numpy 输入视为 BGR
+        sources = [cv2.cvtColor(image, cv2.COLOR_RGB2BGR) for image in images]
+        results = yolo(sources, conf=conf_threshold, device=self.device, half=self.half, verbose=False)
+        return [self._result_boxes(result) for result in results]
+
+    @staticmethod
+    def _result_boxes(result) -> List[Tuple[int, int, int, int, float]]:
+        """从单张图像的 YOLO 结果中提取边界框"""
+        if result.boxes is None or len(result.boxes) == 0:
+            return []
+        xyxy = result.boxes.xyxy.cpu().numpy()
+        confs = result.boxes.conf.cpu().numpy()
+        return [(int(x1), int(y1), int(x2), int(y2), float(conf)) for (x1, y1, x2, y2), conf in zip(xyxy, confs)]
+
     def create_mask(
         self, image_shape: Tuple[int, int], boxes: List[Tuple[int, int, int, int, float]], dilation: int = 10
     ) -> np.ndarray:
@@ -307,6 +354,39 @@ class WatermarkRemover:
 
         return output_path
 
+    def remove_watermark_batch(
+        self,
+        images: List[np.ndarray],
+        conf_threshold: float = 0.35,
+        dilation: int = 10,
+    ) -> List[np.ndarray]:
+        """
+        批量去除水印（内存中处理，不写调试图片）
+
+        检测阶段整批一次推理；修复阶段只处理检测到水印的图像（LaMa 按单张推理）
+
+        Args:
+            images: RGB 图像数组列表，每个形状为 (H, W, 3)
+            conf_threshold: YOLO 置信度阈值
+            dilation: 掩码膨胀大小
+
+        Returns:
+            与输入一一对应的 RGB 图像数组列表，未检测到水印的图像原样返回（同一对象）
+        """
+        batch_boxes = self.detect_watermark_batch(images, conf_threshold)
+
+        cleaned = []
+        for image, boxes in zip(images, batch_boxes):
+            if not boxes:
+                cleaned.append(image)
+                continue
+
+            logger.debug(f"  Detected {len(boxes)} watermark(s)")
+            mask = self.create_mask(image.shape[:2], boxes, dilation)
+            cleaned.append(np.asarray(self.inpaint(Image.fromarray(image), mask)))
+
+        return cleaned
+
     def cleanup(self):
         """清理资源"""
         if self.yolo is not None:
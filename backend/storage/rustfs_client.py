@@ -15,6 +15,10 @@ from loguru import logger
 from minio import Minio
 from minio.error import S3Error
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# upload_directory 的并发上传线程数
+UPLOAD_WORKERS = max(1, int(os.getenv("RUSTFS_UPLOAD_WORKERS", "8")))
 
 
 class RustFSClient:
@@ -300,9 +304,7 @@ class RustFSClient:
 
         logger.info(f"📤 Uploading {len(files)} files from {dir_path.name}/")
 
-        url_mapping = {}
-
-        for file_path in files:
+        def upload_one(file_path: Path) -> Optional[str]:
             try:
                 # 生成对象名称: YYYYMMDD/msec_nano.ext
                 file_extension = file_path.suffix
@@ -315,15 +317,22 @@ class RustFSClient:
                     object_name = f"{date_prefix}/{short_filename}"
 
                 # 上传文件
-                url = self.upload_file(file_path, object_name)
-
-                # 记录映射 (原始文件名 -> URL)
-                url_mapping[file_path.name] = url
+                return self.upload_file(file_path, object_name)
 
             except Exception as e:
                 logger.error(f"❌ Failed to upload {file_path.name}: {e}")
                 # 继续上传其他文件
-                continue
+                return None
+
+        # 上传以网络等待为主，使用线程池并发上传（MinIO 客户端线程安全，连接池复用连接）
+        url_mapping = {}
+        with ThreadPoolExecutor(
+            max_workers=min(UPLOAD_WORKERS, len(files)), thread_name_prefix="rustfs-upload"
+        ) as executor:
+            for file_path, url in zip(files, executor.map(upload_one, files)):
+                if url is not None:
+                    # 记录映射 (原始文件名 -> URL)
+                    url_mapping[file_path.name] = url
 
         logger.info(f"✅ Successfully uploaded {len(url_mapping)}/{len(files)} files")
         return url_mapping
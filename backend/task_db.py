@@ -138,6 +138,14 @@ class TaskDB:
                 cursor.execute("ALTER TABLE tasks ADD COLUMN user_id TEXT")
                 logger.info("✅ user_id field added")
 
+            # 迁移：添加 seconds_per_page 字段（如果不存在）
+            try:
+                cursor.execute("SELECT seconds_per_page FROM tasks LIMIT 1")
+            except sqlite3.OperationalError:
+                logger.info("📊 Migrating database schema: adding seconds_per_page field")
+                cursor.execute("ALTER TABLE tasks ADD COLUMN seconds_per_page REAL")
+                logger.info("✅ seconds_per_page field added")
+
     def create_task(
         self,
         file_name: str,
@@ -183,6 +191,53 @@ class TaskDB:
 
         return task_id
 
+    def create_tasks(self, tasks: List[Dict], user_id: str = None) -> List[str]:
+        """
+        批量创建任务（单个事务，一次提交）
+
+        Args:
+            tasks: 任务列表，每个元素包含 file_name、file_path，可选 backend、options、priority
+            user_id: 用户ID (可选,用于权限控制)
+
+        Returns:
+            task_ids: 任务ID列表（与 tasks 顺序一致）
+        """
+        task_ids = [str(uuid.uuid4()) for _ in tasks]
+        rows = [
+            (
+                task_id,
+                task["file_name"],
+                task["file_path"],
+                task.get("backend", "pipeline"),
+                json.dumps(task.get("options") or {}),
+                task.get("priority", 0),
+                user_id,
+            )
+            for task_id, task in zip(task_ids, tasks)
+        ]
+
+        with self.get_cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO tasks (task_id, file_name, file_path, backend, options, priority, user_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+
+        # 事务提交后再入队，保证 Worker 取到任务时数据库中已有记录
+        for task_id, task in zip(task_ids, tasks):
+            self._enqueue_to_redis(
+                task_id,
+                task.get("priority", 0),
+                {
+                    "file_name": task["file_name"],
+                    "backend": task.get("backend", "pipeline"),
+                },
+            )
+
+        return task_ids
+
     def _enqueue_to_redis(self, task_id: str, priority: int, task_data: dict = None) -> bool:
         """
         将任务加入 Redis 队列
@@ -206,13 +261,23 @@ class TaskDB:
                 logger.warning(f"⚠️  Failed to enqueue to Redis, SQLite fallback active: {e}")
         return False
 
-    def get_next_task(self, worker_id: str, max_retries: int = 3) -> Optional[Dict]:
+    def has_blocking_queue(self) -> bool:
+        """Redis 队列是否可用（可用时 get_next_task 会阻塞等待新任务，而不是立即返回）"""
+        return REDIS_QUEUE_AVAILABLE and get_redis_queue() is not None
+
+    def clamp_block_timeout(self, timeout: float) -> float:
+        """get_next_task 实际阻塞的时间（Redis 队列会限制阻塞时长，不可用时原样返回）"""
+        redis_queue = get_redis_queue() if REDIS_QUEUE_AVAILABLE else None
+        return redis_queue.clamp_block_timeout(timeout) if redis_queue else timeout
+
+    def get_next_task(self, worker_id: str, max_retries: int = 3, block_timeout: float = 1.0) -> Optional[Dict]:
         """
         获取下一个待处理任务（原子操作，防止并发冲突）
 
         Args:
             worker_id: Worker ID
             max_retries: 当任务被其他 worker 抢走时的最大重试次数（默认3次）
+            block_timeout: Redis 模式下阻塞等待新任务的时间（秒）
 
         Returns:
             task: 任务字典，如果没有任务返回 None
@@ -231,7 +296,7 @@ class TaskDB:
         from loguru import logger
 
         # 尝试使用 Redis 队列（如果可用）
-        task = self._get_next_task_redis(worker_id)
+        task = self._get_next_task_redis(worker_id, timeout=block_timeout)
         if task is not None:
             return task
 
@@ -303,12 +368,13 @@ class TaskDB:
         logger.warning(f"⚠️  Failed to get task after {max_retries} attempts")
         return None
 
-    def _get_next_task_redis(self, worker_id: str) -> Optional[Dict]:
+    def _get_next_task_redis(self, worker_id: str, timeout: float = 1.0) -> Optional[Dict]:
         """
         从 Redis 队列获取下一个任务
 
         Args:
             worker_id: Worker ID
+            timeout: 阻塞等待时间（秒）
 
         Returns:
             task: 任务字典，如果 Redis 不可用或无任务返回 None
@@ -321,8 +387,8 @@ class TaskDB:
             return None
 
         try:
-            # 从 Redis 获取任务 ID（阻塞式，1秒超时）
-            task_id = redis_queue.dequeue(worker_id, timeout=1.0)
+            # 从 Redis 获取任务 ID（阻塞式，无任务时等待 timeout 秒）
+            task_id = redis_queue.dequeue(worker_id, timeout=timeout)
             if not task_id:
                 return None
 
@@ -363,7 +429,13 @@ class TaskDB:
             return None
 
     def update_task_status(
-        self, task_id: str, status: str, result_path: str = None, error_message: str = None, worker_id: str = None
+        self,
+        task_id: str,
+        status: str,
+        result_path: str = None,
+        error_message: str = None,
+        worker_id: str = None,
+        seconds_per_page: Optional[float] = None,
     ):
         """
         更新任务状态（使用预定义 SQL 模板，防止 SQL 注入）
@@ -374,6 +446,7 @@ class TaskDB:
             result_path: 结果路径（可选）
             error_message: 错误信息（可选）
             worker_id: Worker ID（可选，用于并发检查）
+            seconds_per_page: 引擎处理的每页耗时（可选，仅 completed 状态使用，用于慢 Worker 检测）
 
         Returns:
             bool: 更新是否成功
@@ -398,23 +471,25 @@ class TaskDB:
                         UPDATE tasks
                         SET status = ?,
                             completed_at = CURRENT_TIMESTAMP,
-                            result_path = ?
+                            result_path = ?,
+                            seconds_per_page = ?
                         WHERE task_id = ?
                         AND status = 'processing'
                         AND worker_id = ?
                     """
-                    cursor.execute(sql, (status, result_path, task_id, worker_id))
+                    cursor.execute(sql, (status, result_path, seconds_per_page, task_id, worker_id))
                 else:
                     # 不验证 worker_id
                     sql = """
                         UPDATE tasks
                         SET status = ?,
                             completed_at = CURRENT_TIMESTAMP,
-                            result_path = ?
+                            result_path = ?,
+                            seconds_per_page = ?
                         WHERE task_id = ?
                         AND status = 'processing'
                     """
-                    cursor.execute(sql, (status, result_path, task_id))
+                    cursor.execute(sql, (status, result_path, seconds_per_page, task_id))
 
                 success = cursor.rowcount > 0
 
@@ -491,6 +566,52 @@ class TaskDB:
 
             return success
 
+    def release_task(self, task_id: str, worker_id: str):
+        """
+        归还已认领但尚未开始处理的任务（如 Worker 退出时的预取任务）
+
+        SQLite 状态重置为 pending，同时将任务从 Redis processing set 移回优先级队列，
+        避免超时恢复时再次入队导致同一任务被处理两次。
+        只有任务仍由该 Worker 处理中时才归还（可能已被超时恢复交给其他 Worker），
+        否则不修改任务，也不重复入队
+
+        Args:
+            task_id: 任务ID
+            worker_id: Worker ID
+
+        Returns:
+            bool: 是否归还成功
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE tasks
+                SET status = 'pending',
+                    worker_id = NULL,
+                    started_at = NULL
+                WHERE task_id = ?
+                AND worker_id = ?
+                AND status = 'processing'
+            """,
+                (task_id, worker_id),
+            )
+            released = cursor.rowcount > 0
+
+        if not released:
+            logger.warning(f"⚠️  Task {task_id} is no longer held by {worker_id}, skip releasing")
+            return False
+
+        if not REDIS_QUEUE_AVAILABLE:
+            return True
+
+        redis_queue = get_redis_queue()
+        if redis_queue:
+            try:
+                redis_queue.fail(task_id, worker_id, requeue=True)
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to requeue released task {task_id} to Redis: {e}")
+        return True
+
     def _notify_redis_task_done(self, task_id: str, worker_id: str, status: str):
         """
         通知 Redis 任务已完成/失败
@@ -565,6 +686,41 @@ class TaskDB:
 
         return stats
 
+    def get_worker_latency_stats(self, limit: int = 100) -> Dict[str, Dict]:
+        """
+        统计最近完成的任务中各 Worker 的平均每页处理耗时
+
+        只统计记录了 seconds_per_page 的任务（页数已知的 PDF/图片），
+        按页归一化后，拿到大 PDF 的 Worker 不会因任务本身更大而被判定为慢
+
+        Args:
+            limit: 参与统计的最近完成任务数
+
+        Returns:
+            {worker_id: {"avg_seconds": 平均每页耗时, "count": 任务数}}
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT worker_id,
+                       AVG(seconds_per_page) AS avg_seconds,
+                       COUNT(*) AS count
+                FROM (
+                    SELECT worker_id, seconds_per_page FROM tasks
+                    WHERE status = 'completed' AND is_parent = 0
+                      AND worker_id IS NOT NULL AND seconds_per_page IS NOT NULL
+                    ORDER BY completed_at DESC
+                    LIMIT ?
+                )
+                GROUP BY worker_id
+            """,
+                (limit,),
+            )
+            return {
+                row["worker_id"]: {"avg_seconds": row["avg_seconds"], "count": row["count"]}
+                for row in cursor.fetchall()
+            }
+
     def get_tasks_by_status(self, status: str, limit: int = 100) -> List[Dict]:
         """
         根据状态获取任务列表
@@ -819,9 +975,79 @@ class TaskDB:
                 (parent_task_id,),
             )
 
+        # 子任务同样入队到 Redis，否则阻塞认领的 Worker 要等到超时才会通过 SQLite 回退取到它们
+        self._enqueue_to_redis(task_id, priority, {"file_name": file_name, "backend": backend})
+
         logger.debug(f"📄 Created child task: {task_id} (parent: {parent_task_id})")
         return task_id
 
+    def create_child_tasks(
+        self,
+        parent_task_id: str,
+        children: List[Dict],
+        backend: str = "pipeline",
+        priority: int = 0,
+        user_id: str = None,
+    ) -> List[str]:
+        """
+        批量创建子任务（单个事务，一次提交）
+
+        子任务只保存自身的选项（如 chunk_info），公共处理选项保存在父任务中，
+        Worker 处理子任务时再与父任务选项合并，避免每个子任务重复存储同一份选项
+
+        Args:
+            parent_task_id: 父任务ID
+            children: 子任务列表，每个元素包含 file_name、file_path、options
+            backend: 处理后端
+            priority: 优先级（继承父任务）
+            user_id: 用户ID（继承父任务）
+
+        Returns:
+            task_ids: 子任务ID列表（与 children 顺序一致）
+        """
+        task_ids = [str(uuid.uuid4()) for _ in children]
+        rows = [
+            (
+                task_id,
+                parent_task_id,
+                child["file_name"],
+                child["file_path"],
+                backend,
+                json.dumps(child.get("options") or {}),
+                priority,
+                user_id,
+            )
+            for task_id, child in zip(task_ids, children)
+        ]
+
+        with self.get_cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO tasks (
+                    task_id, parent_task_id, file_name, file_path,
+                    backend, options, status, priority, user_id
+                ) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)
+            """,
+                rows,
+            )
+
+            # 同一事务内设置父任务的子任务数量
+            cursor.execute(
+                """
+                UPDATE tasks
+                SET is_parent = 1, child_count = ?, status = 'processing'
+                WHERE task_id = ?
+            """,
+                (len(task_ids), parent_task_id),
+            )
+
+        # 子任务同样入队到 Redis，否则阻塞认领的 Worker 要等到超时才会通过 SQLite 回退取到它们
+        for task_id, child in zip(task_ids, children):
+            self._enqueue_to_redis(task_id, priority, {"file_name": child["file_name"], "backend": backend})
+
+        logger.info(f"📄 Created {len(task_ids)} child tasks (parent: {parent_task_id})")
+        return task_ids
+
     def on_child_task_completed(self, child_task_id: str) -> Optional[str]:
         """
         子任务完成回调
@@ -836,53 +1062,98 @@ class TaskDB:
             parent_task_id: 如果所有子任务完成，返回父任务ID；否则返回 None
         """
         with self.get_cursor() as cursor:
-            # 获取父任务ID
-            cursor.execute(
-                """
-                SELECT parent_task_id FROM tasks WHERE task_id = ?
-            """,
-                (child_task_id,),
-            )
-            row = cursor.fetchone()
+            return self._increment_parent_progress(cursor, child_task_id)
 
-            if not row or not row["parent_task_id"]:
-                return None  # 不是子任务
+    def complete_child_task(
+        self, child_task_id: str, result_path: str, seconds_per_page: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        标记子任务完成并更新父任务完成计数（单个事务，一次提交）
 
-            parent_task_id = row["parent_task_id"]
+        等价于 update_task_status(completed) + on_child_task_completed，
+        但只提交一次，减少大 PDF 拆分后每个子任务的 fsync 次数
 
-            # 更新父任务的完成计数
+        Args:
+            child_task_id: 子任务ID
+            result_path: 结果路径
+            seconds_per_page: 引擎处理的每页耗时（可选，用于慢 Worker 检测）
+
+        Returns:
+            parent_task_id: 如果所有子任务完成，返回父任务ID；否则返回 None
+        """
+        with self.get_cursor() as cursor:
             cursor.execute(
                 """
                 UPDATE tasks
-                SET child_completed = child_completed + 1
+                SET status = 'completed',
+                    completed_at = CURRENT_TIMESTAMP,
+                    result_path = ?,
+                    seconds_per_page = ?
                 WHERE task_id = ?
+                AND status = 'processing'
             """,
-                (parent_task_id,),
+                (result_path, seconds_per_page, child_task_id),
             )
 
-            # 检查是否所有子任务都完成了
-            cursor.execute(
-                """
-                SELECT child_count, child_completed, file_name
-                FROM tasks WHERE task_id = ?
-            """,
-                (parent_task_id,),
-            )
-            parent = cursor.fetchone()
+            if cursor.rowcount == 0:
+                # 任务已被其他进程修改（如超时重置），不计入父任务进度
+                logger.debug(f"Status update failed: task_id={child_task_id}, status=completed")
+                return None
 
-            if parent and parent["child_completed"] >= parent["child_count"]:
-                # 所有子任务完成
-                logger.info(
-                    f"🎉 All subtasks completed for parent task {parent_task_id} "
-                    f"({parent['child_completed']}/{parent['child_count']}) - {parent['file_name']}"
-                )
-                return parent_task_id
+            parent_task_id = self._increment_parent_progress(cursor, child_task_id)
 
-            if parent:
-                logger.info(
-                    f"⏳ Subtask progress: {parent['child_completed']}/{parent['child_count']} "
-                    f"for parent task {parent_task_id}"
-                )
+        self._notify_redis_task_done(child_task_id, "", "completed")
+        return parent_task_id
+
+    def _increment_parent_progress(self, cursor, child_task_id: str) -> Optional[str]:
+        """在当前事务中增加父任务的完成计数，所有子任务完成时返回父任务ID"""
+        # 获取父任务ID
+        cursor.execute(
+            """
+            SELECT parent_task_id FROM tasks WHERE task_id = ?
+        """,
+            (child_task_id,),
+        )
+        row = cursor.fetchone()
+
+        if not row or not row["parent_task_id"]:
+            return None  # 不是子任务
+
+        parent_task_id = row["parent_task_id"]
+
+        # 更新父任务的完成计数
+        cursor.execute(
+            """
+            UPDATE tasks
+            SET child_completed = child_completed + 1
+            WHERE task_id = ?
+        """,
+            (parent_task_id,),
+        )
+
+        # 检查是否所有子任务都完成了
+        cursor.execute(
+            """
+            SELECT child_count, child_completed, file_name
+            FROM tasks WHERE task_id = ?
+        """,
+            (parent_task_id,),
+        )
+        parent = cursor.fetchone()
+
+        if parent and parent["child_completed"] >= parent["child_count"]:
+            # 所有子任务完成
+            logger.info(
+                f"🎉 All subtasks completed for parent task {parent_task_id} "
+                f"({parent['child_completed']}/{parent['child_count']}) - {parent['file_name']}"
+            )
+            return parent_task_id
+
+        if parent:
+            logger.info(
+                f"⏳ Subtask progress: {parent['child_completed']}/{parent['child_count']} "
+                f"for parent task {parent_task_id}"
+            )
 
         return None
 
@@ -897,21 +1168,17 @@ class TaskDB:
             error_message: 错误信息
         """
         with self.get_cursor() as cursor:
-            # 获取父任务ID
-            cursor.execute(
-                """
-                SELECT parent_task_id FROM tasks WHERE task_id = ?
-            """,
-                (child_task_id,),
-            )
-            row = cursor.fetchone()
+            self._fail_parent_task(cursor, child_task_id, error_message)
 
-            if not row or not row["parent_task_id"]:
-                return  # 不是子任务
-
-            parent_task_id = row["parent_task_id"]
+    def fail_child_task(self, child_task_id: str, error_message: str):
+        """
+        标记子任务失败并同时标记父任务失败（单个事务，一次提交）
 
-            # 标记父任务为失败
+        Args:
+            child_task_id: 子任务ID
+            error_message: 错误信息
+        """
+        with self.get_cursor() as cursor:
             cursor.execute(
                 """
                 UPDATE tasks
@@ -921,11 +1188,45 @@ class TaskDB:
                 WHERE task_id = ?
                 AND status = 'processing'
             """,
-                (f"Subtask {child_task_id} failed: {error_message}", parent_task_id),
+                (error_message, child_task_id),
             )
+            success = cursor.rowcount > 0
+            self._fail_parent_task(cursor, child_task_id, error_message)
+
+        if success:
+            self._notify_redis_task_done(child_task_id, "", "failed")
+
+    def _fail_parent_task(self, cursor, child_task_id: str, error_message: str):
+        """在当前事务中将子任务的父任务标记为失败"""
+        # 获取父任务ID
+        cursor.execute(
+            """
+            SELECT parent_task_id FROM tasks WHERE task_id = ?
+        """,
+            (child_task_id,),
+        )
+        row = cursor.fetchone()
+
+        if not row or not row["parent_task_id"]:
+            return  # 不是子任务
+
+        parent_task_id = row["parent_task_id"]
+
+        # 标记父任务为失败
+        cursor.execute(
+            """
+            UPDATE tasks
+            SET status = 'failed',
+                completed_at = CURRENT_TIMESTAMP,
+                error_message = ?
+            WHERE task_id = ?
+            AND status = 'processing'
+        """,
+            (f"Subtask {child_task_id} failed: {error_message}", parent_task_id),
+        )
 
-            if cursor.rowcount > 0:
-                logger.error(f"❌ Parent task {parent_task_id} marked as failed due to subtask failure")
+        if cursor.rowcount > 0:
+            logger.error(f"❌ Parent task {parent_task_id} marked as failed due to subtask failure")
 
     def get_task_with_children(self, task_id: str) -> Optional[Dict]:
         """
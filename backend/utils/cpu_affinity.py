@@ -0,0 +1,213 @@
+"""
+Worker CPU 亲和性
+
+将每个 Worker 进程绑定到一组独占的 CPU 核心，避免多个 Worker 在所有核心间漂移，
+提升 PDF 解析、图片解码等 CPU 侧工作的缓存命中率
+
+多路服务器上还可以将 Worker 绑定到其 GPU 所在的 NUMA 节点，
+避免主机与显存之间的数据拷贝跨越 CPU 插槽互联
+
+仅 Linux 支持（os.sched_setaffinity），其他平台直接跳过
+"""
+
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Tuple
+from loguru import logger
+
+
+def get_available_cpus() -> List[int]:
+    """获取当前进程可用的 CPU 列表（遵循容器 cpuset 限制）"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_worker_cpus(worker_index: int, expected_workers: int) -> Optional[List[int]]:
+    """
+    将当前进程绑定到第 worker_index 个 Worker 的 CPU 核心切片
+
+    可用核心按 Worker 数量均分，每个 Worker 获得 k = 可用核心数 // Worker 数 个连续核心；
+    同时设置 OMP_NUM_THREADS / MKL_NUM_THREADS（未显式配置时），避免 BLAS 线程超额订阅。
+    必须在导入 torch 等库之前调用，线程数设置才会生效。
+
+    Args:
+        worker_index: Worker 全局序号（从 0 开始）
+        expected_workers: Worker 总数
+
+    Returns:
+        绑定的 CPU 列表，平台不支持或绑定失败时返回 None
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        logger.info("ℹ️  CPU affinity not supported on this platform, skipping")
+        return None
+
+    available = get_available_cpus()
+    k = max(1, len(available) // max(1, expected_workers))
+    start = (worker_index * k) % len(available)
+    cpus = available[start : start + k]
+
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        logger.warning(f"⚠️  Failed to set CPU affinity: {e}")
+        return None
+
+    os.environ.setdefault("OMP_NUM_THREADS", str(len(cpus)))
+    os.environ.setdefault("MKL_NUM_THREADS", str(len(cpus)))
+    return cpus
+
+
+def parse_cpulist(cpulist: str) -> List[int]:
+    """解析 sysfs cpulist 格式（如 "0-15,32-47"）"""
+    cpus = []
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _get_gpu_pci_bus_id(gpu_id: int) -> Optional[str]:
+    """获取物理 GPU 的 PCI 总线 ID（优先 pynvml，回退到 nvidia-smi），不会初始化 CUDA"""
+    try:
+        import pynvml
+
+        pynvml.nvmlInit()
+        try:
+            bus_id = pynvml.nvmlDeviceGetPciInfo(pynvml.nvmlDeviceGetHandleByIndex(gpu_id)).busId
+            return bus_id.decode() if isinstance(bus_id, bytes) else bus_id
+        finally:
+            pynvml.nvmlShutdown()
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.debug(f"pynvml PCI query failed: {e}")
+
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=pci.bus_id", "--format=csv,noheader", "-i", str(gpu_id)],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip().splitlines()[0]
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"nvidia-smi PCI query failed: {e}")
+    return None
+
+
+# nvidia-smi topo -m 中的 CPU 列表（如 0-15,32-47）或 NUMA 节点编号
+_TOPO_NUMERIC = re.compile(r"\d+(?:-\d+)?(?:,\d+(?:-\d+)?)*")
+
+
+def _get_gpu_topo_affinity(gpu_id: int) -> Tuple[Optional[int], Optional[List[int]]]:
+    """
+    解析 nvidia-smi topo -m 中物理 GPU 的 CPU Affinity / NUMA Affinity 列（sysfs 不可用时的回退）
+
+    Returns:
+        (NUMA 节点编号, CPU 列表)，无法获取时对应项为 None
+    """
+    try:
+        result = subprocess.run(["nvidia-smi", "topo", "-m"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"nvidia-smi topo query failed: {e}")
+        return None, None
+    if result.returncode != 0:
+        return None, None
+
+    for line in result.stdout.splitlines():
+        tokens = line.split()
+        if not tokens or tokens[0] != f"GPU{gpu_id}":
+            continue
+        # GPU 互联列（X、NV12、PIX、SYS 等）之后，第一个数值列为 CPU Affinity，第二个为 NUMA Affinity
+        numeric = [t for t in tokens[1:] if _TOPO_NUMERIC.fullmatch(t)]
+        cpus = parse_cpulist(numeric[0]) if numeric else None
+        node = int(numeric[1]) if len(numeric) > 1 and numeric[1].isdigit() else None
+        return node, cpus
+    return None, None
+
+
+def get_gpu_numa_node(gpu_id: int) -> Optional[int]:
+    """
+    获取物理 GPU 所在的 NUMA 节点
+
+    Args:
+        gpu_id: 物理 GPU 编号（CUDA_VISIBLE_DEVICES 中的值）
+
+    Returns:
+        NUMA 节点编号，单路服务器或无法判断时返回 None
+    """
+    bus_id = _get_gpu_pci_bus_id(gpu_id)
+    if not bus_id:
+        return None
+
+    # NVML 返回 8 位 PCI domain（00000000:3B:00.0），sysfs 使用 4 位小写（0000:3b:00.0）
+    domain, _, rest = bus_id.lower().partition(":")
+    sysfs_id = f"{domain[-4:]}:{rest}"
+    try:
+        node = int(Path(f"/sys/bus/pci/devices/{sysfs_id}/numa_node").read_text().strip())
+    except (OSError, ValueError):
+        return None
+    # -1 表示平台未提供 NUMA 信息
+    return node if node >= 0 else None
+
+
+def pin_to_gpu_numa_node(gpu_id: int, expected_workers: int = 1) -> Optional[List[int]]:
+    """
+    将当前进程绑定到物理 GPU 所在 NUMA 节点的 CPU 上
+
+    NUMA 节点优先从 sysfs 读取，失败时回退到 nvidia-smi topo -m 的 CPU Affinity 列。
+    同时设置 OMP_PLACES=cores / OMP_PROC_BIND=close，并按 Worker 总数均分核心设置
+    OMP_NUM_THREADS / MKL_NUM_THREADS（均在未显式配置时），使 OpenMP 线程留在本节点且不超额订阅。
+    必须在导入 torch 等库之前调用。
+
+    Args:
+        gpu_id: 物理 GPU 编号
+        expected_workers: Worker 总数（用于计算每个 Worker 的线程数）
+
+    Returns:
+        绑定的 CPU 列表，平台不支持或无法判断时返回 None
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        logger.info("ℹ️  CPU affinity not supported on this platform, skipping NUMA binding")
+        return None
+
+    available = get_available_cpus()
+    node = get_gpu_numa_node(gpu_id)
+    if node is not None:
+        try:
+            node_cpus = parse_cpulist(Path(f"/sys/devices/system/node/node{node}/cpulist").read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Failed to read CPU list of NUMA node {node}: {e}")
+            return None
+    else:
+        node, node_cpus = _get_gpu_topo_affinity(gpu_id)
+        if not node_cpus:
+            return None
+
+    # 遵循容器 cpuset 限制，只绑定本进程允许使用的核心
+    cpus = sorted(set(node_cpus) & set(available))
+    if not cpus:
+        logger.warning(f"⚠️  No allowed CPUs on NUMA node {node}, skipping NUMA binding")
+        return None
+
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        logger.warning(f"⚠️  Failed to bind to NUMA node {node}: {e}")
+        return None
+
+    threads = str(max(1, min(len(cpus), len(available) // max(1, expected_workers))))
+    os.environ.setdefault("OMP_NUM_THREADS", threads)
+    os.environ.setdefault("MKL_NUM_THREADS", threads)
+    os.environ.setdefault("OMP_PLACES", "cores")
+    os.environ.setdefault("OMP_PROC_BIND", "close")
+    return cpus
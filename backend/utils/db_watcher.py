@@ -0,0 +1,117 @@
+"""
+SQLite 数据库文件变更监听
+
+当 DATABASE_PATH 位于本地文件系统时，SQLite 每次提交都会写入数据库文件。
+使用 inotify 监听该文件的写入事件，可以在有新任务提交时立即唤醒 Worker，
+替代固定间隔的轮询等待。
+
+网络文件系统（NFS/CIFS 等）无法感知其他主机上的写入，此时不启用监听，
+Worker 继续使用定时轮询。
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+from loguru import logger
+
+# 无法通过 inotify 感知远端写入的文件系统类型
+NETWORK_FS_TYPES = {
+    "nfs",
+    "nfs4",
+    "cifs",
+    "smbfs",
+    "smb3",
+    "9p",
+    "afs",
+    "ceph",
+    "lustre",
+    "gpfs",
+    "glusterfs",
+    "fuse.sshfs",
+    "fuse.glusterfs",
+    "fuse.cephfs",
+    "fuse.s3fs",
+}
+
+
+def get_filesystem_type(path: str) -> Optional[str]:
+    """
+    获取路径所在挂载点的文件系统类型（读取 /proc/mounts）
+
+    Args:
+        path: 文件或目录路径
+
+    Returns:
+        文件系统类型（如 ext4、nfs4），无法判断时返回 None
+    """
+    try:
+        target = os.path.realpath(path)
+        best_mount, best_type = "", None
+        with open("/proc/mounts", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                # /proc/mounts 中的空格等字符被转义为八进制（如 \040）
+                mount_point = parts[1].encode().decode("unicode_escape")
+                if target == mount_point or target.startswith(mount_point.rstrip("/") + "/"):
+                    if len(mount_point) >= len(best_mount):
+                        best_mount, best_type = mount_point, parts[2]
+        return best_type
+    except OSError:
+        return None
+
+
+def is_local_filesystem(path: str) -> bool:
+    """判断路径是否位于本地文件系统（无法判断时视为非本地）"""
+    fs_type = get_filesystem_type(path)
+    return fs_type is not None and fs_type not in NETWORK_FS_TYPES
+
+
+def start_db_watcher(db_path: str, wakeup: threading.Event) -> bool:
+    """
+    启动数据库文件监听线程（daemon），文件被写入时设置 wakeup 事件
+
+    Args:
+        db_path: SQLite 数据库文件路径
+        wakeup: 收到写入事件时调用 set() 的事件对象
+
+    Returns:
+        bool: True 表示监听已启动，False 表示不可用（调用方应回退到定时轮询）
+    """
+    try:
+        from inotify_simple import INotify, flags
+    except ImportError:
+        logger.info("ℹ️  inotify_simple not available, using timed polling")
+        return False
+
+    if not Path(db_path).exists():
+        logger.info(f"ℹ️  Database file not found, using timed polling: {db_path}")
+        return False
+
+    fs_type = get_filesystem_type(db_path)
+    if fs_type is None or fs_type in NETWORK_FS_TYPES:
+        logger.info(f"ℹ️  Database is not on a local filesystem ({fs_type or 'unknown'}), using timed polling")
+        return False
+
+    try:
+        inotify = INotify()
+        inotify.add_watch(db_path, flags.MODIFY | flags.CLOSE_WRITE)
+    except OSError as e:
+        logger.warning(f"⚠️  Failed to watch database file, using timed polling: {e}")
+        return False
+
+    def _watch():
+        while True:
+            try:
+                # 阻塞在系统调用中，直到有写入事件
+                if inotify.read():
+                    wakeup.set()
+            except Exception as e:
+                logger.warning(f"⚠️  Database watcher stopped: {e}")
+                return
+
+    threading.Thread(target=_watch, daemon=True, name="db-watcher").start()
+    logger.info(f"👀 Watching database file for changes ({fs_type}): {db_path}")
+    return True
@@ -0,0 +1,171 @@
+"""
+常驻 LibreOffice 转换服务
+
+每次执行 `libreoffice --convert-to pdf` 都要冷启动一次 soffice（数秒）。
+这里每个 Worker 进程维护一个常驻的 headless soffice 实例，通过 UNO 管道连接提交转换，
+只在第一次转换时承担启动开销。
+
+依赖 LibreOffice 自带的 Python UNO 绑定（python3-uno），不可用时调用方应回退到命令行转换
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from loguru import logger
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+
+    UNO_AVAILABLE = True
+except ImportError:
+    UNO_AVAILABLE = False
+
+# 按文档类型选择 PDF 导出过滤器
+PDF_EXPORT_FILTERS = [
+    ("com.sun.star.sheet.SpreadsheetDocument", "calc_pdf_Export"),
+    ("com.sun.star.presentation.PresentationDocument", "impress_pdf_Export"),
+    ("com.sun.star.drawing.DrawingDocument", "draw_pdf_Export"),
+    ("com.sun.star.text.TextDocument", "writer_pdf_Export"),
+]
+
+
+def _props(**kwargs):
+    """构造 UNO PropertyValue 元组"""
+    props = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+class OfficeServer:
+    """
+    常驻 headless soffice 实例（每个 Worker 进程一个）
+
+    使用命名管道而不是 TCP 端口通信，并使用独立的用户配置目录，
+    避免同一主机上多个 Worker 的 soffice 实例相互冲突
+    """
+
+    def __init__(self, name: Optional[str] = None, startup_timeout: float = 30.0):
+        self.pipe_name = name or f"tianshu_soffice_{os.getpid()}"
+        self.startup_timeout = startup_timeout
+        self._profile_dir = Path(tempfile.gettempdir()) / f"{self.pipe_name}_profile"
+        self._process: Optional[subprocess.Popen] = None
+        self._desktop = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """启动 soffice 并建立 UNO 连接"""
+        soffice = shutil.which("soffice") or shutil.which("libreoffice")
+        if not soffice:
+            raise RuntimeError("LibreOffice executable not found")
+
+        cmd = [
+            soffice,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--nodefault",
+            "--norestore",
+            "--nolockcheck",
+            f"-env:UserInstallation={self._profile_dir.as_uri()}",
+            f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+        ]
+        logger.info(f"🚀 Starting LibreOffice server: {self.pipe_name}")
+        start = time.time()
+        self._process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_ctx)
+        deadline = start + self.startup_timeout
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except NoConnectException:
+                if self._process.poll() is not None or time.time() > deadline:
+                    self.close()
+                    raise RuntimeError("LibreOffice server failed to start")
+                time.sleep(0.2)
+
+        self._desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        logger.info(f"✅ LibreOffice server ready in {time.time() - start:.1f}s")
+
+    def convert_to_pdf(self, input_file: Path, output_file: Path, timeout: float = 120.0):
+        """
+        将 Office 文件转换为 PDF
+
+        Args:
+            input_file: 输入文件
+            output_file: 输出 PDF 路径
+            timeout: 超时时间（秒），超时后终止 soffice 实例，下次转换时重新启动
+
+        Raises:
+            RuntimeError: 转换失败或超时
+        """
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._desktop = None
+                self._start()
+
+            # 超时后杀掉 soffice，使阻塞中的 UNO 调用抛出异常
+            timer = threading.Timer(timeout, self._kill)
+            timer.start()
+            doc = None
+            try:
+                doc = self._desktop.loadComponentFromURL(
+                    Path(input_file).resolve().as_uri(), "_blank", 0, _props(Hidden=True, ReadOnly=True)
+                )
+                if doc is None:
+                    raise RuntimeError(f"LibreOffice could not open: {input_file}")
+
+                filter_name = next(
+                    (name for service, name in PDF_EXPORT_FILTERS if doc.supportsService(service)),
+                    "writer_pdf_Export",
+                )
+                doc.storeToURL(Path(output_file).resolve().as_uri(), _props(FilterName=filter_name))
+            except Exception as e:
+                if not timer.is_alive():
+                    raise RuntimeError(f"LibreOffice conversion timeout (>{timeout:.0f}s): {Path(input_file).name}")
+                raise RuntimeError(f"LibreOffice conversion failed: {e}")
+            finally:
+                timer.cancel()
+                if doc is not None:
+                    try:
+                        doc.close(True)
+                    except Exception:
+                        pass
+
+    def _kill(self):
+        """强制终止 soffice 进程"""
+        if self._process is not None and self._process.poll() is None:
+            logger.warning(f"⚠️  Killing LibreOffice server: {self.pipe_name}")
+            self._process.kill()
+
+    def close(self):
+        """关闭 soffice 实例并删除临时用户配置目录"""
+        if self._desktop is not None:
+            try:
+                self._desktop.terminate()
+            except Exception:
+                pass
+            self._desktop = None
+
+        if self._process is not None:
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+        shutil.rmtree(self._profile_dir, ignore_errors=True)
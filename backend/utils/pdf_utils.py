@@ -2,10 +2,25 @@
 PDF 处理工具函数
 """
 
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Dict
 from loguru import logger
 
+# 拆分 PDF 时并行运行的 qpdf 进程数上限（与推理 Worker 共享 CPU，默认不超过 4 个）
+PDF_SPLIT_MAX_WORKERS = max(1, int(os.getenv("PDF_SPLIT_MAX_WORKERS", "4")))
+
+
+def _available_cpu_count() -> int:
+    """当前进程可用的 CPU 数（考虑 CPU 亲和性/容器 cpuset，不支持时回退到 cpu_count）"""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
 
 def convert_pdf_to_images(pdf_path: Path, output_dir: Path, zoom: float = 2.0, dpi: Optional[int] = None) -> List[Path]:
     """
@@ -94,6 +109,10 @@ def get_pdf_page_count(pdf_path: Path) -> int:
     """
     获取 PDF 页数
 
+    优先使用 pikepdf 直接读取页面树根节点的 /Count（只解析 xref 和根对象，
+    不展开页面树、不解码内容流）；/Count 缺失或无效时回退到遍历页面树。
+    pikepdf 不可用时使用 pypdf。
+
     Args:
         pdf_path: PDF 文件路径
 
@@ -104,6 +123,18 @@ def get_pdf_page_count(pdf_path: Path) -> int:
         RuntimeError: 如果无法读取 PDF
     """
     try:
+        import pikepdf
+    except ImportError:
+        pikepdf = None
+
+    try:
+        if pikepdf is not None:
+            with pikepdf.open(pdf_path) as pdf:
+                count = pdf.Root.Pages.get("/Count")
+                if isinstance(count, int) and count > 0:
+                    return int(count)
+                return len(pdf.pages)
+
         from pypdf import PdfReader
 
         reader = PdfReader(str(pdf_path))
@@ -147,6 +178,13 @@ def split_pdf_file(
         >>> #   ...
         >>> # ]
     """
+    # 优先使用 qpdf 命令行并行写出各分片（每个分片一个独立进程，不受 GIL 限制）
+    if shutil.which("qpdf"):
+        try:
+            return _split_pdf_with_qpdf(pdf_path, output_dir, chunk_size, parent_task_id)
+        except Exception as e:
+            logger.warning(f"⚠️  qpdf split failed, falling back to pikepdf: {e}")
+
     try:
         import pikepdf
 
@@ -170,12 +208,7 @@ def split_pdf_file(
             chunk_pdf.pages.extend(pdf.pages[i:end_page])
 
             # 生成分片文件名
-            if parent_task_id:
-                chunk_filename = f"{parent_task_id}_chunk_{i+1}_{end_page}.pdf"
-            else:
-                chunk_filename = f"{pdf_path.stem}_chunk_{i+1}_{end_page}.pdf"
-
-            chunk_path = output_dir / chunk_filename
+            chunk_path = output_dir / _chunk_filename(pdf_path, i + 1, end_page, parent_task_id)
 
             # 保存分片文件（自动压缩优化）
             chunk_pdf.save(chunk_path)
@@ -200,3 +233,65 @@ def split_pdf_file(
     except Exception as e:
         logger.error(f"❌ Failed to split PDF: {e}")
         raise
+
+
+def _chunk_filename(pdf_path: Path, start_page: int, end_page: int, parent_task_id: Optional[str]) -> str:
+    """生成分片文件名（页码 1-based）"""
+    prefix = parent_task_id or pdf_path.stem
+    return f"{prefix}_chunk_{start_page}_{end_page}.pdf"
+
+
+def _split_pdf_with_qpdf(
+    pdf_path: Path, output_dir: Path, chunk_size: int, parent_task_id: Optional[str]
+) -> List[Dict[str, any]]:
+    """
+    使用 qpdf 命令行拆分 PDF（各分片由独立的 qpdf 进程并行写出）
+
+    返回值与 split_pdf_file 相同
+    """
+    total_pages = get_pdf_page_count(pdf_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"✂️  Splitting PDF: {pdf_path.name} ({total_pages} pages)")
+    logger.info(f"   Chunk size: {chunk_size} pages")
+    logger.info("   Using qpdf for parallel chunk writes")
+
+    chunks = []
+    for i in range(0, total_pages, chunk_size):
+        end_page = min(i + chunk_size, total_pages)
+        chunks.append(
+            {
+                "path": str(output_dir / _chunk_filename(pdf_path, i + 1, end_page, parent_task_id)),
+                "start_page": i + 1,  # 1-based
+                "end_page": end_page,  # 1-based
+                "page_count": end_page - i,
+            }
+        )
+
+    def write_chunk(chunk: Dict[str, any]):
+        cmd = [
+            "qpdf",
+            "--empty",
+            "--pages",
+            str(pdf_path),
+            f"{chunk['start_page']}-{chunk['end_page']}",
+            "--",
+            chunk["path"],
+        ]
+        # 返回码 3 表示成功但有警告（如轻微损坏的 xref 已被修复）
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+        if result.returncode not in (0, 3):
+            raise RuntimeError(f"qpdf exited with {result.returncode}: {result.stderr.strip()}")
+
+    max_workers = min(len(chunks), _available_cpu_count(), PDF_SPLIT_MAX_WORKERS) or 1
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-split") as executor:
+        # list() 使任一分片的异常在此处抛出
+        list(executor.map(write_chunk, chunks))
+
+    for idx, chunk in enumerate(chunks, 1):
+        logger.info(
+            f"   ✅ Created chunk {idx}: pages {chunk['start_page']}-{chunk['end_page']} ({chunk['page_count']} pages)"
+        )
+
+    logger.info(f"✅ Split into {len(chunks)} chunks")
+    return chunks
@@ -0,0 +1,88 @@
+"""
+Worker 任务拉取指标
+
+记录每次拉取任务（轮询 / Redis 阻塞等待）的耗时和是否拉取到任务，用于判断轮询参数是否合理：
+空轮询比例过高说明轮询过于频繁，拉取耗时过长说明任务认领存在瓶颈。
+
+- 始终在进程内保留最近的拉取记录，由 Worker 定期输出 p50/p95 日志
+- 安装 prometheus_client 且 ENABLE_METRICS=true 时，额外通过 HTTP 暴露 Prometheus 指标
+"""
+
+import statistics
+from collections import deque
+from typing import Dict, Optional
+from loguru import logger
+
+try:
+    from prometheus_client import Counter, Histogram, start_http_server
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# 拉取耗时直方图分桶（秒），覆盖 SQLite 认领（毫秒级）到 Redis 阻塞等待（数秒）
+POLL_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if PROMETHEUS_AVAILABLE:
+    POLL_SECONDS = Histogram(
+        "tianshu_worker_poll_seconds",
+        "Time spent claiming the next task",
+        ["worker", "device"],
+        buckets=POLL_BUCKETS,
+    )
+    POLL_TOTAL = Counter(
+        "tianshu_worker_poll_total",
+        "Task claim attempts by outcome",
+        ["worker", "device", "outcome"],
+    )
+
+
+class PollMetrics:
+    """单个 Worker 进程的任务拉取指标"""
+
+    def __init__(self, worker: str, device: str, window: int = 1000):
+        self.worker = worker
+        self.device = device
+        self._durations = deque(maxlen=window)
+        self._empty = deque(maxlen=window)
+        self._exporter_enabled = False
+
+    def start_exporter(self, port: int) -> bool:
+        """
+        启动 Prometheus HTTP 指标端点
+
+        Returns:
+            bool: 是否启动成功（prometheus_client 未安装或端口被占用时返回 False）
+        """
+        if not PROMETHEUS_AVAILABLE:
+            logger.info("ℹ️  prometheus_client not installed, metrics endpoint disabled")
+            return False
+        try:
+            start_http_server(port)
+        except OSError as e:
+            logger.warning(f"⚠️  Failed to start metrics endpoint on port {port}: {e}")
+            return False
+        self._exporter_enabled = True
+        logger.info(f"📈 Metrics endpoint: http://0.0.0.0:{port}/metrics")
+        return True
+
+    def record(self, seconds: float, got_task: bool):
+        """记录一次任务拉取"""
+        self._durations.append(seconds)
+        self._empty.append(not got_task)
+        if self._exporter_enabled:
+            POLL_SECONDS.labels(self.worker, self.device).observe(seconds)
+            POLL_TOTAL.labels(self.worker, self.device, "task" if got_task else "empty").inc()
+
+    def summary(self) -> Optional[Dict[str, float]]:
+        """最近拉取记录的统计（p50/p95 耗时、空轮询比例），无记录时返回 None"""
+        if not self._durations:
+            return None
+        durations = sorted(self._durations)
+        p95_index = min(len(durations) - 1, int(len(durations) * 0.95))
+        return {
+            "polls": len(durations),
+            "p50": statistics.median(durations),
+            "p95": durations[p95_index],
+            "empty_ratio": sum(self._empty) / len(self._empty),
+        }